@@ -0,0 +1,402 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from chat_server import ChatServer
+from intent_catalog import MappedCatalog, read_catalog_source, write_catalog_source, write_snapshot
+from task4 import DEFAULT_CATALOG, ChatMetrics, SimpleChatbot, TextNormalizer
+from transcript import TranscriptLogger, read_transcript, replay_transcript
+
+def make_catalog(bot, categories, patterns_per_category, seed=42):
+    """Fill a chatbot with a synthetic catalog of random word patterns."""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for i in range(categories):
+        patterns = []
+        for _ in range(patterns_per_category):
+            words = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 8)))
+                     for _ in range(rng.randint(1, 3))]
+            patterns.append(" ".join(words))
+        bot.add_patterns(f"intent_{i}", patterns, ["Synthetic reply."])
+    return bot
+
+def make_messages(bot, count, seed=7):
+    """Build a mix of catalog hits and unmatched chatter from random words."""
+    rng = random.Random(seed)
+    letters = "abcdefgjklmnopqrsuvwxyz"  # no 'h' or 't', so "hi" and "thanks" rarely match
+    patterns = [pattern for intent in bot.catalog.intents for pattern in intent.patterns]
+    messages = []
+    for _ in range(count):
+        words = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 7)))
+                 for _ in range(rng.randint(3, 10))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), rng.choice(patterns))
+        messages.append(" ".join(words))
+    return messages
+
+def legacy_find(bot, user_input):
+    """The original nested loop over every category and pattern."""
+    normalized_input = bot.normalize_input(user_input)
+    for intent in bot.catalog.intents:
+        for pattern in intent.patterns:
+            if pattern in normalized_input:
+                return intent.category
+    return None
+
+def bench_matcher(sizes=((100, 10), (1000, 10), (2000, 20))):
+    """Compare the compiled matcher with the legacy loop."""
+    print("\nPattern matcher vs legacy loop")
+    print(f"{'Patterns':>10} {'Legacy msg/s':>14} {'Matcher msg/s':>14} {'Speedup':>9} {'Build ms':>10}")
+    for categories, per_category in sizes:
+        bot = make_catalog(SimpleChatbot(), categories, per_category)
+        messages = make_messages(bot, 500)
+        pattern_count = sum(len(intent.patterns) for intent in bot.catalog.intents)
+
+        start = time.perf_counter()
+        bot.matcher
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        legacy = [legacy_find(bot, message) for message in messages]
+        legacy_rate = len(messages) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        compiled = [bot.find_response_category(message) for message in messages]
+        compiled_rate = len(messages) / (time.perf_counter() - start)
+
+        if legacy != compiled:
+            print("   Results differ from the legacy loop!")
+        print(f"{pattern_count:>10} {legacy_rate:>14.0f} {compiled_rate:>14.0f} "
+              f"{compiled_rate / legacy_rate:>8.1f}x {build_ms:>10.1f}")
+
+def bench_batch(count=200000):
+    """Compare per-message classification with classify_many."""
+    print(f"\nBatch classification of {count} messages")
+    bot = make_catalog(SimpleChatbot(), 1000, 10)
+    messages = make_messages(bot, 2000) * (count // 2000)
+    bot.matcher
+
+    start = time.perf_counter()
+    for message in messages:
+        bot.find_response_category(message)
+    print(f"   • One call per message:  {len(messages) / (time.perf_counter() - start):>10.0f} msg/s")
+
+    list(bot.classify_many(messages, processes=1))
+    print(f"   • classify_many serial:  {bot.batch_stats['messages_per_second']:>10.0f} msg/s")
+
+    list(bot.classify_many(messages, parallel_threshold=0))
+    print(f"   • classify_many pooled:  {bot.batch_stats['messages_per_second']:>10.0f} msg/s")
+
+async def read_reply(reader):
+    """Read one reply block from the chat server."""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line or line == b"\n":
+            return lines
+        lines.append(line)
+
+async def run_session(port, messages, latencies):
+    """Play one scripted session against the server, recording turn latencies."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    await read_reply(reader)  # Welcome
+    for message in messages:
+        start = time.perf_counter()
+        writer.write(message.encode() + b"\n")
+        await read_reply(reader)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+async def load_test(sessions, turns):
+    """Run many concurrent sessions against an in-process server."""
+    server = ChatServer(port=0)
+    port = await server.start()
+    script = ["hello there", "how are you", "tell me a joke", "what is your name",
+              "the weather is sunny", "thanks", "something else entirely"]
+    latencies = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(port, [script[(i + t) % len(script)] for t in range(turns)], latencies)
+                           for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return latencies, elapsed
+
+def bench_server(sessions=1000, turns=10):
+    """Load-test the asyncio chat server over localhost."""
+    print(f"\nChat server: {sessions} concurrent sessions x {turns} turns")
+    latencies, elapsed = asyncio.run(load_test(sessions, turns))
+    latencies.sort()
+    cores = os.cpu_count() or 1
+    print(f"   • Turns per second:  {len(latencies) / elapsed:>10.0f}")
+    print(f"   • p50 latency:       {statistics.median(latencies) * 1000:>10.2f} ms")
+    print(f"   • p99 latency:       {latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.2f} ms")
+    print(f"   • Sessions per core: {sessions / cores:>10.0f} (server and clients share {cores} core(s))")
+
+def legacy_tables(name):
+    """Rebuild the per-instance tables the way the old constructor did."""
+    responses = {intent.category: {'patterns': list(intent.patterns),
+                                   'replies': [reply.replace('{name}', name) for reply in intent.replies]}
+                 for intent in DEFAULT_CATALOG.intents}
+    return responses, list(DEFAULT_CATALOG.default_replies)
+
+def rss_bytes():
+    """Current resident set size, or 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def measure_construction(factory, count):
+    """Return (seconds, traced bytes, RSS bytes) for building count objects."""
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    live = [factory(f"Bot{i}") for i in range(count)]
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss = rss_bytes() - rss_before
+    del live
+    return elapsed, traced, rss
+
+def bench_construction(count=10000):
+    """Compare bot construction time and memory with the old per-instance tables."""
+    print(f"\nConstruction of {count} live bots")
+    print(f"{'Variant':<22} {'Time ms':>9} {'Traced KB':>11} {'RSS KB':>9} {'Bytes/bot':>10}")
+
+    def legacy_bot(name):
+        return SimpleChatbot(name), legacy_tables(name)
+
+    for label, factory in (("Per-instance tables", legacy_bot), ("Shared catalog", SimpleChatbot)):
+        elapsed, traced, rss = measure_construction(factory, count)
+        print(f"{label:<22} {elapsed * 1000:>9.1f} {traced / 1024:>11.0f} {rss / 1024:>9.0f} {traced / count:>10.0f}")
+
+def legacy_normalize(user_input):
+    """The original normalize_input, which rebuilt its table on every call."""
+    normalized = user_input.lower().strip()
+    import string
+    return normalized.translate(str.maketrans('', '', string.punctuation))
+
+def bench_normalize(count=200000, distinct=500):
+    """Compare normalization with and without the cache on repetitive traffic."""
+    print(f"\nNormalization of {count} messages ({distinct} distinct bodies + common greetings)")
+    rng = random.Random(3)
+    common = ["hi", "hello!", "Hey there", "bye", "quit", "thanks!", "What's up?"]
+    bodies = make_messages(SimpleChatbot(), distinct)
+    messages = [rng.choice(common) if rng.random() < 0.7 else rng.choice(bodies) for _ in range(count)]
+
+    start = time.perf_counter()
+    for message in messages:
+        legacy_normalize(message)
+    print(f"   • Table per call:        {count / (time.perf_counter() - start):>10.0f} msg/s")
+
+    for label, normalizer in (("Cached (ASCII)", TextNormalizer()),
+                              ("Cached (Unicode)", TextNormalizer(unicode=True)),
+                              ("Uncached (ASCII)", TextNormalizer(cache_size=0))):
+        start = time.perf_counter()
+        for message in messages:
+            normalizer.normalize(message)
+        rate = count / (time.perf_counter() - start)
+        print(f"   • {label + ':':<22} {rate:>10.0f} msg/s  hits={normalizer.hits} misses={normalizer.misses}")
+
+def bench_cold_start(categories=1000, per_category=100):
+    """Compare loading a large catalog from JSON with opening its snapshot."""
+    catalog = make_catalog(SimpleChatbot(), categories, per_category).catalog
+    pattern_count = sum(len(intent.patterns) for intent in catalog.intents)
+    print(f"\nCold start with {pattern_count} patterns")
+    probe = make_messages(SimpleChatbot(catalog=catalog), 1)[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "catalog.json")
+        snapshot_path = os.path.join(directory, "catalog.snap")
+        write_catalog_source(catalog, source_path)
+
+        start = time.perf_counter()
+        write_snapshot(catalog, snapshot_path)
+        print(f"   • Compile snapshot:        {(time.perf_counter() - start) * 1000:>9.1f} ms "
+              f"({os.path.getsize(snapshot_path) / 1024 / 1024:.1f} MB)")
+
+        start = time.perf_counter()
+        loaded = read_catalog_source(source_path)
+        expected = SimpleChatbot(catalog=loaded).find_response_category(probe)
+        print(f"   • JSON load + build + match: {(time.perf_counter() - start) * 1000:>7.1f} ms")
+
+        start = time.perf_counter()
+        mapped = MappedCatalog(snapshot_path)
+        found = SimpleChatbot(catalog=mapped).find_response_category(probe)
+        print(f"   • Snapshot open + match:   {(time.perf_counter() - start) * 1000:>9.1f} ms")
+
+        if found != expected:
+            print("   Snapshot result differs from the source catalog!")
+
+def add_typo(text, rng):
+    """Swap, drop or replace one letter of a word long enough to tolerate it."""
+    words = text.split()
+    index = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[index]
+    if len(word) < 5:
+        return text
+    pos = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    elif kind == 1:
+        word = word[:pos] + word[pos + 1:]
+    else:
+        word = word[:pos] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[pos + 1:]
+    words[index] = word
+    return " ".join(words)
+
+def bench_fuzzy(sizes=((100, 10), (1000, 10), (1000, 100)), queries=300):
+    """Fuzzy lookup latency and recall across catalog sizes."""
+    print("\nFuzzy matching of messages with one typo")
+    print(f"{'Patterns':>10} {'Build s':>9} {'Mean ms':>9} {'p99 ms':>9} {'Recall':>8}")
+    rng = random.Random(11)
+
+    for categories, per_category in sizes:
+        bot = make_catalog(SimpleChatbot(fuzzy=True), categories, per_category)
+        intents = bot.catalog.intents[-categories:]
+        pattern_count = sum(len(intent.patterns) for intent in bot.catalog.intents)
+
+        start = time.perf_counter()
+        bot.matcher
+        build = time.perf_counter() - start
+
+        latencies = []
+        hits = 0
+        for _ in range(queries):
+            intent = rng.choice(intents)
+            message = f"well {add_typo(rng.choice(intent.patterns), rng)} ok"
+            start = time.perf_counter()
+            category = bot.find_response_category(message)
+            latencies.append(time.perf_counter() - start)
+            hits += category == intent.category
+
+        latencies.sort()
+        print(f"{pattern_count:>10} {build:>9.2f} {statistics.mean(latencies) * 1000:>9.3f} "
+              f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.3f} {hits / queries:>8.1%}")
+
+def bench_metrics(count=100000):
+    """Overhead of instrumentation on get_response."""
+    print(f"\nInstrumentation overhead over {count} responses")
+    messages = make_messages(SimpleChatbot(), 1000) * (count // 1000)
+    rates = {}
+    for label, metrics in (("disabled", None), ("enabled", ChatMetrics())):
+        bot = SimpleChatbot(metrics=metrics)
+        start = time.perf_counter()
+        for message in messages:
+            bot.get_response(message)
+        rates[label] = len(messages) / (time.perf_counter() - start)
+        print(f"   • Metrics {label + ':':<10} {rates[label]:>10.0f} responses/s")
+    print(f"   • Overhead:          {(1 - rates['enabled'] / rates['disabled']):>10.1%}")
+    print(f"   • Prometheus snapshot: {len(metrics.to_prometheus().splitlines())} lines")
+
+def bench_transcript(count=200000):
+    """Hot-path cost of transcript logging, writer throughput and replay speed."""
+    print(f"\nTranscript of {count} turns")
+    messages = make_messages(SimpleChatbot(), 1000) * (count // 1000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transcript.log")
+        logger = TranscriptLogger(path, max_bytes=8 * 1024 * 1024)
+        start = time.perf_counter()
+        for message in messages:
+            logger.log("session", message, "greetings", 0.0001)
+        queued = time.perf_counter() - start
+        logger.close()
+        total = time.perf_counter() - start
+        print(f"   • log() calls:     {len(messages) / queued:>12.0f} turns/s "
+              f"({queued / len(messages) * 1e6:.2f} µs per turn)")
+        print(f"   • Writer:          {logger.bytes_written / total / 1024 / 1024:>12.1f} MB/s "
+              f"({logger.records_written} records)")
+
+        start = time.perf_counter()
+        records = sum(1 for _ in read_transcript(path))
+        print(f"   • Streaming read:  {records / (time.perf_counter() - start):>12.0f} records/s")
+
+        bot = SimpleChatbot()
+        start = time.perf_counter()
+        replayed = sum(1 for _ in replay_transcript(path, bot))
+        print(f"   • Replay + match:  {replayed / (time.perf_counter() - start):>12.0f} records/s")
+
+# Kept next to this script, whatever the working directory; ignored by git
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+SCRIPT = ["hello there", "how are you", "tell me a joke", "", "what is your name", "how old are you",
+          "you are awesome", "i need help", "is it raining", "interesting stuff", "thank you"]
+
+def bench_replay(conversations=2000, turns=20, seed=1234):
+    """Seeded headless conversations, compared against the saved baseline.
+
+    The first run writes bench_baseline.json next to this script. Later runs report how turns per
+    second and allocated blocks per turn changed, and whether the seeded
+    output is still byte-for-byte identical.
+    """
+    print(f"\nHeadless replay of {conversations} seeded conversations x {turns} turns")
+    scripts = [[SCRIPT[(i + t) % len(SCRIPT)] for t in range(turns)] + ["bye"] for i in range(conversations)]
+    digest = hashlib.sha256()
+
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for i, script in enumerate(scripts):
+        for line in SimpleChatbot(seed=seed + i).run_script(script):
+            digest.update(line.encode())
+    elapsed = time.perf_counter() - start
+    total_turns = conversations * (turns + 1)
+
+    result = {
+        'turns_per_second': total_turns / elapsed,
+        'blocks_per_turn': (sys.getallocatedblocks() - blocks_before) / total_turns,
+        'output_digest': digest.hexdigest(),
+    }
+    print(f"   • Turns per second:   {result['turns_per_second']:>10.0f}")
+    print(f"   • Net blocks/turn:    {result['blocks_per_turn']:>10.3f}")
+
+    try:
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)['replay']
+    except (OSError, KeyError, ValueError):
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump({'replay': result}, file, indent=2)
+        print(f"   • Baseline saved to {BASELINE_PATH}")
+        return
+
+    change = result['turns_per_second'] / baseline['turns_per_second'] - 1
+    print(f"   • vs baseline:        {change:>+10.1%} turns/s, "
+          f"{result['blocks_per_turn'] - baseline['blocks_per_turn']:+.3f} blocks/turn")
+    if result['output_digest'] == baseline['output_digest']:
+        print("   • Output matches the baseline")
+    else:
+        print("   • Output differs from the baseline!")
+
+BENCHMARKS = {
+    'matcher': bench_matcher,
+    'batch': bench_batch,
+    'server': bench_server,
+    'construction': bench_construction,
+    'normalize': bench_normalize,
+    'cold_start': bench_cold_start,
+    'fuzzy': bench_fuzzy,
+    'metrics': bench_metrics,
+    'transcript': bench_transcript,
+    'replay': bench_replay,
+}
+
+def main():
+    """Run the benchmarks named on the command line, or all of them."""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from hangman_calibrate import ORDER_STRATEGIES, STRATEGIES, calibrate, random_order
+from hangman_server import HangmanClient, HangmanServer
+from hangman_solver import HangmanSolver
+from hangman_words import WordSource, write_index
+from task1 import HangmanGame
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+def make_words(count, seed=1):
+    """Random lowercase words of 3 to 12 letters."""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 12))) for _ in range(count)]
+
+def write_dictionary(path, count, seed=3):
+    """Write count random words, weighted towards common letters, one per line."""
+    rng = random.Random(seed)
+    weights = [8, 2, 3, 4, 13, 2, 2, 6, 7, 1, 1, 4, 2, 7, 8, 2, 1, 6, 6, 9, 3, 1, 2, 1, 2, 1]
+    with open(path, "w") as file:
+        for _ in range(count):
+            file.write("".join(rng.choices(ALPHABET, weights, k=rng.randint(3, 15))) + "\n")
+
+def make_guess_orders(count, seed=2):
+    """Shuffled alphabets, one per simulated player."""
+    rng = random.Random(seed)
+    return [random_order(rng) for _ in range(count)]
+
+def legacy_game(word, guesses, max_incorrect=6):
+    """The original script's turn loop, minus input() and print()."""
+    guessed_letters = []
+    incorrect_guesses = 0
+    for guess in guesses:
+        if incorrect_guesses >= max_incorrect:
+            break
+        display = ""
+        for letter in word:
+            if letter in guessed_letters:
+                display += letter + " "
+            else:
+                display += "_ "
+        word_complete = True
+        for letter in word:
+            if letter not in guessed_letters:
+                word_complete = False
+                break
+        if word_complete:
+            return True
+        if guess in guessed_letters:
+            continue
+        guessed_letters.append(guess)
+        if guess not in word:
+            incorrect_guesses += 1
+    return False
+
+def engine_game(word, guesses, max_incorrect=6):
+    """The same game driven through HangmanGame, rendering the mask every turn."""
+    game = HangmanGame(word, max_incorrect)
+    for guess in guesses:
+        game.mask()
+        game.guess(guess)
+        if game.over:
+            break
+    return game.won
+
+def bench_engine(games=100000):
+    """Games per second of the original turn loop against HangmanGame."""
+    print(f"\nHangman engine: {games:,} simulated games")
+    words = make_words(games)
+    orders = make_guess_orders(1000)
+    work = [(word, orders[i % len(orders)]) for i, word in enumerate(words)]
+
+    start = time.perf_counter()
+    legacy_wins = sum(legacy_game(word, order) for word, order in work)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine_wins = sum(engine_game(word, order) for word, order in work)
+    engine_time = time.perf_counter() - start
+
+    print(f"   • Original loop:      {games / legacy_time:>10,.0f} games/s")
+    print(f"   • HangmanGame:        {games / engine_time:>10,.0f} games/s")
+    print(f"   • Speedup:            {legacy_time / engine_time:>10.1f}x")
+    print(f"   • Wins:               {engine_wins:>10,}" + ("" if engine_wins == legacy_wins else "  (differs!)"))
+
+def bench_words(count=500000, selections=100000, naive_selections=20):
+    """Startup and constrained selection: a plain word list against the mapped index."""
+    print(f"\nWord source: {count:,} words")
+    rng = random.Random(4)
+    with tempfile.TemporaryDirectory() as directory:
+        word_path = os.path.join(directory, "words.txt")
+        index_path = word_path + ".hwi"
+        write_dictionary(word_path, count)
+
+        start = time.perf_counter()
+        with open(word_path) as file:
+            words = [word for word in file.read().split() if word.isalpha()]
+        list_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_index(word_path, index_path)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        source = WordSource.open(index_path)
+        open_time = time.perf_counter() - start
+        print(f"   • Load word list:     {list_time * 1000:>10.1f} ms")
+        print(f"   • Build index (once): {build_time * 1000:>10.1f} ms  ({os.path.getsize(index_path) / 1e6:.1f} MB)")
+        print(f"   • Open index:         {open_time * 1000:>10.3f} ms  ({len(source):,} words)")
+
+        constraints = [(rng.randint(4, 12), rng.choice(ALPHABET[:-1])) for _ in range(selections)]  # z is excluded below
+        start = time.perf_counter()
+        for length, letter in constraints[:naive_selections]:
+            rng.choice([word for word in words if len(word) == length and letter in word])
+        naive_time = (time.perf_counter() - start) / naive_selections
+
+        start = time.perf_counter()
+        for length, letter in constraints:
+            source.choose(length=length, contains=letter, rng=rng)
+        indexed_time = (time.perf_counter() - start) / selections
+
+        start = time.perf_counter()
+        for length, letter in constraints:
+            source.choose(length=length, contains=letter + "e", excludes="z", rng=rng)
+        sampled_time = (time.perf_counter() - start) / selections
+
+        print(f"   • Filter the list:    {naive_time * 1e6:>10.1f} µs per word  (length + letter)")
+        print(f"   • Indexed choose:     {indexed_time * 1e6:>10.1f} µs per word  (length + letter)")
+        print(f"   • Sampled choose:     {sampled_time * 1e6:>10.1f} µs per word  (length + 2 letters, 1 excluded)")
+        print(f"   • Speedup:            {naive_time / indexed_time:>10,.0f}x")
+        del source
+
+def naive_solve(words, game):
+    """Refilter every word of the right length after each guess and pick the most common letter."""
+    guesses = 0
+    while not game.over:
+        guessed = set(game.guessed_letters)
+        mask = game.mask().split()
+        candidates = [word for word in words if len(word) == len(mask) and all(
+            letter == shown if shown != "_" else letter not in guessed for letter, shown in zip(word, mask))]
+        counts = Counter(letter for word in candidates for letter in set(word) if letter not in guessed)
+        letter = counts.most_common(1)[0][0] if counts else next(c for c in ALPHABET if c not in guessed)
+        game.guess(letter)
+        guesses += 1
+    return guesses
+
+def bench_solver(count=500000, games=2000, naive_games=20):
+    """Average guess latency and win rate of the bitset solver against refiltering a word list."""
+    print(f"\nHangman solver: {count:,} words, {games:,} games")
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as directory:
+        word_path = os.path.join(directory, "words.txt")
+        write_dictionary(word_path, count)
+        source = WordSource.from_word_file(word_path)
+        words = [source.word(i) for i in range(len(source))]
+        secrets = [source.choose(rng=rng) for _ in range(games)]
+        solver = HangmanSolver(source)
+
+        start = time.perf_counter()
+        for length in sorted(set(map(len, secrets))):
+            solver.index(length)
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive_guesses = sum(naive_solve(words, HangmanGame(secret)) for secret in secrets[:naive_games])
+        naive_latency = (time.perf_counter() - start) / naive_guesses
+
+        played = [HangmanGame(secret) for secret in secrets]
+        start = time.perf_counter()
+        guesses = sum(solver.play(game) for game in played)
+        latency = (time.perf_counter() - start) / guesses
+        wins = sum(game.won for game in played)
+        misses = sum(game.incorrect_guesses for game in played)
+
+        print(f"   • Build bitsets:      {index_time * 1000:>10.1f} ms  (all lengths, once)")
+        print(f"   • Refilter the list:  {naive_latency * 1e6:>10,.0f} µs per guess")
+        print(f"   • Bitset solver:      {latency * 1e6:>10,.1f} µs per guess")
+        print(f"   • Speedup:            {naive_latency / latency:>10,.0f}x")
+        print(f"   • Win rate:           {wins / games:>10.1%}  ({misses / games:.2f} wrong guesses per game)")
+        del source
+
+def bench_calibrate(count=50000, games=100, worker_counts=(1, 2, 4)):
+    """Difficulty calibration throughput as the process pool grows."""
+    print(f"\nDifficulty calibration: {count:,} words, {games} games per order strategy "
+          f"(CPUs available: {os.cpu_count()})")
+    with tempfile.TemporaryDirectory() as directory:
+        word_path = os.path.join(directory, "words.txt")
+        write_dictionary(word_path, count)
+        source = WordSource.from_word_file(word_path)
+        played = len(source) * (games * len(ORDER_STRATEGIES) + len(STRATEGIES) - len(ORDER_STRATEGIES))
+
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            losses = calibrate(word_path + ".hwi", games=games, workers=workers, shard_size=2500)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            label = f"{workers} worker{'s' if workers > 1 else ''}:"
+            print(f"   • {label:<20}{played / elapsed:>10,.0f} games/s  "
+                  f"({baseline / elapsed:.2f}x)")
+
+        source = WordSource.open(word_path + ".hwi")
+        print(f"   • Mean difficulty:    {sum(losses) / len(losses):>10.1%}")
+        print(f"   • Hard words (>90%):  {source.count(difficulty=(0.9, 1.0)):>10,}")
+        del source
+
+async def race_player(port, rooms, leader, rng, latencies):
+    """Play one seat of a race group: the leader opens each game's room, the others join it.
+
+    Guesses go out one at a time, and each latency runs from sending a
+    guess until this player's own result arrives.
+    """
+    client = await HangmanClient.connect(port=port)
+    for room in rooms:
+        if leader:
+            client.send("NEW")
+            event = await client.receive()
+            room.set_result(event[1])
+        else:
+            client.send(f"JOIN {await room}")
+            event = await client.receive()
+            if event[0] != "ROOM":
+                continue  # The race ended before this player arrived
+        room_id = event[1]
+        guessed = set(event[5]) if len(event) > 5 else set()
+
+        over = False
+        for letter in random_order(rng):
+            if over:
+                break
+            if letter in guessed:
+                continue
+            start = time.perf_counter()
+            client.send(f"GUESS {letter}")
+            while True:
+                event = await client.receive()
+                kind = event[0]
+                if kind in ("HIT", "MISS"):
+                    guessed.add(event[3])
+                    if event[2] == client.id:
+                        break
+                elif kind in ("WON", "LOST", "EXPIRED") and event[1] == room_id:
+                    over = True
+                elif kind in ("REPEAT", "ERROR"):
+                    break
+            latencies.append(time.perf_counter() - start)
+        if not over:
+            while (await client.receive())[0] not in ("WON", "LOST", "EXPIRED"):
+                pass
+    await client.close()
+
+async def hangman_load_test(source, groups, race_size, games):
+    """Run race groups against an in-process server; return (latencies, seconds, server)."""
+    server = HangmanServer(source, port=0)
+    port = await server.start()
+    loop = asyncio.get_running_loop()
+    latencies = []
+    players = []
+    for group in range(groups):
+        rooms = [loop.create_future() for _ in range(games)]
+        players.extend(race_player(port, rooms, seat == 0, random.Random(group * race_size + seat), latencies)
+                       for seat in range(race_size))
+    start = time.perf_counter()
+    await asyncio.gather(*players)
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return latencies, elapsed, server
+
+def bench_server(players=1000, race_size=4, games=5):
+    """Load-test the Hangman server with concurrent race rooms over localhost."""
+    groups = players // race_size
+    print(f"\nHangman server: {groups * race_size} players in {groups} rooms of {race_size}, {games} games each")
+    source = WordSource.from_words(make_words(20000))
+    latencies, elapsed, server = asyncio.run(hangman_load_test(source, groups, race_size, games))
+    latencies.sort()
+    print(f"   • Guesses per second: {server.guesses / elapsed:>10,.0f}")
+    print(f"   • p50 latency:        {statistics.median(latencies) * 1000:>10.2f} ms")
+    print(f"   • p99 latency:        {latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.2f} ms")
+    print(f"   • Games hosted:       {server.games_started:>10,}")
+
+BENCHMARKS = {
+    'engine': bench_engine,
+    'words': bench_words,
+    'solver': bench_solver,
+    'calibrate': bench_calibrate,
+    'server': bench_server,
+}
+
+def main():
+    """Run the benchmarks named on the command line, or all of them."""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+import asyncio
+import csv
+import math
+import os
+import random
+import sys
+import statistics
+import tempfile
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from portfolio_book import PortfolioBook
+from portfolio_export import export_portfolio
+from portfolio_import import import_holdings
+from portfolio_ledger import Ledger, LotBook
+from portfolio_store import PortfolioStore
+from portfolio_risk import RiskModel, portfolio_risk
+from price_history import PriceHistory, analyze, generate_history, portfolio_values
+from valuation_server import ValuationClient, ValuationServer
+from price_providers import CachedPriceProvider, SimulatedPriceProvider, StaticPriceProvider
+from task2 import STOCK_PRICES, StockPortfolio
+
+# Prices of the real and synthetic symbols; STOCK_PRICES itself is left untouched
+UNIVERSE_PRICES = dict(STOCK_PRICES)
+UNIVERSE_PROVIDER = StaticPriceProvider(UNIVERSE_PRICES)
+
+def make_universe(count, seed=42):
+    """Add count synthetic symbols to UNIVERSE_PRICES and return their names."""
+    rng = random.Random(seed)
+    symbols = [f"SYM{i:05d}" for i in range(count)]
+    for symbol in symbols:
+        UNIVERSE_PRICES.setdefault(symbol, round(rng.uniform(5, 500), 2))
+    return symbols
+
+def make_portfolio(symbols, seed=1):
+    """Build a portfolio holding every symbol."""
+    rng = random.Random(seed)
+    portfolio = StockPortfolio(UNIVERSE_PROVIDER)
+    for symbol in symbols:
+        portfolio.add_stock(symbol, rng.randint(1, 1000))
+    return portfolio
+
+def legacy_total(portfolio):
+    """The original calculate_total_value loop over every holding."""
+    total_value = 0.0
+    for symbol, quantity in portfolio.portfolio.items():
+        total_value += quantity * portfolio.prices[symbol]
+    return total_value
+
+def bench_incremental(positions=20000, ticks=2000):
+    """Read the total after every price tick: full recompute vs running total."""
+    print(f"\nTotal value after each of {ticks} price ticks on {positions} positions")
+    symbols = make_universe(positions)
+    portfolio = make_portfolio(symbols)
+    rng = random.Random(5)
+    tick_list = [(rng.choice(symbols), round(rng.uniform(5, 500), 2)) for _ in range(ticks)]
+
+    start = time.perf_counter()
+    for symbol, price in tick_list:
+        portfolio.prices[symbol] = price
+        legacy_total(portfolio)
+    legacy = time.perf_counter() - start
+
+    portfolio = make_portfolio(symbols)
+    start = time.perf_counter()
+    for symbol, price in tick_list:
+        portfolio.update_price(symbol, price)
+        portfolio.calculate_total_value()
+    incremental = time.perf_counter() - start
+
+    drift = abs(portfolio.total_value - portfolio.recalculate_total_value())
+    print(f"   • Recompute everything: {ticks / legacy:>12.0f} ticks/s")
+    print(f"   • Running aggregates:   {ticks / incremental:>12.0f} ticks/s ({legacy / incremental:.0f}x)")
+    print(f"   • Rounding drift:       {drift:>12.2e}")
+
+def make_portfolios(symbols, count, holdings=20, seed=3):
+    """Build count portfolios, each holding a random handful of symbols."""
+    rng = random.Random(seed)
+    portfolios = []
+    for _ in range(count):
+        portfolio = StockPortfolio(UNIVERSE_PROVIDER)
+        for symbol in rng.sample(symbols, rng.randint(1, holdings * 2)):
+            portfolio.add_stock(symbol, rng.randint(1, 1000))
+        portfolios.append(portfolio)
+    return portfolios
+
+def bench_book(portfolios=10000, symbols=5000, ticks=5):
+    """Revalue every portfolio on each price tick: dict loops vs the sparse book."""
+    print(f"\nRevaluing {portfolios} portfolios x {symbols} symbols per tick")
+    universe = make_universe(symbols)
+    objects = make_portfolios(universe, portfolios)
+
+    start = time.perf_counter()
+    book = PortfolioBook.from_portfolios(objects, symbols=universe)
+    print(f"   • Build book:        {time.perf_counter() - start:>10.2f} s ({len(book.quantities)} holdings)")
+
+    rng = random.Random(9)
+    price_ticks = [{symbol: UNIVERSE_PRICES[symbol] * rng.uniform(0.95, 1.05) for symbol in universe}
+                   for _ in range(ticks)]
+
+    start = time.perf_counter()
+    for prices in price_ticks:
+        legacy = [sum(quantity * prices[symbol] for symbol, quantity in portfolio.portfolio.items())
+                  for portfolio in objects]
+    loop_rate = ticks / (time.perf_counter() - start)
+
+    vectors = [book.price_vector(prices) for prices in price_ticks]
+    start = time.perf_counter()
+    for vector in vectors:
+        totals = book.revalue(vector)
+    book_rate = ticks / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    book.pnl(vectors[0], vectors[1])
+    book.symbol_pnl(vectors[0], vectors[1])
+    pnl_time = time.perf_counter() - start
+
+    error = max(abs(a - b) for a, b in zip(legacy, totals))
+    print(f"   • Per-object loops:  {loop_rate:>10.2f} ticks/s")
+    print(f"   • Sparse book:       {book_rate:>10.2f} ticks/s ({book_rate / loop_rate:.1f}x)")
+    print(f"   • Portfolio + symbol P&L: {pnl_time * 1000:>5.0f} ms")
+    print(f"   • Max difference:    {error:>10.2e}")
+
+def bench_quotes(valuations=1000, latency=0.05, threads=100):
+    """Value many AAPL holdings at once: direct provider calls vs the coalescing cache."""
+    print(f"\n{valuations} concurrent AAPL valuations, {latency * 1000:.0f} ms upstream latency")
+
+    def run(provider):
+        def value(_):
+            portfolio = StockPortfolio(provider)
+            portfolio.add_stock("AAPL", 10)
+            return portfolio.calculate_total_value()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(value, range(valuations)))
+        return time.perf_counter() - start
+
+    direct = SimulatedPriceProvider(STOCK_PRICES, latency=latency, seed=1)
+    direct_time = run(direct)
+
+    upstream = SimulatedPriceProvider(STOCK_PRICES, latency=latency, seed=1)
+    cached = CachedPriceProvider(upstream, ttl=60)
+    cached_time = run(cached)
+
+    print(f"   • Direct:    {direct.fetch_calls:>5} fetches  {direct_time:>6.2f} s")
+    print(f"   • Coalesced: {upstream.fetch_calls:>5} fetches  {cached_time:>6.2f} s "
+          f"({cached.hits} hits, {cached.coalesced} coalesced)")
+
+def legacy_save(portfolio, txt_path, csv_path):
+    """The original save_to_txt + save_to_csv: two walks, one write per row."""
+    with open(txt_path, 'w') as file:
+        for symbol, quantity in portfolio.portfolio.items():
+            price = portfolio.prices[symbol]
+            file.write(f"{symbol:<8} {quantity:<10} ${price:<9.2f} ${portfolio.market_values[symbol]:<14.2f}\n")
+    with open(csv_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for symbol, quantity in portfolio.portfolio.items():
+            writer.writerow([symbol, quantity, portfolio.prices[symbol], portfolio.market_values[symbol]])
+
+def bench_export(positions=300000):
+    """Export throughput in MB/s for each format and for the one-pass fan-out."""
+    print(f"\nExporting {positions} holdings")
+    portfolio = make_portfolio(make_universe(positions))
+
+    with tempfile.TemporaryDirectory() as directory:
+        def path(name):
+            return os.path.join(directory, name)
+
+        start = time.perf_counter()
+        legacy_save(portfolio, path("legacy.txt"), path("legacy.csv"))
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path("legacy.txt")) + os.path.getsize(path("legacy.csv"))
+        print(f"   • {'Row-at-a-time txt + csv':<40} {size / elapsed / 1e6:>7.1f} MB/s  {elapsed:>5.2f} s")
+
+        runs = [["report.txt"], ["report.csv"], ["report.pcol"],
+                ["report.txt", "report.csv"], ["report.txt", "report.csv", "report.pcol"],
+                ["report.csv.gz"], ["report.pcol.gz"]]
+        for names in runs:
+            start = time.perf_counter()
+            sizes = export_portfolio(portfolio, [path(name) for name in names])
+            elapsed = time.perf_counter() - start
+            size = sum(sizes.values())
+            print(f"   • {' + '.join(names):<40} {size / elapsed / 1e6:>7.1f} MB/s  {elapsed:>5.2f} s "
+                  f"({size / 1e6:.1f} MB)")
+
+def write_trades(path, symbols, rows, seed):
+    """Write a synthetic broker export of buy and sell trades."""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Symbol', 'Side', 'Quantity'])
+        writer.writerows((rng.choice(symbols), 'SELL' if rng.random() < 0.2 else 'BUY', rng.randint(1, 100))
+                         for _ in range(rows))
+
+def bench_import(rows=2000000, files=4, symbols=5000):
+    """Load trade files: add_stock per row vs the bulk importer, serial and parallel."""
+    print(f"\nImporting {rows} trade rows from {files} files over {symbols} symbols")
+    universe = make_universe(symbols)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"trades{i}.csv") for i in range(files)]
+        for i, path in enumerate(paths):
+            write_trades(path, universe, rows // files, seed=i)
+
+        portfolio = StockPortfolio(UNIVERSE_PROVIDER)
+        start = time.perf_counter()
+        for path in paths:
+            with open(path, newline='') as file:
+                for symbol, side, quantity in islice(csv.reader(file), 1, None):
+                    if side == 'SELL':
+                        portfolio.remove_stock(symbol, int(quantity))
+                    else:
+                        portfolio.add_stock(symbol, int(quantity))
+        elapsed = time.perf_counter() - start
+        print(f"   • add_stock per row:    {rows / elapsed:>12,.0f} rows/s")
+
+        for processes in (None, files):
+            portfolio = StockPortfolio(UNIVERSE_PROVIDER)
+            report = import_holdings(portfolio, paths, processes=processes)
+            label = f"{processes} processes" if processes else "1 process"
+            print(f"   • Bulk, {label + ':':<15} {report.rows_per_second:>12,.0f} rows/s "
+                  f"({report.accepted} accepted, {report.rejected} rejected)")
+
+def bench_store(portfolios=100000, holdings=10, symbols=5000):
+    """Store many portfolios in SQLite and query them without loading them."""
+    print(f"\nSQLite store with {portfolios} portfolios of ~{holdings} holdings")
+    universe = make_universe(symbols)
+    rng = random.Random(11)
+    items = [(f"portfolio_{i}", {symbol: rng.randint(1, 1000)
+                                 for symbol in rng.sample(universe, rng.randint(1, holdings * 2))})
+             for i in range(portfolios)]
+    row_count = sum(len(holding) for _, holding in items)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = PortfolioStore(os.path.join(directory, "bench.db"))
+        start = time.perf_counter()
+        store.save_many(items)
+        store.update_prices({symbol: UNIVERSE_PRICES[symbol] for symbol in universe})
+        elapsed = time.perf_counter() - start
+        print(f"   • Batched save:       {elapsed:>8.2f} s ({row_count / elapsed:,.0f} holdings/s)")
+
+        target = universe[0]
+        start = time.perf_counter()
+        holders = store.portfolios_holding(target)
+        query = time.perf_counter() - start
+        start = time.perf_counter()
+        scan = [name for name, holding in items if target in holding]
+        in_python = time.perf_counter() - start
+        assert holders == scan
+        print(f"   • Who holds {target}: {query * 1000:>8.2f} ms ({len(holders)} portfolios; "
+              f"scan of objects already in memory {in_python * 1000:.1f} ms)")
+
+        start = time.perf_counter()
+        top = store.top_by_value(100)
+        print(f"   • Top 100 by value:   {(time.perf_counter() - start) * 1000:>8.0f} ms (best {top[0][1]:,.2f})")
+
+        start = time.perf_counter()
+        for name, _ in top:
+            store.get(name).holdings
+        print(f"   • Lazy-load top 100:  {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            store.record_transactions(f"portfolio_{i}", [(rng.choice(universe), rng.randint(-50, 50), 1.0)])
+        print(f"   • 1000 trade commits: {time.perf_counter() - start:>8.2f} s")
+        store.close()
+
+def bench_ledger(events=10000000, symbols=50, snapshot_interval=1000000):
+    """Append trades to the ledger, then rebuild state with and without snapshots."""
+    print(f"\nLedger with {events:,} events over {symbols} symbols, snapshot every {snapshot_interval:,}")
+    names = [f"SYM{i:05d}" for i in range(symbols)]
+    rng = random.Random(13)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "ledger")
+        ledger = Ledger(path, snapshot_interval)
+        start = time.perf_counter()
+        for i in range(events):
+            symbol = rng.choice(names)
+            quantity = rng.randint(1, 100)
+            if rng.random() < 0.5:
+                quantity = -min(quantity, ledger.book.quantity(symbol))
+            if quantity:
+                ledger.record(symbol, quantity, rng.uniform(50, 150), timestamp=float(i))
+        ledger.log.flush()
+        elapsed = time.perf_counter() - start
+        recorded = len(ledger.log)
+        print(f"   • Append:                {recorded / elapsed:>12,.0f} events/s "
+              f"({os.path.getsize(path) / 1e6:,.0f} MB, {len(ledger._snapshot_counts)} snapshots)")
+
+        start = time.perf_counter()
+        full = LotBook().replay(ledger.log.events(), ledger.symbols)
+        elapsed = time.perf_counter() - start
+        print(f"   • Full replay (mmap):    {recorded / elapsed:>12,.0f} events/s ({elapsed:.2f} s)")
+
+        start = time.perf_counter()
+        latest = ledger.state_at(float(events))
+        print(f"   • Latest state:          {(time.perf_counter() - start) * 1000:>12.1f} ms with snapshots")
+        start = time.perf_counter()
+        ledger.state_at(events / 2 + 0.5)
+        print(f"   • State at midpoint:     {(time.perf_counter() - start) * 1000:>12.1f} ms with snapshots")
+
+        assert latest.holdings() == full.holdings() == ledger.book.holdings()
+        ledger.close()
+
+        start = time.perf_counter()
+        Ledger(path, snapshot_interval).close()
+        print(f"   • Reopen ledger:         {(time.perf_counter() - start) * 1000:>12.1f} ms")
+
+def bench_history(symbols=2000, years=10, queries=1000):
+    """Range queries and portfolio analytics over a memory-mapped price history."""
+    days = 252 * years
+    print(f"\nPrice history: {symbols} symbols x {days} days")
+    universe = make_universe(symbols)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        history = generate_history(directory, {symbol: UNIVERSE_PRICES[symbol] for symbol in universe},
+                                   days=days, seed=17)
+        print(f"   • Generate:              {time.perf_counter() - start:>10.2f} s "
+              f"({symbols * days * 8 / 1e6:.0f} MB)")
+
+        rng = random.Random(19)
+        ranges = []
+        for _ in range(queries):
+            first = rng.randrange(days - 252)
+            ranges.append((rng.choice(universe), history.date(first), history.date(first + 251)))
+
+        start = time.perf_counter()
+        for symbol, first, last in ranges:
+            history.column(symbol, first, last)
+        elapsed = time.perf_counter() - start
+        print(f"   • 1-year range (cold):   {elapsed / queries * 1e6:>10.1f} µs/query")
+
+        start = time.perf_counter()
+        for symbol, first, last in ranges:
+            max(history.column(symbol, first, last))
+        elapsed = time.perf_counter() - start
+        print(f"   • 1-year max (warm):     {elapsed / queries * 1e6:>10.1f} µs/query")
+
+        # The usual alternative: one wide CSV row per day, parsed before any query
+        csv_path = os.path.join(directory, "history.csv")
+        columns = [history.column(symbol) for symbol in universe]
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['date'] + universe)
+            writer.writerows([history.date(i).isoformat()] + [column[i] for column in columns]
+                             for i in range(days))
+
+        holdings = {symbol: rng.randint(1, 500) for symbol in rng.sample(universe, 20)}
+        start = time.perf_counter()
+        with open(csv_path, newline='') as file:
+            rows = [{symbol: float(row[symbol]) for symbol in holdings} for row in csv.DictReader(file)]
+        legacy = [sum(quantity * row[symbol] for symbol, quantity in holdings.items()) for row in rows]
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        values = portfolio_values(PriceHistory(directory), holdings)
+        column_time = time.perf_counter() - start
+        assert max(abs(a - b) for a, b in zip(legacy, values)) < 1e-6 * max(values)
+        print(f"   • {years}y value from CSV:    {csv_time * 1000:>10.2f} ms")
+        print(f"   • {years}y value, cold store: {column_time * 1000:>10.2f} ms ({csv_time / column_time:.0f}x)")
+
+        start = time.perf_counter()
+        stats = analyze(history, holdings)
+        print(f"   • Full analytics:        {(time.perf_counter() - start) * 1000:>10.2f} ms "
+              f"(return {stats['total_return']:.1%}, vol {stats['volatility']:.1%}, "
+              f"max drawdown {stats['max_drawdown']:.1%})")
+
+def naive_var(portfolio, model, paths, confidence, seed):
+    """Per-path loops over the holdings, as a baseline for the risk engine."""
+    rng = random.Random(seed)
+    symbols = list(portfolio.portfolio)
+    lower = model.lower
+    scale = [model.volatilities[model.symbol_index[symbol]] / 252 ** 0.5 for symbol in symbols]
+    outcomes = []
+    for _ in range(paths):
+        shocks = [rng.gauss(0.0, 1.0) for _ in symbols]
+        pnl = 0.0
+        for i, symbol in enumerate(symbols):
+            correlated = sum(lower[i][j] * shocks[j] for j in range(i + 1))
+            pnl += portfolio.market_values[symbol] * (math.exp(scale[i] * correlated - scale[i] ** 2 / 2) - 1)
+        outcomes.append(pnl)
+    outcomes.sort()
+    return -outcomes[int(paths * (1 - confidence)) - 1]
+
+def bench_risk(paths=400000, holdings=20, naive_paths=20000):
+    """Monte Carlo VaR: naive per-path loops vs column blocks on 1, 2, 4 and 8 workers."""
+    print(f"\n99% 1-day VaR, {holdings} correlated holdings, {paths:,} paths ({os.cpu_count()} CPUs)")
+    universe = make_universe(holdings)
+    portfolio = make_portfolio(universe)
+    model = RiskModel.constant(universe)
+
+    start = time.perf_counter()
+    naive = naive_var(portfolio, model, naive_paths, 0.99, seed=1)
+    naive_rate = naive_paths / (time.perf_counter() - start)
+    print(f"   • Per-path loops:   {naive_rate:>10,.0f} paths/s (VaR {naive:,.0f} from {naive_paths:,} paths)")
+
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        report = portfolio_risk(portfolio, model=model, paths=paths, workers=workers, seed=7)
+        rate = paths / (time.perf_counter() - start)
+        top = max(report.contributions, key=report.contributions.get)
+        print(f"   • {workers} worker{'s' if workers > 1 else ' '}:        {rate:>10,.0f} paths/s "
+              f"(VaR {report.var:,.0f}, CVaR {report.cvar:,.0f}, top contributor {top}, "
+              f"{rate / naive_rate:.1f}x)")
+
+async def run_valuation_client(port, requests, latencies):
+    """Send valuations one after another, recording each round trip."""
+    client = await ValuationClient.connect(port=port)
+    for holdings in requests:
+        start = time.perf_counter()
+        await client.value(holdings)
+        latencies.append(time.perf_counter() - start)
+    await client.close()
+
+async def valuation_load_test(server, clients, requests):
+    """Run many concurrent clients against an in-process valuation server."""
+    port = await server.start()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_valuation_client(port, batch, latencies) for batch in requests))
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return latencies, elapsed
+
+def bench_service(clients=500, requests=20, holdings=20, symbols=2000):
+    """Load-test the valuation service with and without micro-batching."""
+    print(f"\nValuation service: {clients} concurrent clients x {requests} requests, ~{holdings} holdings each")
+    universe = make_universe(symbols)
+    rng = random.Random(21)
+    workload = [[{symbol: rng.randint(1, 1000) for symbol in rng.sample(universe, rng.randint(1, holdings * 2))}
+                 for _ in range(requests)] for _ in range(clients)]
+
+    servers = (("One request per pass", ValuationServer(UNIVERSE_PROVIDER, port=0, batch_window=0, max_batch=1)),
+               ("Micro-batched (2 ms)", ValuationServer(UNIVERSE_PROVIDER, port=0, batch_window=0.002)))
+    for label, server in servers:
+        latencies, elapsed = asyncio.run(valuation_load_test(server, clients, workload))
+        latencies.sort()
+        print(f"   • {label}: {len(latencies) / elapsed:>8,.0f} req/s  "
+              f"p50 {statistics.median(latencies) * 1000:>6.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>6.2f} ms  "
+              f"(mean batch {server.mean_batch_size:.0f})")
+
+BENCHMARKS = {
+    'incremental': bench_incremental,
+    'book': bench_book,
+    'quotes': bench_quotes,
+    'export': bench_export,
+    'import': bench_import,
+    'store': bench_store,
+    'ledger': bench_ledger,
+    'history': bench_history,
+    'risk': bench_risk,
+    'service': bench_service,
+}
+
+def main():
+    """Run the benchmarks named on the command line, or all of them."""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
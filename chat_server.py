@@ -0,0 +1,132 @@
+import asyncio
+import sys
+
+from task4 import HELP_MESSAGE, ChatSession, SimpleChatbot
+
+class ChatServer:
+    """Line-protocol chat server where many sessions share one chatbot.
+
+    The chatbot only supplies the compiled response table; every connection
+    gets its own ChatSession. Each turn is answered with one or more lines
+    followed by an empty line, so clients know when the reply is complete.
+    """
+    def __init__(self, bot=None, host="127.0.0.1", port=8765, typing_delay=0.0):
+        self.bot = bot or SimpleChatbot()
+        self.host = host
+        self.port = port
+        self.typing_delay = typing_delay
+        self.active_sessions = 0
+        self.total_sessions = 0
+        self.server = None
+
+        # Build the matcher up front instead of inside the first session
+        self.bot.matcher
+
+    async def start(self):
+        """Start listening and return the port actually bound."""
+        # A deep backlog lets bursts of new sessions connect without SYN retries
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Run the server until it is cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def send_line(self, writer, text):
+        """Send one line, streaming it character by character if typing is enabled."""
+        if self.typing_delay:
+            for char in text:
+                writer.write(char.encode())
+                await writer.drain()
+                await asyncio.sleep(self.typing_delay)
+            writer.write(b"\n")
+        else:
+            writer.write(text.encode() + b"\n")
+
+    async def send_reply(self, writer, lines):
+        """Send a complete reply block."""
+        for line in lines:
+            await self.send_line(writer, line)
+        writer.write(b"\n")
+        await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        """Run one chat session over a connection."""
+        bot = self.bot
+        session = ChatSession()
+        self.active_sessions += 1
+        self.total_sessions += 1
+
+        try:
+            await self.send_reply(writer, [
+                f"{bot.name}: Hello! I'm your friendly rule-based chatbot assistant!",
+                f"{bot.name}: Type 'help' for assistance or 'quit' to exit.",
+            ])
+
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit; readline has already discarded it
+                    await self.send_reply(writer, [f"{bot.name}: That message is too long for me! "
+                                                   "Try something shorter."])
+                    continue
+                if not line:
+                    break
+                user_input = line.decode(errors="replace").strip()
+
+                if not user_input:
+                    await self.send_reply(writer, [f"{bot.name}: Please say something! I'm here to chat! 😊"])
+                    continue
+
+                normalized_input = bot.normalize_input(user_input)
+                if normalized_input in ['help', 'assist', 'commands']:
+                    # Blank lines would end the reply block early
+                    await self.send_reply(writer, [line for line in HELP_MESSAGE.split("\n") if line])
+                    continue
+
+                response, name_prompt, done = bot.handle_turn(user_input, normalized_input, session)
+                lines = [f"{bot.name}: {response}"]
+                if name_prompt:
+                    lines.append(f"{bot.name}: {name_prompt}")
+                await self.send_reply(writer, lines)
+
+                if done:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.active_sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+def main():
+    """Run the chat server on the port given on the command line."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = ChatServer(port=port)
+
+    async def run():
+        await server.start()
+        print(f"Chat server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"\nServed {server.total_sessions} sessions. Goodbye!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from hangman_solver import HangmanSolver
+from hangman_words import LETTER_BITS, LETTERS, WordSource, write_difficulty
+from task1 import HangmanGame
+
+# Relative letter frequencies used by the "frequency" strategy
+LETTER_WEIGHTS = dict(zip(LETTERS, [8.2, 1.5, 2.8, 4.3, 12.7, 2.2, 2.0, 6.1, 7.0, 0.2, 0.8, 4.0, 2.4,
+                                    6.7, 7.5, 1.9, 0.1, 6.0, 6.3, 9.1, 2.8, 1.0, 2.4, 0.2, 2.0, 0.1]))
+
+def random_order(rng):
+    """Every letter once, in a uniformly random order."""
+    return rng.sample(LETTERS, len(LETTERS))
+
+def frequency_order(rng):
+    """Every letter once, common letters tending to come first (weighted sampling without replacement)."""
+    return sorted(LETTERS, key=lambda letter: -rng.random() ** (1 / LETTER_WEIGHTS[letter]))
+
+# Strategies that guess in a fixed order drawn once per game
+ORDER_STRATEGIES = {"random": random_order, "frequency": frequency_order}
+
+# "solver" is the deterministic HangmanSolver, so one game per word decides it
+STRATEGIES = (*ORDER_STRATEGIES, "solver")
+
+def _lost(mask, order, max_incorrect):
+    """Whether guessing letter bits in order loses a word with this letter mask.
+
+    The same outcome as playing a HangmanGame with that order, reduced to
+    bitmask operations.
+    """
+    misses = 0
+    for bit in order:
+        if mask & bit:
+            mask ^= bit
+            if not mask:
+                return False
+        else:
+            misses += 1
+            if misses == max_incorrect:
+                return True
+    return True
+
+# Solvers kept between shards: index path -> ((mtime, size) of the file it was built from, solver)
+_solvers = {}
+
+def calibrate_shard(index_path, start, stop, games, strategies, max_incorrect, seed):
+    """Loss probability of word ids start..stop, averaged over strategies.
+
+    Runs in a worker process. Each order strategy draws one batch of games
+    guess orders from the shard's seed, and every word in the shard is
+    played against that same batch.
+    """
+    source = WordSource.open(index_path)
+    rng = random.Random(seed)
+    batches = [[[LETTER_BITS[letter] for letter in ORDER_STRATEGIES[name](rng)] for _ in range(games)]
+               for name in strategies if name in ORDER_STRATEGIES]
+    solver = None
+    if "solver" in strategies:
+        # With one worker this runs in the caller's process, where the index may have been rebuilt since
+        stat = os.stat(index_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _solvers.get(index_path)
+        if cached is not None and cached[0] == version:
+            solver = cached[1]
+        else:
+            solver = HangmanSolver(source)
+            _solvers[index_path] = (version, solver)
+
+    losses = array("d")
+    for word_id in range(start, stop):
+        mask = source.mask(word_id)
+        total = sum(sum(_lost(mask, order, max_incorrect) for order in orders) / games for orders in batches)
+        if solver is not None:
+            game = HangmanGame(source.word(word_id), max_incorrect)
+            solver.play(game)
+            total += game.lost
+        losses.append(total / len(strategies))
+    return losses
+
+def calibrate(index_path, games=200, strategies=STRATEGIES, max_incorrect=6, shard_size=5000,
+              workers=None, seed=0):
+    """Estimate every word's difficulty and save it next to the index.
+
+    The dictionary is split into shards of shard_size word ids, which run
+    in a process pool of workers (all CPUs by default). Shard i is always
+    seeded from (seed, i), so the scores do not depend on the number of
+    workers. Returns the loss probabilities in word id order.
+    """
+    if not strategies:
+        raise ValueError("At least one strategy is needed")
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
+    count = len(WordSource.open(index_path))
+    workers = workers or os.cpu_count()
+    shards = [(index_path, start, min(start + shard_size, count), games, tuple(strategies), max_incorrect,
+               f"{seed}-{i}") for i, start in enumerate(range(0, count, shard_size))]
+
+    losses = array("d")
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            for shard in pool.map(calibrate_shard, *zip(*shards)):
+                losses.extend(shard)
+    else:
+        for shard in shards:
+            losses.extend(calibrate_shard(*shard))
+    write_difficulty(index_path, losses, games, max_incorrect)
+    return losses
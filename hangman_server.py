@@ -0,0 +1,298 @@
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+
+from hangman_words import WordSource
+from task1 import DEFAULT_WORDS, HIT, REPEATED, HangmanGame
+
+class Player:
+    """One connection: its writer and the room it is playing in."""
+    __slots__ = ("id", "writer", "room")
+
+    def __init__(self, player_id, writer):
+        self.id = player_id
+        self.writer = writer
+        self.room = None
+
+class Room:
+    """One shared word and the players racing to reveal it."""
+    __slots__ = ("id", "game", "players", "last_active")
+
+    def __init__(self, room_id, game, now):
+        self.id = room_id
+        self.game = game
+        self.players = []
+        self.last_active = now
+
+class HangmanServer:
+    """Line-protocol server hosting many Hangman rooms in one process.
+
+    Commands, one per line:
+        NEW [length]     start a room with a new word and join it
+        JOIN <room>      join a running room and race its players
+        GUESS <letter>   guess for the current room
+        QUIT             close the connection
+    Events, one per line, start with their type and room:
+        ROOM <room> <mask> <incorrect> <max> [guessed]   sent on NEW and JOIN
+        JOINED/LEFT <room> <player>
+        HIT <room> <player> <letter> <mask>
+        MISS <room> <player> <letter> <incorrect>
+        WON <room> <player> <word>, LOST <room> <word>, EXPIRED <room> <word>
+        REPEAT <room> <letter>, ERROR <message>   (to the sender only)
+    HIT, MISS and the game's end are broadcast to every player in the
+    room; each is encoded once and written to every connection. Players
+    whose unsent output exceeds max_buffer are disconnected rather than
+    allowed to hold the room back.
+
+    Rooms are kept in least-recently-active order, so evicting rooms idle
+    for idle_timeout seconds only looks at the rooms it evicts.
+    """
+    def __init__(self, source=None, host="127.0.0.1", port=8767, max_incorrect=6, idle_timeout=300.0,
+                 max_buffer=64 * 1024, clock=time.monotonic):
+        self.source = source or DEFAULT_WORDS
+        self.host = host
+        self.port = port
+        self.max_incorrect = max_incorrect
+        self.idle_timeout = idle_timeout
+        self.max_buffer = max_buffer
+        self.clock = clock
+        self.rooms = OrderedDict()  # room id -> Room, least recently active first
+        self.active_connections = 0
+        self.games_started = 0
+        self.guesses = 0
+        self.evicted = 0
+        self.server = None
+        self._next_room = 1
+        self._next_player = 1
+        self._reaper = None
+
+    async def start(self):
+        """Start listening and evicting idle rooms; return the port actually bound."""
+        self._reaper = asyncio.create_task(self._evict_periodically())
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Run the server until it is cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and stop evicting."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+
+    async def _evict_periodically(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 2, 5.0))
+            self.evict_idle()
+
+    def evict_idle(self):
+        """Close every room with no guesses or joins for idle_timeout seconds."""
+        deadline = self.clock() - self.idle_timeout
+        while self.rooms:
+            room = next(iter(self.rooms.values()))
+            if room.last_active > deadline:
+                break
+            self.evicted += 1
+            self._end(room, f"EXPIRED {room.id} {room.game.word}")
+
+    def send(self, player, text):
+        player.writer.write(text.encode() + b"\n")
+
+    def broadcast(self, room, text):
+        """Write one event to every player in a room, dropping players that have stopped reading."""
+        data = text.encode() + b"\n"
+        for player in room.players:
+            transport = player.writer.transport
+            if transport.get_write_buffer_size() > self.max_buffer:
+                transport.abort()
+            else:
+                player.writer.write(data)
+
+    def _touch(self, room):
+        room.last_active = self.clock()
+        self.rooms.move_to_end(room.id)
+
+    def _end(self, room, text):
+        """Announce the end of a room's game and close the room."""
+        self.broadcast(room, text)
+        for player in room.players:
+            player.room = None
+        room.players = []
+        del self.rooms[room.id]
+
+    def leave(self, player):
+        room = player.room
+        if room is None:
+            return
+        player.room = None
+        room.players.remove(player)
+        if room.players:
+            self.broadcast(room, f"LEFT {room.id} {player.id}")
+        else:
+            del self.rooms[room.id]
+
+    def _join(self, player, room):
+        self.leave(player)
+        self.broadcast(room, f"JOINED {room.id} {player.id}")
+        room.players.append(player)
+        player.room = room
+        self._touch(room)
+        game = room.game
+        self.send(player, f"ROOM {room.id} {game.mask().replace(' ', '')} {game.incorrect_guesses} "
+                          f"{game.max_incorrect} {''.join(game.guessed_letters)}".rstrip())
+
+    def new_room(self, player, arguments):
+        """NEW [length]: pick a word and start a room for it."""
+        try:
+            length = int(arguments[0]) if arguments else None
+            if length is not None and length < 1:
+                raise ValueError(f"Length must be at least 1, not {length}")
+            word = self.source.choose(length=length)
+        except ValueError as e:
+            self.send(player, f"ERROR {e}")
+            return
+        room = Room(self._next_room, HangmanGame(word, self.max_incorrect), self.clock())
+        self._next_room += 1
+        self.games_started += 1
+        self.rooms[room.id] = room
+        self._join(player, room)
+
+    def join_room(self, player, arguments):
+        """JOIN <room>: race the players already in a room."""
+        room = self.rooms.get(int(arguments[0])) if arguments and arguments[0].isdigit() else None
+        if room is None:
+            self.send(player, "ERROR No such room")
+        elif room is not player.room:
+            self._join(player, room)
+
+    def guess(self, player, arguments):
+        """GUESS <letter>: apply a guess to the shared game and tell the whole room."""
+        room = player.room
+        if room is None:
+            self.send(player, "ERROR Not in a room")
+            return
+        letter = arguments[0].lower() if arguments else ""
+        game = room.game
+        try:
+            result = game.guess(letter)
+        except ValueError as e:
+            self.send(player, f"ERROR {e}")
+            return
+
+        self.guesses += 1
+        self._touch(room)
+        if result == REPEATED:
+            self.send(player, f"REPEAT {room.id} {letter}")
+        elif result == HIT:
+            self.broadcast(room, f"HIT {room.id} {player.id} {letter} {game.mask().replace(' ', '')}")
+        else:
+            self.broadcast(room, f"MISS {room.id} {player.id} {letter} {game.incorrect_guesses}")
+
+        if game.won:
+            self._end(room, f"WON {room.id} {player.id} {game.word}")
+        elif game.lost:
+            self._end(room, f"LOST {room.id} {game.word}")
+
+    async def handle_client(self, reader, writer):
+        """Read commands from one player until they quit or disconnect."""
+        player = Player(self._next_player, writer)
+        self._next_player += 1
+        self.active_connections += 1
+        commands = {"NEW": self.new_room, "JOIN": self.join_room, "GUESS": self.guess}
+
+        try:
+            self.send(player, f"WELCOME {player.id}")
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit; readline has already discarded it
+                    self.send(player, "ERROR Line too long")
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                parts = line.decode(errors="replace").split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == "QUIT":
+                    break
+                handler = commands.get(command)
+                if handler is None:
+                    self.send(player, f"ERROR Unknown command {parts[0][:20]}")
+                else:
+                    # A bad command costs its sender an error line, not the connection
+                    try:
+                        handler(player, parts[1:])
+                    except Exception as e:
+                        self.send(player, f"ERROR {command} failed: {e}")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active_connections -= 1
+            self.leave(player)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+class HangmanClient:
+    """Minimal client that sends commands and reads events as lists of words."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.id = None
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8767):
+        client = cls(*await asyncio.open_connection(host, port))
+        client.id = (await client.receive())[1]
+        return client
+
+    def send(self, command):
+        self.writer.write(command.encode() + b"\n")
+
+    async def receive(self):
+        """The next event, split into words; empty once the server has closed the connection."""
+        return (await self.reader.readline()).decode().split()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+def main():
+    """Run the Hangman server on the port given on the command line, with an optional dictionary file."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8767
+    source = None
+    if len(sys.argv) > 2:
+        source = WordSource.from_word_file(sys.argv[2])
+    server = HangmanServer(source, port=port)
+
+    async def run():
+        await server.start()
+        print(f"Hangman server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"\nHosted {server.games_started} games ({server.guesses} guesses). Goodbye!")
+
+if __name__ == "__main__":
+    main()
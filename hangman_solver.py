@@ -0,0 +1,123 @@
+from hangman_words import LETTER_BITS, LETTERS
+
+# Guess order used once no dictionary word fits what has been revealed
+FALLBACK_ORDER = "etaoinsrhldcumfpgwybvkxjqz"
+
+class LengthIndex:
+    """Bitsets over the dictionary words of one length.
+
+    Bit i stands for word id start + i of the WordSource. letters[c] has
+    the words containing letter c, and positions[p][c] the words with
+    letter c at position p. Python ints serve as the bitsets, so narrowing
+    a candidate set is one & per constraint, run in C over the whole set.
+    """
+    __slots__ = ("length", "start", "size", "everything", "letters", "positions")
+
+    def __init__(self, source, length):
+        start, stop = source.length_range(length)
+        size = stop - start
+        width = (size + 7) // 8
+        letter_index = {letter: i for i, letter in enumerate(LETTERS)}
+
+        # Set the bits in bytearrays first; growing ints bit by bit would be quadratic
+        letters = [bytearray(width) for _ in LETTERS]
+        positions = [[bytearray(width) for _ in LETTERS] for _ in range(length)]
+        for i in range(size):
+            byte, bit = i >> 3, 1 << (i & 7)
+            for position, letter in enumerate(source.word(start + i)):
+                index = letter_index[letter]
+                letters[index][byte] |= bit
+                positions[position][index][byte] |= bit
+
+        self.length = length
+        self.start = start
+        self.size = size
+        self.everything = (1 << size) - 1
+        self.letters = [int.from_bytes(bits, "little") for bits in letters]
+        self.positions = [[int.from_bytes(bits, "little") for bits in row] for row in positions]
+
+class SolverState:
+    """What the solver knows during one game: the surviving candidates and the letters tried."""
+    __slots__ = ("index", "candidates", "guessed", "hidden")
+
+    def __init__(self, index):
+        self.index = index
+        self.candidates = index.everything
+        self.guessed = 0  # Bitmask of LETTER_BITS
+        self.hidden = (1 << index.length) - 1  # Bitmask of unrevealed positions
+
+    @property
+    def remaining(self):
+        """Number of dictionary words still consistent with the game."""
+        return self.candidates.bit_count()
+
+    def words(self, source):
+        """The surviving candidates as words."""
+        candidates, start = self.candidates, self.index.start
+        return [source.word(start + i) for i in range(self.index.size) if candidates >> i & 1]
+
+    def next_guess(self):
+        """The untried letter found in the most surviving candidates."""
+        candidates, guessed, letters = self.candidates, self.guessed, self.index.letters
+        best, best_count = None, 0
+        for i, letter in enumerate(LETTERS):
+            if not guessed >> i & 1:
+                count = (candidates & letters[i]).bit_count()
+                if count > best_count:
+                    best, best_count = letter, count
+        if best is None:
+            best = next(letter for letter in FALLBACK_ORDER if not guessed & LETTER_BITS[letter])
+        return best
+
+    def observe(self, letter, positions):
+        """Narrow the candidates with a guess's outcome: the positions it filled, empty for a miss."""
+        bit = LETTER_BITS[letter]
+        index = bit.bit_length() - 1
+        self.guessed |= bit
+        if not positions:
+            self.candidates &= ~self.index.letters[index]
+            return
+
+        filled = 0
+        for position in positions:
+            filled |= 1 << position
+        candidates = self.candidates
+        hidden = self.hidden
+        for position, row in enumerate(self.index.positions):
+            if filled >> position & 1:
+                candidates &= row[index]
+            elif hidden >> position & 1:
+                candidates &= ~row[index]
+        self.candidates = candidates
+        self.hidden = hidden & ~filled
+
+class HangmanSolver:
+    """Automatic Hangman player over a WordSource dictionary.
+
+    Each word length's LengthIndex is built on first use and kept, so
+    every later game of that length starts from precomputed bitsets.
+    """
+    def __init__(self, source):
+        self.source = source
+        self._indexes = {}
+
+    def index(self, length):
+        index = self._indexes.get(length)
+        if index is None:
+            index = self._indexes[length] = LengthIndex(self.source, length)
+        return index
+
+    def start(self, length):
+        """A fresh SolverState for a word of the given length."""
+        return SolverState(self.index(length))
+
+    def play(self, game):
+        """Guess until a HangmanGame is over; return the number of guesses made."""
+        state = self.start(len(game.word))
+        guesses = 0
+        while not game.over:
+            letter = state.next_guess()
+            game.guess(letter)
+            state.observe(letter, game.revealed(letter))
+            guesses += 1
+        return guesses
@@ -0,0 +1,328 @@
+import mmap
+import os
+import random
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# One bit per letter, so the set of letters in a word fits in a single int
+LETTER_BITS = {letter: 1 << i for i, letter in enumerate(LETTERS)}
+
+# Index file layout: HEADER, then these uint32 sections, each padded to 8 bytes:
+#   offsets              count + 1 byte offsets into the word blob
+#   masks                letter bitmask of each word
+#   buckets              (max_length + 1) * 27 + 1 starts, bucket L * 27 + d holds
+#                        the words of length L with d distinct letters
+#   letter_offsets       27 starts of each letter's slice of letter_ids
+#   letter_lengths       26 * (max_length + 2) starts of each length within a letter's slice
+#   letter_ids           ids of the words containing each letter, letter by letter
+# and finally the words themselves, concatenated as ASCII.
+# Words are sorted by (length, distinct letters, word), so every bucket and
+# every length is a contiguous run of ids.
+MAGIC = b"HWI1"
+HEADER = struct.Struct("<4sIIII")  # magic, word count, max length, letter id count, blob size
+ALPHABET_SIZE = len(LETTERS)
+
+# Difficulty file (index path + DIFFICULTY_SUFFIX): DIFFICULTY_HEADER, a
+# uint16 score per word id (loss probability * SCORE_SCALE), then the word
+# ids as uint32 sorted by score, so a difficulty range is one contiguous run.
+DIFFICULTY_SUFFIX = ".hwd"
+DIFFICULTY_MAGIC = b"HWD1"
+DIFFICULTY_HEADER = struct.Struct("<4sIII")  # magic, word count, games per strategy, max incorrect
+SCORE_SCALE = 65535
+
+def letter_mask(word):
+    mask = 0
+    for letter in set(word):
+        mask |= LETTER_BITS[letter]
+    return mask
+
+def _check_letters(letters):
+    for letter in letters:
+        if letter not in LETTER_BITS:
+            raise ValueError(f"Not a letter a-z: {letter!r}")
+
+def _is_playable(word):
+    return word.isascii() and word.isalpha()
+
+def _padded(data):
+    return data + bytes(-len(data) % 8)
+
+def build_index(words):
+    """Index image (bytes) for an iterable of words.
+
+    Words are lowercased; duplicates and words with anything other than
+    the letters a-z are dropped.
+    """
+    entries = []
+    for word in {word.strip().lower() for word in words}:
+        if word and _is_playable(word):
+            mask = letter_mask(word)
+            entries.append((len(word), mask.bit_count(), word, mask))
+    entries.sort()
+    max_length = entries[-1][0] if entries else 0
+
+    blob = "".join(word for _, _, word, _ in entries).encode("ascii")
+    offsets = array("I", accumulate((length for length, _, _, _ in entries), initial=0))
+    masks = array("I", (mask for _, _, _, mask in entries))
+
+    sizes = Counter(length * (ALPHABET_SIZE + 1) + distinct for length, distinct, _, _ in entries)
+    keys = range((max_length + 1) * (ALPHABET_SIZE + 1))
+    buckets = array("I", accumulate((sizes[key] for key in keys), initial=0))
+
+    by_letter = [array("I") for _ in LETTERS]
+    for word_id, (_, _, word, _) in enumerate(entries):
+        for letter in set(word):
+            by_letter[LETTER_BITS[letter].bit_length() - 1].append(word_id)
+    letter_offsets = array("I", accumulate(map(len, by_letter), initial=0))
+    letter_lengths = array("I")
+    for ids in by_letter:
+        sizes = Counter(entries[word_id][0] for word_id in ids)
+        letter_lengths.extend(accumulate((sizes[length] for length in range(max_length + 1)), initial=0))
+    letter_ids = array("I")
+    for ids in by_letter:
+        letter_ids.extend(ids)
+
+    sections = [offsets, masks, buckets, letter_offsets, letter_lengths, letter_ids]
+    header = HEADER.pack(MAGIC, len(entries), max_length, len(letter_ids), len(blob))
+    return b"".join([_padded(header)] + [_padded(section.tobytes()) for section in sections] + [blob])
+
+def write_index(word_path, index_path):
+    """Build the index of a one-word-per-line file and write it to index_path."""
+    with open(word_path, encoding="utf-8", errors="ignore") as file:
+        image = build_index(file)
+    # Write under a temporary name so readers never see a partial index
+    temporary = index_path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(image)
+    os.replace(temporary, index_path)
+    # Word ids have changed, so any difficulty scores no longer apply
+    if os.path.exists(index_path + DIFFICULTY_SUFFIX):
+        os.remove(index_path + DIFFICULTY_SUFFIX)
+
+def write_difficulty(index_path, losses, games, max_incorrect):
+    """Store per-word loss probabilities (in word id order) next to an index."""
+    scores = array("H", (round(loss * SCORE_SCALE) for loss in losses))
+    order = array("I", sorted(range(len(scores)), key=scores.__getitem__))
+    header = DIFFICULTY_HEADER.pack(DIFFICULTY_MAGIC, len(scores), games, max_incorrect)
+    temporary = index_path + DIFFICULTY_SUFFIX + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(_padded(header) + _padded(scores.tobytes()) + order.tobytes())
+    os.replace(temporary, index_path + DIFFICULTY_SUFFIX)
+
+class DifficultyIndex:
+    """Calibrated loss probability of every word, mapped from a difficulty file."""
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, count, self.games, self.max_incorrect = DIFFICULTY_HEADER.unpack_from(view)
+        if magic != DIFFICULTY_MAGIC:
+            raise ValueError("Not a Hangman difficulty index")
+        position = len(_padded(bytes(DIFFICULTY_HEADER.size)))
+        self.scores = view[position:position + count * 2].cast("H")
+        position += len(_padded(bytes(count * 2)))
+        self.order = view[position:position + count * 4].cast("I")
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def difficulty(self, word_id):
+        """Probability of losing this word, from 0.0 to 1.0."""
+        return self.scores[word_id] / SCORE_SCALE
+
+    def range(self, low, high):
+        """[start, stop) positions in order of the words with difficulty between low and high."""
+        key = self.scores.__getitem__
+        return (bisect_left(self.order, round(low * SCORE_SCALE), key=key),
+                bisect_right(self.order, round(high * SCORE_SCALE), key=key))
+
+class WordSource:
+    """Hangman words served from a prebuilt index.
+
+    The index holds every word in one contiguous buffer with offset
+    arrays, plus secondary indexes by length, by number of distinct
+    letters and by the letters each word contains. Opening a file maps it,
+    so startup reads nothing up front. choose() picks a random word
+    matching the indexed constraints in constant time, without building
+    any candidate list. A calibrated DifficultyIndex, when present, adds
+    selection by difficulty.
+    """
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, count, max_length, letter_id_count, blob_size = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a Hangman word index")
+        self.max_length = max_length
+        self.difficulty = None
+
+        position = len(_padded(bytes(HEADER.size)))
+        sections = []
+        for length in (count + 1, count, (max_length + 1) * (ALPHABET_SIZE + 1) + 1, ALPHABET_SIZE + 1,
+                       ALPHABET_SIZE * (max_length + 2), letter_id_count):
+            sections.append(view[position:position + length * 4].cast("I"))
+            position += len(_padded(bytes(length * 4)))
+        (self._offsets, self._masks, self._buckets,
+         self._letter_offsets, self._letter_lengths, self._letter_ids) = sections
+        self._blob = view[position:position + blob_size]
+
+    @classmethod
+    def from_words(cls, words):
+        """Index a list of words in memory."""
+        return cls(build_index(words))
+
+    @classmethod
+    def open(cls, index_path):
+        """Map a prebuilt index file."""
+        with open(index_path, "rb") as file:
+            source = cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        if os.path.exists(index_path + DIFFICULTY_SUFFIX):
+            source.difficulty = DifficultyIndex.open(index_path + DIFFICULTY_SUFFIX)
+            if len(source.difficulty) != len(source):
+                raise ValueError(f"{index_path + DIFFICULTY_SUFFIX} does not match {index_path}")
+        return source
+
+    @classmethod
+    def from_word_file(cls, word_path, index_path=None):
+        """Open the index next to a word file, building it first if it is missing or stale."""
+        index_path = index_path or word_path + ".hwi"
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(word_path):
+            write_index(word_path, index_path)
+        return cls.open(index_path)
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __getitem__(self, word_id):
+        return self.word(word_id)
+
+    def word(self, word_id):
+        offsets = self._offsets
+        return str(self._blob[offsets[word_id]:offsets[word_id + 1]], "ascii")
+
+    def mask(self, word_id):
+        """Letter bitmask of one word."""
+        return self._masks[word_id]
+
+    def length_range(self, length):
+        """[start, stop) ids of the words of one length."""
+        return self._bucket(length, None)
+
+    def _bucket(self, length, distinct):
+        """[start, stop) ids of the words of one length, optionally with a number of distinct letters."""
+        if not 1 <= length <= self.max_length:
+            return 0, 0
+        base = length * (ALPHABET_SIZE + 1)
+        if distinct is None:
+            return self._buckets[base], self._buckets[base + ALPHABET_SIZE + 1]
+        if not 1 <= distinct <= ALPHABET_SIZE:
+            return 0, 0
+        return self._buckets[base + distinct], self._buckets[base + distinct + 1]
+
+    def _letter_range(self, letter, length):
+        """[start, stop) positions in letter_ids of the words with a letter, optionally of one length."""
+        index = LETTER_BITS[letter].bit_length() - 1
+        start = self._letter_offsets[index]
+        if length is None:
+            return start, self._letter_offsets[index + 1]
+        if not 1 <= length <= self.max_length:
+            return start, start
+        lengths = index * (self.max_length + 2)
+        return start + self._letter_lengths[lengths + length], start + self._letter_lengths[lengths + length + 1]
+
+    def _candidates(self, length, distinct, contains, excludes, difficulty):
+        """The smallest indexed run covering the constraints, as (ids, start, stop, exact).
+
+        ids is None when the run is of word ids themselves, otherwise the
+        run is positions in letter_ids or in the difficulty order. exact is
+        true when every word in the run matches, so nothing needs testing.
+        """
+        letters = set(contains)
+        runs = []
+        if length is not None:
+            runs.append((None, *self._bucket(length, distinct), not letters and not excludes and difficulty is None))
+        elif distinct is None:
+            runs.append((None, 0, len(self), not letters and not excludes and difficulty is None))
+        for letter in letters:
+            runs.append((self._letter_ids, *self._letter_range(letter, length),
+                         distinct is None and len(letters) == 1 and not excludes and difficulty is None))
+        if difficulty is not None:
+            if self.difficulty is None:
+                raise ValueError("No difficulty index; calibrate this word source first")
+            runs.append((self.difficulty.order, *self.difficulty.range(*difficulty),
+                         length is None and distinct is None and not letters and not excludes))
+        return min(runs, key=lambda run: run[2] - run[1], default=(None, 0, len(self), False))
+
+    def _matcher(self, length, distinct, contains, excludes, difficulty):
+        """Predicate testing every constraint against a word id."""
+        required = letter_mask(contains)
+        banned = letter_mask(excludes)
+        masks, offsets = self._masks, self._offsets
+        if difficulty is not None:
+            scores = self.difficulty.scores
+            low, high = (round(bound * SCORE_SCALE) for bound in difficulty)
+
+        def test(word_id):
+            mask = masks[word_id]
+            return (mask & required == required and not mask & banned
+                    and (distinct is None or mask.bit_count() == distinct)
+                    and (length is None or offsets[word_id + 1] - offsets[word_id] == length)
+                    and (difficulty is None or low <= scores[word_id] <= high))
+        return test
+
+    def _matches(self, *constraints):
+        ids, start, stop, exact = self._candidates(*constraints)
+        test = None if exact else self._matcher(*constraints)
+        for position in range(start, stop):
+            word_id = position if ids is None else ids[position]
+            if test is None or test(word_id):
+                yield word_id
+
+    def count(self, length=None, distinct=None, contains="", excludes="", difficulty=None):
+        """Number of words matching the constraints.
+
+        Indexed constraints are counted directly; others scan only the
+        smallest matching run.
+        """
+        constraints = (length, distinct, contains.lower(), excludes.lower(), difficulty)
+        _check_letters(constraints[2] + constraints[3])
+        _, start, stop, exact = self._candidates(*constraints)
+        if exact:
+            return stop - start
+        return sum(1 for _ in self._matches(*constraints))
+
+    def choose(self, length=None, distinct=None, contains="", excludes="", difficulty=None, rng=random, attempts=64):
+        """A random word with the given length, number of distinct letters, letters and difficulty.
+
+        difficulty is a (low, high) range of calibrated loss probabilities.
+        Length (with or without distinct), a single required letter and a
+        difficulty range are each answered straight from an index. Further
+        constraints are checked by sampling the smallest matching run and
+        testing each word, falling back to a scan of that run after
+        attempts misses. Raises ValueError when no word matches.
+        """
+        constraints = (length, distinct, contains.lower(), excludes.lower(), difficulty)
+        _check_letters(constraints[2] + constraints[3])
+        ids, start, stop, exact = self._candidates(*constraints)
+        test = None if exact else self._matcher(*constraints)
+
+        if start < stop:
+            for _ in range(1 if exact else attempts):
+                position = rng.randrange(start, stop)
+                word_id = position if ids is None else ids[position]
+                if exact or test(word_id):
+                    return self.word(word_id)
+
+            matches = list(self._matches(*constraints))
+            if matches:
+                return self.word(rng.choice(matches))
+        raise ValueError("No word matches the constraints")
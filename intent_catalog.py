@@ -0,0 +1,271 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from task4 import DEFAULT_CATALOG, FuzzyMatcher, Intent, IntentCatalog, NO_MATCH
+
+SNAPSHOT_MAGIC = b"CHATSNP1"
+
+# Magic, then counts (states, edges, categories, strings, default reply start
+# and count), then byte offsets of the eight sections that follow the header
+HEADER = struct.Struct("<8s6I8Q")
+
+# Rank stored for states that do not end any pattern
+NO_RANK = 0xFFFFFFFF
+
+def read_catalog_source(path):
+    """Load an intent catalog from a JSON or YAML source file.
+
+    The file holds {"intents": [{"category", "patterns", "replies"}, ...],
+    "default_replies": [...]}. Intents are listed in priority order, because
+    the first matching category wins.
+    """
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required to read YAML catalogs") from None
+            data = yaml.safe_load(file)
+        else:
+            data = json.load(file)
+
+    try:
+        intents = [Intent(item["category"], item.get("patterns", []), item.get("replies", []))
+                   for item in data["intents"]]
+        return IntentCatalog(intents, data.get("default_replies", DEFAULT_CATALOG.default_replies))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid intent catalog {path}: {e}") from None
+
+def write_catalog_source(catalog, path):
+    """Save a catalog as a JSON source file."""
+    data = {
+        "intents": [{"category": intent.category, "patterns": list(intent.patterns),
+                     "replies": list(intent.replies)} for intent in catalog.intents],
+        "default_replies": list(catalog.default_replies),
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+
+def write_snapshot(catalog, path):
+    """Compile a catalog into a binary snapshot that can be memory-mapped.
+
+    The snapshot holds the Aho-Corasick automaton as flat uint32 arrays (edges
+    sorted per state, failure links and ranks) and every pattern and reply
+    as a UTF-8 string table, so loading it needs no parsing or rebuilding.
+    """
+    matcher = catalog.matcher
+
+    edge_start = array("I", [0])
+    edge_chars = array("I")
+    edge_targets = array("I")
+    for transitions in matcher.goto:
+        for char in sorted(transitions):
+            edge_chars.append(ord(char))
+            edge_targets.append(transitions[char])
+        edge_start.append(len(edge_chars))
+    fail = array("I", matcher.fail)
+    rank = array("I", (NO_RANK if value == NO_MATCH else value for value in matcher.rank))
+
+    strings = []
+    categories = array("I")
+    for intent in catalog.intents:
+        categories.append(len(strings))
+        strings.append(intent.category)
+        categories.extend((len(strings), len(intent.patterns)))
+        strings.extend(intent.patterns)
+        categories.extend((len(strings), len(intent.replies)))
+        strings.extend(intent.replies)
+    default_start = len(strings)
+    strings.extend(catalog.default_replies)
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = array("I", [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    string_blob = b"".join(encoded)
+
+    sections = [edge_start.tobytes(), edge_chars.tobytes(), edge_targets.tobytes(), fail.tobytes(),
+                rank.tobytes(), string_offsets.tobytes(), string_blob, categories.tobytes()]
+
+    # Keep every section 8-byte aligned so it can be cast in place
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position += -position % 8
+        offsets.append(position)
+        position += len(section)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(SNAPSHOT_MAGIC, len(matcher.goto), len(edge_chars), len(catalog.intents),
+                               len(strings), default_start, len(catalog.default_replies), *offsets))
+        for offset, section in zip(offsets, sections):
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(section)
+
+class MappedMatcher:
+    """PatternMatcher that walks an automaton stored in a snapshot.
+
+    Transitions are read straight from the mapped arrays. Each state's
+    edges are turned into a dict the first time the state is visited, so hot
+    states cost a dict lookup and cold states are never decoded.
+    """
+    def __init__(self, categories, edge_start, edge_chars, edge_targets, fail, rank):
+        self.categories = categories
+        self.edge_start = edge_start
+        self.edge_chars = edge_chars
+        self.edge_targets = edge_targets
+        self.fail = fail
+        self.rank = rank
+        self._edges = {}
+
+    def _transitions(self, state):
+        """Decode and remember the outgoing edges of one state."""
+        start, end = self.edge_start[state], self.edge_start[state + 1]
+        edges = dict(zip(map(chr, self.edge_chars[start:end]), self.edge_targets[start:end]))
+        self._edges[state] = edges
+        return edges
+
+    def find(self, text):
+        """Return the first category with a pattern inside text, or None."""
+        cache, fail, rank = self._edges, self.fail, self.rank
+        state = 0
+        best = rank[0]
+
+        for char in text:
+            edges = cache.get(state)
+            if edges is None:
+                edges = self._transitions(state)
+            next_state = edges.get(char)
+            while next_state is None and state:
+                state = fail[state]
+                edges = cache.get(state)
+                if edges is None:
+                    edges = self._transitions(state)
+                next_state = edges.get(char)
+            state = next_state or 0
+
+            if rank[state] < best:
+                best = rank[state]
+                if best == 0:
+                    break  # Nothing can beat the first category
+
+        if best == NO_RANK:
+            return None
+        return self.categories[best]
+
+class _IntentIndex(dict):
+    """Category -> Intent mapping that decodes intents on first access."""
+    def __init__(self, catalog):
+        super().__init__()
+        self.catalog = catalog
+
+    def __missing__(self, category):
+        intent = self.catalog.intent(self.catalog.category_index[category])
+        self[category] = intent
+        return intent
+
+    def get(self, category, default=None):
+        if category in self.catalog.category_index:
+            return self[category]
+        return default
+
+class MappedCatalog:
+    """Intent catalog served from a memory-mapped snapshot file.
+
+    Opening a snapshot only reads the header, category names and default
+    replies. Patterns and replies are decoded on demand. Forked workers
+    share the mapped pages, and pickling a MappedCatalog just maps the same
+    file again.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, state_count, edge_count, category_count, string_count,
+         default_start, default_count, *offsets) = HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not an intent catalog snapshot")
+
+        def section(index, count):
+            start = offsets[index]
+            return view[start:start + count * 4].cast("I")
+
+        self._string_offsets = section(5, string_count + 1)
+        self._string_blob = view[offsets[6]:offsets[6] + self._string_offsets[string_count]]
+        self._categories = section(7, category_count * 5)
+
+        names = [self.string(self._categories[i * 5]) for i in range(category_count)]
+        self.category_index = {name: i for i, name in enumerate(names)}
+        self.by_category = _IntentIndex(self)
+        self.default_replies = tuple(self.string(i) for i in range(default_start, default_start + default_count))
+        self._fuzzy_matcher = None
+        self.matcher = MappedMatcher(names, section(0, state_count + 1), section(1, edge_count),
+                                     section(2, edge_count), section(3, state_count), section(4, state_count))
+
+    def __reduce__(self):
+        return (MappedCatalog, (self.path,))
+
+    def string(self, index):
+        """Decode one entry of the string table."""
+        offsets = self._string_offsets
+        return sys.intern(str(self._string_blob[offsets[index]:offsets[index + 1]], "utf-8"))
+
+    def intent(self, index):
+        """Decode the intent at a given priority position."""
+        name, pattern_start, pattern_count, reply_start, reply_count = self._categories[index * 5:index * 5 + 5]
+        patterns = [self.string(i) for i in range(pattern_start, pattern_start + pattern_count)]
+        replies = [self.string(i) for i in range(reply_start, reply_start + reply_count)]
+        return Intent(self.string(name), patterns, replies)
+
+    @property
+    def intents(self):
+        """Every intent, in priority order (decodes the whole catalog)."""
+        return tuple(self.by_category[name] for name in self.category_index)
+
+    @property
+    def fuzzy_matcher(self):
+        """Typo-tolerant matcher, built from the decoded patterns on first use."""
+        if self._fuzzy_matcher is None:
+            self._fuzzy_matcher = FuzzyMatcher(self.intents)
+        return self._fuzzy_matcher
+
+    def with_patterns(self, category, patterns, replies=None):
+        """Return an in-memory catalog with patterns (and replies) added to a category."""
+        return IntentCatalog(self.intents, self.default_replies).with_patterns(category, patterns, replies)
+
+def is_snapshot(path):
+    """Check whether a file starts with the snapshot magic bytes."""
+    with open(path, "rb") as file:
+        return file.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+def load_catalog(path):
+    """Load a catalog from a snapshot (memory-mapped) or a JSON/YAML source file."""
+    if is_snapshot(path):
+        return MappedCatalog(path)
+    return read_catalog_source(path)
+
+def main():
+    """Command line: export the built-in catalog or compile a source file."""
+    usage = ("Usage:\n"
+             "  python intent_catalog.py export <catalog.json>\n"
+             "  python intent_catalog.py compile <catalog.json|yaml> <catalog.snap>")
+    args = sys.argv[1:]
+
+    if len(args) == 2 and args[0] == "export":
+        write_catalog_source(DEFAULT_CATALOG, args[1])
+        print(f"Built-in catalog saved to {args[1]}")
+    elif len(args) == 3 and args[0] == "compile":
+        catalog = read_catalog_source(args[1])
+        write_snapshot(catalog, args[2])
+        pattern_count = sum(len(intent.patterns) for intent in catalog.intents)
+        print(f"Compiled {len(catalog.intents)} intents ({pattern_count} patterns) to {args[2]}")
+    else:
+        print(usage)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import operator
+from array import array
+
+from price_providers import StaticPriceProvider
+from task2 import STOCK_PRICES, StockPortfolio
+
+class PortfolioBook:
+    """Many portfolios stored as one sparse quantity matrix.
+
+    Rows are portfolios and columns are symbols. The matrix is kept in
+    compressed sparse row form in flat typed arrays: row_starts, then the
+    column index and quantity of every holding. Revaluing the whole book
+    against a price vector is then a single sparse matrix-vector product. It
+    runs as three C-level passes (gather prices with one itemgetter,
+    multiply, sum each row slice) instead of Python loops over
+    per-portfolio dicts.
+    """
+    def __init__(self, symbols=None):
+        self.symbols = list(symbols if symbols is not None else STOCK_PRICES)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.names = []
+        self.row_starts = array('q', [0])
+        self.columns = array('q')
+        self.quantities = array('d')
+        self._column_totals = None
+        self._kernel = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_portfolios(cls, portfolios, names=None, symbols=None):
+        """Build a book from StockPortfolio objects (one row each)."""
+        portfolios = list(portfolios)
+        if symbols is None:
+            symbols = list(STOCK_PRICES)
+            known = set(symbols)
+            for portfolio in portfolios:
+                for symbol in portfolio.portfolio:
+                    if symbol not in known:
+                        known.add(symbol)
+                        symbols.append(symbol)
+
+        book = cls(symbols)
+        for i, portfolio in enumerate(portfolios):
+            book.add_portfolio(portfolio.portfolio, names[i] if names else None)
+        return book
+
+    def add_portfolio(self, holdings, name=None):
+        """Append one portfolio given as {symbol: quantity}; returns its row number."""
+        index = self.symbol_index
+        for symbol, quantity in holdings.items():
+            if quantity:
+                self.columns.append(index[symbol.upper()])
+                self.quantities.append(quantity)
+        self.row_starts.append(len(self.columns))
+        self.names.append(name if name is not None else f"portfolio_{len(self.names)}")
+        self._column_totals = None
+        self._kernel = None
+        return len(self.names) - 1
+
+    def holdings(self, row):
+        """The {symbol: quantity} holdings of one row."""
+        start, end = self.row_starts[row], self.row_starts[row + 1]
+        symbols = self.symbols
+        return {symbols[column]: quantity
+                for column, quantity in zip(self.columns[start:end], self.quantities[start:end])}
+
+    def to_portfolio(self, row, prices=None, price_provider=None):
+        """Rebuild a StockPortfolio for one row.
+
+        It is priced from the price vector prices when given, otherwise from
+        price_provider (the STOCK_PRICES table by default). Raises ValueError
+        if a holding cannot be priced, rather than dropping it.
+        """
+        holdings = {symbol: int(quantity) if quantity == int(quantity) else quantity
+                    for symbol, quantity in self.holdings(row).items()}
+        if prices is not None:
+            price_provider = StaticPriceProvider({symbol: prices[self.symbol_index[symbol]] for symbol in holdings})
+        portfolio = StockPortfolio(price_provider)
+        missing = portfolio.add_stocks(holdings)
+        if missing:
+            raise ValueError(f"No price for {', '.join(missing)}")
+        return portfolio
+
+    def price_vector(self, prices=None):
+        """Turn a {symbol: price} dict into a price array aligned with the columns."""
+        prices = STOCK_PRICES if prices is None else prices
+        return array('d', (prices.get(symbol, 0.0) for symbol in self.symbols))
+
+    def _revalue_kernel(self):
+        """Gather function, quantities and row bounds as plain Python objects.
+
+        Iterating typed arrays boxes every element again on each pass, so the
+        hot path uses list/tuple copies built once after the last change.
+        """
+        if self._kernel is None:
+            columns = self.columns
+            if len(columns) > 1:
+                gather = operator.itemgetter(*columns)
+            elif columns:
+                column = columns[0]
+                gather = lambda vector: (vector[column],)
+            else:
+                gather = lambda vector: ()
+            starts = list(self.row_starts)
+            self._kernel = (gather, list(self.quantities), list(zip(starts, starts[1:])))
+        return self._kernel
+
+    def revalue(self, price_vector):
+        """Total value of every portfolio at the given prices."""
+        gather, quantities, rows = self._revalue_kernel()
+        # Gathering from a list reuses its float objects instead of boxing new ones
+        values = list(map(operator.mul, quantities, gather(list(price_vector))))
+        return [sum(values[start:end], 0.0) for start, end in rows]
+
+    def pnl(self, old_prices, new_prices):
+        """Profit or loss of every portfolio when prices move from old to new."""
+        deltas = array('d', map(operator.sub, new_prices, old_prices))
+        return self.revalue(deltas)
+
+    def column_totals(self):
+        """Total quantity of each symbol held across the whole book."""
+        if self._column_totals is None:
+            totals = [0.0] * len(self.symbols)
+            for column, quantity in zip(self.columns, self.quantities):
+                totals[column] += quantity
+            self._column_totals = array('d', totals)
+        return self._column_totals
+
+    def symbol_pnl(self, old_prices, new_prices):
+        """Profit or loss of the whole book per symbol, as {symbol: amount}."""
+        moves = map(operator.mul, self.column_totals(), map(operator.sub, new_prices, old_prices))
+        return dict(zip(self.symbols, moves))
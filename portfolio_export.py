@@ -0,0 +1,229 @@
+import csv
+import gzip
+import io
+import os
+import struct
+import threading
+from array import array
+from concurrent.futures import Future
+from datetime import datetime
+from itertools import accumulate, islice
+
+# Columnar files are the magic bytes followed by row groups. Each group has
+# this header (row count, symbol blob length), then uint32 symbol offsets, the
+# UTF-8 symbol blob and the quantity, price and value columns as float64.
+# A group header with END_OF_GROUPS as its row count is followed by FOOTER.
+COLUMNAR_MAGIC = b"PFCOLv1\n"
+GROUP_HEADER = struct.Struct("<II")
+FOOTER = struct.Struct("<Qd")  # row count, total value
+END_OF_GROUPS = 0xFFFFFFFF
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+def open_output(path, buffer_size=DEFAULT_BUFFER_SIZE, compresslevel=1):
+    """Open a buffered binary output file, gzip-compressed if path ends in .gz."""
+    if path.endswith(".gz"):
+        return io.BufferedWriter(gzip.GzipFile(path, "wb", compresslevel=compresslevel), buffer_size)
+    return open(path, "wb", buffering=buffer_size)
+
+def open_input(path, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Open a buffered binary input file, decompressing it if path ends in .gz."""
+    if path.endswith(".gz"):
+        return io.BufferedReader(gzip.GzipFile(path, "rb"), buffer_size)
+    return open(path, "rb", buffering=buffer_size)
+
+class TxtSink:
+    """Writes the same report as StockPortfolio.save_to_txt, one chunk per write."""
+    def __init__(self, file):
+        self.file = io.TextIOWrapper(file, encoding="utf-8")
+
+    def begin(self, row_count):
+        self.file.write("STOCK PORTFOLIO REPORT\n")
+        self.file.write("="*50 + "\n")
+        self.file.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        if not row_count:
+            self.file.write("Portfolio is empty.\n")
+            return
+        self.file.write(f"{'Stock':<8} {'Quantity':<10} {'Price':<10} {'Total Value':<15}\n")
+        self.file.write("-"*50 + "\n")
+
+    def write(self, rows):
+        self.file.write("".join([f"{symbol:<8} {quantity:<10} ${price:<9.2f} ${value:<14.2f}\n"
+                                 for symbol, quantity, price, value in rows]))
+
+    def finish(self, row_count, total_value):
+        if row_count:
+            self.file.write("-"*50 + "\n")
+            self.file.write(f"TOTAL PORTFOLIO VALUE: ${total_value:.2f}\n")
+        self.file.close()
+
+class CsvSink:
+    """Writes the same rows as StockPortfolio.save_to_csv."""
+    def __init__(self, file):
+        self.file = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+
+    def begin(self, row_count):
+        self.writer.writerow(['Stock Symbol', 'Quantity', 'Price per Share', 'Total Value'])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def finish(self, row_count, total_value):
+        self.writer.writerow(['TOTAL', '', '', total_value])
+        self.file.close()
+
+class ColumnarSink:
+    """Writes each chunk as a row group of packed columns (see COLUMNAR_MAGIC)."""
+    def __init__(self, file):
+        self.file = file
+
+    def begin(self, row_count):
+        self.file.write(COLUMNAR_MAGIC)
+
+    def write(self, rows):
+        symbols, quantities, prices, values = zip(*rows)
+        encoded = list(map(str.encode, symbols))
+        offsets = array("I", [0])
+        offsets.extend(accumulate(map(len, encoded)))
+
+        self.file.write(GROUP_HEADER.pack(len(rows), offsets[-1]))
+        self.file.write(offsets.tobytes())
+        self.file.write(b"".join(encoded))
+        for column in (quantities, prices, values):
+            self.file.write(array("d", column).tobytes())
+
+    def finish(self, row_count, total_value):
+        self.file.write(GROUP_HEADER.pack(END_OF_GROUPS, 0))
+        self.file.write(FOOTER.pack(row_count, total_value))
+        self.file.close()
+
+SINKS = {
+    "txt": TxtSink,
+    "csv": CsvSink,
+    "pcol": ColumnarSink,
+}
+
+def export_format(path, format=None):
+    """The export format for a path, by default taken from its extension.
+
+    Extensions are .txt, .csv or .pcol, each optionally followed by .gz.
+    Raises ValueError for an unsupported format.
+    """
+    if format is None:
+        base = path[:-3] if path.endswith(".gz") else path
+        format = os.path.splitext(base)[1].lower().lstrip(".")
+    if format not in SINKS:
+        raise ValueError(f"Unsupported export format for {path}; use one of {', '.join(SINKS)}")
+    return format
+
+def sink_for(path, format=None, buffer_size=DEFAULT_BUFFER_SIZE, compresslevel=1):
+    """Open the sink for a format, by default taken from the path's extension."""
+    return SINKS[export_format(path, format)](open_output(path, buffer_size, compresslevel))
+
+def snapshot_rows(portfolio):
+    """Freeze a portfolio's (symbol, quantity, price, value) rows and total.
+
+    Copies the running aggregates, so a background export is unaffected by
+    later changes to the portfolio.
+    """
+    symbols = list(portfolio.portfolio)
+    rows = list(zip(symbols,
+                    map(portfolio.portfolio.__getitem__, symbols),
+                    map(portfolio.prices.__getitem__, symbols),
+                    map(portfolio.market_values.__getitem__, symbols)))
+    return rows, portfolio.total_value
+
+def export_rows(rows, total_value, paths, format=None, chunk_size=10000,
+                buffer_size=DEFAULT_BUFFER_SIZE, compresslevel=1):
+    """Stream rows to every path in a single pass, chunk_size rows at a time.
+
+    format forces every path to one format instead of using extensions.
+    Every format is checked before any file is opened, so an unsupported
+    path leaves the others untouched. Returns {path: bytes on disk}.
+    """
+    formats = [export_format(path, format) for path in paths]
+    sinks = []
+    try:
+        for path, path_format in zip(paths, formats):
+            sinks.append(sink_for(path, path_format, buffer_size, compresslevel))
+        for sink in sinks:
+            sink.begin(len(rows))
+
+        iterator = iter(rows)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            for sink in sinks:
+                sink.write(chunk)
+
+        for sink in sinks:
+            sink.finish(len(rows), total_value)
+    except BaseException:
+        for sink in sinks:
+            sink.file.close()
+        raise
+    return {path: os.path.getsize(path) for path in paths}
+
+def export_portfolio(portfolio, paths, **options):
+    """Export a StockPortfolio to several files in one pass over its holdings."""
+    rows, total_value = snapshot_rows(portfolio)
+    return export_rows(rows, total_value, paths, **options)
+
+def export_in_background(portfolio, paths, **options):
+    """Start export_portfolio on a writer thread and return a Future for its result.
+
+    The holdings are copied before returning, so the caller may keep
+    changing the portfolio while the files are written.
+    """
+    rows, total_value = snapshot_rows(portfolio)
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(export_rows(rows, total_value, paths, **options))
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, name="portfolio-export", daemon=True).start()
+    return future
+
+def read_columnar(path):
+    """Load a columnar export as {'symbols', 'quantities', 'prices', 'values', 'total_value'}.
+
+    Raises ValueError if the file is not a columnar export or is cut short.
+    """
+    symbols = []
+    columns = {"quantities": array("d"), "prices": array("d"), "values": array("d")}
+    try:
+        with open_input(path) as file:
+            def read(size):
+                data = file.read(size)
+                if len(data) < size:
+                    raise ValueError(f"{path} is truncated")
+                return data
+
+            if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError(f"{path} is not a columnar portfolio export")
+
+            while True:
+                row_count, blob_length = GROUP_HEADER.unpack(read(GROUP_HEADER.size))
+                if row_count == END_OF_GROUPS:
+                    total_rows, total_value = FOOTER.unpack(read(FOOTER.size))
+                    break
+
+                offsets = array("I")
+                offsets.frombytes(read((row_count + 1) * 4))
+                blob = read(blob_length)
+                symbols.extend(blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(row_count))
+                for column in columns.values():
+                    column.frombytes(read(row_count * 8))
+    except EOFError as error:  # A gzip stream cut short
+        raise ValueError(f"{path} is truncated") from error
+
+    if len(symbols) != total_rows:
+        raise ValueError(f"{path} is truncated: expected {total_rows} rows, found {len(symbols)}")
+    return dict(symbols=symbols, total_value=total_value, **columns)
@@ -0,0 +1,236 @@
+import csv
+import io
+import operator
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from portfolio_export import open_input
+
+# Header names accepted for each column, compared case-insensitively
+SYMBOL_COLUMNS = ("symbol", "stock symbol", "ticker")
+QUANTITY_COLUMNS = ("quantity", "qty", "shares")
+SIDE_COLUMNS = ("side", "action")
+SELL_SIDES = frozenset(("sell", "s", "sld"))
+
+# How many rejected rows are kept in a report as examples
+MAX_ERRORS = 20
+
+class ImportReport:
+    """Counts and timing for one bulk import, mergeable across files."""
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []  # (path, line number, reason) for the first rejected rows
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def reject(self, path, line, reason, rows=1):
+        self.rejected += rows
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((path, line, reason))
+
+    def merge(self, other):
+        """Add another report's counts (timing is left to the caller)."""
+        self.rows += other.rows
+        self.accepted += other.accepted
+        self.rejected += other.rejected
+        self.errors.extend(other.errors[:MAX_ERRORS - len(self.errors)])
+        return self
+
+def _find_column(header, names, path, required=True):
+    """Index of the first header cell matching one of names."""
+    lowered = [cell.strip().lower() for cell in header]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    if required:
+        raise ValueError(f"{path} has no {names[0]} column (header: {header})")
+    return None
+
+def _parse_quantity(text):
+    """A quantity cell as an int, or a float if it has a fraction; ValueError if neither."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def read_chunks(path, chunk_size=10000):
+    """Yield (header, rows) for a CSV file, chunk_size rows at a time."""
+    with io.TextIOWrapper(open_input(path), encoding="utf-8", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                break
+            yield header, rows
+
+def _aggregate_clean_chunk(rows, columns, universe, totals):
+    """Add a chunk to totals using C-level passes over its columns.
+
+    Returns False, without touching totals, if any row is short, has a
+    non-integer quantity or an unknown symbol. The caller then checks that
+    chunk row by row to report exactly which rows are bad.
+    """
+    symbol_column, quantity_column, side_column = columns
+    try:
+        symbols = list(map(operator.itemgetter(symbol_column), rows))
+        quantities = list(map(int, map(operator.itemgetter(quantity_column), rows)))
+        sides = list(map(operator.itemgetter(side_column), rows)) if side_column is not None else None
+    except (IndexError, ValueError):
+        return False
+
+    # Broker files repeat a few thousand symbols, so clean each distinct spelling once
+    canonical = {raw: raw.strip().upper() for raw in set(symbols)}
+    if not universe.issuperset(canonical.values()):
+        return False
+    if sides is not None:
+        signs = {raw: -1 if raw.strip().lower() in SELL_SIDES else 1 for raw in set(sides)}
+        quantities = map(operator.mul, quantities, map(signs.__getitem__, sides))
+
+    get = totals.get
+    for symbol, quantity in zip(map(canonical.__getitem__, symbols), quantities):
+        totals[symbol] = get(symbol, 0) + quantity
+    return True
+
+def aggregate_file(path, universe, chunk_size=10000):
+    """Net quantity per symbol in one trades/holdings CSV file.
+
+    Rows whose symbol is not in universe (a set of upper-case symbols) or
+    whose quantity is not a number are rejected and counted. A side column
+    of SELL makes the quantity negative. A TOTAL row, as written by
+    save_to_csv, is skipped. Returns ({symbol: net quantity}, ImportReport).
+    """
+    totals = {}
+    report = ImportReport()
+    line = 1
+    for header, rows in read_chunks(path, chunk_size):
+        symbol_column = _find_column(header, SYMBOL_COLUMNS, path)
+        quantity_column = _find_column(header, QUANTITY_COLUMNS, path)
+        side_column = _find_column(header, SIDE_COLUMNS, path, required=False)
+
+        if _aggregate_clean_chunk(rows, (symbol_column, quantity_column, side_column), universe, totals):
+            line += len(rows)
+            report.rows += len(rows)
+            report.accepted += len(rows)
+            continue
+
+        for row in rows:
+            line += 1
+            report.rows += 1
+            try:
+                symbol = row[symbol_column].strip().upper()
+                text = row[quantity_column]
+                side = row[side_column].strip().lower() if side_column is not None else ""
+            except IndexError:
+                report.reject(path, line, "missing columns")
+                continue
+
+            if symbol not in universe:
+                if symbol == "TOTAL":
+                    report.rows -= 1
+                else:
+                    report.reject(path, line, f"unknown symbol {symbol!r}")
+                continue
+            try:
+                quantity = _parse_quantity(text)
+            except ValueError:
+                report.reject(path, line, f"invalid quantity {text!r}")
+                continue
+
+            if side in SELL_SIDES:
+                quantity = -quantity
+            totals[symbol] = totals.get(symbol, 0) + quantity
+            report.accepted += 1
+    return totals, report
+
+def find_rows(paths, symbols, chunk_size=10000):
+    """Where the accepted rows for some symbols are.
+
+    Returns {symbol: (row count, path, line number of its first row)} for
+    the symbols that appear. Only used to report rows after the fact, so it
+    rereads the files row by row.
+    """
+    found = {}
+    for path in paths:
+        line = 1
+        for header, rows in read_chunks(path, chunk_size):
+            symbol_column = _find_column(header, SYMBOL_COLUMNS, path)
+            quantity_column = _find_column(header, QUANTITY_COLUMNS, path)
+            for row in rows:
+                line += 1
+                try:
+                    symbol = row[symbol_column].strip().upper()
+                    if symbol not in symbols:
+                        continue
+                    _parse_quantity(row[quantity_column])
+                except (IndexError, ValueError):
+                    continue
+                count, first_path, first_line = found.get(symbol, (0, path, line))
+                found[symbol] = (count + 1, first_path, first_line)
+    return found
+
+def merge_totals(parts):
+    """Sum several {symbol: quantity} dicts into one."""
+    merged = {}
+    for totals in parts:
+        for symbol, quantity in totals.items():
+            merged[symbol] = merged.get(symbol, 0) + quantity
+    return merged
+
+def aggregate_files(paths, universe, chunk_size=10000, processes=None):
+    """Aggregate several files, in parallel worker processes if processes > 1.
+
+    Each worker returns its partial totals and report, which are merged
+    here. Returns ({symbol: net quantity}, ImportReport).
+    """
+    start = time.perf_counter()
+    paths = list(paths)
+    universe = frozenset(universe)
+
+    if processes and processes > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(min(processes, len(paths))) as pool:
+            results = list(pool.map(aggregate_file, paths, [universe] * len(paths),
+                                    [chunk_size] * len(paths)))
+    else:
+        results = [aggregate_file(path, universe, chunk_size) for path in paths]
+
+    report = ImportReport()
+    for _, part in results:
+        report.merge(part)
+    totals = merge_totals(totals for totals, _ in results)
+    report.seconds = time.perf_counter() - start
+    return totals, report
+
+def import_holdings(portfolio, paths, chunk_size=10000, processes=None):
+    """Bulk-load CSV files into a StockPortfolio.
+
+    Symbols are checked against the portfolio's price provider. Quantities
+    are netted per symbol before the portfolio is touched, so each symbol
+    costs one update however many rows mention it. A symbol that nets to a
+    sell but is not held changes nothing, so its rows are moved from
+    accepted to rejected. Returns an ImportReport.
+    """
+    start = time.perf_counter()
+    paths = list(paths)
+    universe = frozenset(portfolio.price_provider.symbols())
+    totals, report = aggregate_files(paths, universe, chunk_size, processes)
+
+    buys = {symbol: quantity for symbol, quantity in totals.items() if quantity > 0}
+    portfolio.add_stocks(buys)
+    unheld = {symbol for symbol, quantity in totals.items()
+              if quantity < 0 and not portfolio.remove_stock(symbol, -quantity)}
+    if unheld:
+        for symbol, (rows, path, line) in find_rows(paths, unheld, chunk_size).items():
+            report.accepted -= rows
+            report.reject(path, line, f"{rows} rows net to a sell of {symbol!r}, which is not held", rows)
+
+    report.seconds = time.perf_counter() - start
+    return report
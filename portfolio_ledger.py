@@ -0,0 +1,284 @@
+import math
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+from collections import deque
+
+# Every event is one fixed-size record, so event i is at byte i * EVENT.size
+# and the log can be binary-searched by timestamp. Sells have negative
+# quantities. Symbol ids index the ledger's .symbols file.
+EVENT = struct.Struct("<dI4xdd")  # timestamp, symbol id, quantity, price
+TIMESTAMP = struct.Struct("<d")
+
+# A snapshot is this header followed by lot_count LOT records
+SNAPSHOT_HEADER = struct.Struct("<QdId")  # event count, timestamp, lot count, realized P&L
+LOT = struct.Struct("<Idd")  # symbol id, quantity, price
+
+class LotBook:
+    """Open FIFO lots per symbol plus realized profit and loss.
+
+    Buys add a lot. Sells consume the oldest lots first and book the
+    difference between the sale price and each lot's price.
+    """
+    __slots__ = ("lots", "positions", "realized_pnl")
+
+    def __init__(self):
+        self.lots = {}  # symbol -> deque of [quantity, price], oldest first
+        self.positions = {}  # symbol -> total open quantity
+        self.realized_pnl = 0.0
+
+    def copy(self):
+        book = LotBook()
+        book.lots = {symbol: deque([lot[:] for lot in lots]) for symbol, lots in self.lots.items()}
+        book.positions = dict(self.positions)
+        book.realized_pnl = self.realized_pnl
+        return book
+
+    def quantity(self, symbol):
+        return self.positions.get(symbol, 0)
+
+    def holdings(self):
+        """{symbol: quantity} of every open position, whole shares as ints."""
+        return {symbol: int(quantity) if quantity == int(quantity) else quantity
+                for symbol, quantity in self.positions.items()}
+
+    def cost_basis(self, symbol=None):
+        """Cost of the open lots of one symbol, or of all of them."""
+        symbols = [symbol] if symbol is not None else self.lots
+        return math.fsum(quantity * price for s in symbols for quantity, price in self.lots.get(s, ()))
+
+    def average_cost(self, symbol):
+        quantity = self.quantity(symbol)
+        return self.cost_basis(symbol) / quantity if quantity else 0.0
+
+    def unrealized_pnl(self, prices):
+        """Gain of the open lots if sold at prices ({symbol: price})."""
+        return math.fsum(quantity * (prices[symbol] - price)
+                         for symbol, lots in self.lots.items() for quantity, price in lots)
+
+    def apply(self, symbol, quantity, price):
+        """Apply one buy (quantity > 0) or sell (quantity < 0)."""
+        if quantity > 0:
+            lots = self.lots.get(symbol)
+            if lots is None:
+                lots = self.lots[symbol] = deque()
+                self.positions[symbol] = quantity
+            else:
+                self.positions[symbol] += quantity
+            lots.append([quantity, price])
+            return
+
+        lots = self.lots.get(symbol)
+        remaining = -quantity
+        while remaining > 0 and lots:
+            lot = lots[0]
+            used = lot[0] if lot[0] < remaining else remaining
+            self.realized_pnl += used * (price - lot[1])
+            lot[0] -= used
+            remaining -= used
+            if lot[0] <= 0:
+                lots.popleft()
+        if lots:
+            self.positions[symbol] += quantity + remaining
+        else:
+            self.lots.pop(symbol, None)
+            self.positions.pop(symbol, None)
+
+    def replay(self, events, symbols):
+        """Apply (timestamp, symbol id, quantity, price) events in order."""
+        apply = self.apply
+        for _, symbol_id, quantity, price in events:
+            apply(symbols[symbol_id], quantity, price)
+        return self
+
+class EventLog:
+    """Append-only file of fixed-size events, read through mmap.
+
+    Appends are buffered and written in large blocks. Reads map the file and
+    unpack records in place, so replaying a range costs no copying or
+    parsing beyond struct.iter_unpack.
+    """
+    def __init__(self, path, buffer_size=1024 * 1024):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file = open(path, "ab")
+        self._buffer = bytearray()
+        self._count = self._file.tell() // EVENT.size
+        self.last_timestamp = self.timestamp(self._count - 1) if self._count else float("-inf")
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, symbol_id, quantity, price):
+        if timestamp < self.last_timestamp:
+            raise ValueError(f"Event at {timestamp} is older than the last event ({self.last_timestamp})")
+        self._buffer += EVENT.pack(timestamp, symbol_id, quantity, price)
+        self._count += 1
+        self.last_timestamp = timestamp
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def _map(self):
+        self.flush()
+        with open(self.path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def timestamp(self, index):
+        """Timestamp of one event."""
+        self.flush()
+        with open(self.path, "rb") as file:
+            file.seek(index * EVENT.size)
+            return TIMESTAMP.unpack(file.read(TIMESTAMP.size))[0]
+
+    def count_until(self, timestamp):
+        """Number of events at or before timestamp (binary search over the mapped file)."""
+        if not self._count:
+            return 0
+        with self._map() as view:
+            low, high = 0, self._count
+            while low < high:
+                middle = (low + high) // 2
+                if TIMESTAMP.unpack_from(view, middle * EVENT.size)[0] <= timestamp:
+                    low = middle + 1
+                else:
+                    high = middle
+        return low
+
+    def events(self, start=0, stop=None):
+        """(timestamp, symbol id, quantity, price) tuples for events start..stop."""
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        # Unpack straight from the mapped pages; the map is closed when the
+        # last reference (held by the unpack iterator) goes away
+        view = memoryview(self._map())
+        yield from EVENT.iter_unpack(view[start * EVENT.size:stop * EVENT.size])
+
+class Ledger:
+    """Event-sourced trade history for a portfolio.
+
+    Every buy and sell is appended to an EventLog (path) and applied to a
+    live LotBook. Every snapshot_interval events the whole LotBook is
+    written to path.snapshots. Rebuilding the state at any time then loads
+    the nearest earlier snapshot and replays only the events after it.
+    """
+    def __init__(self, path, snapshot_interval=100000):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.symbols = []
+        self.symbol_ids = {}
+        if os.path.exists(path + ".symbols"):
+            with open(path + ".symbols", encoding="utf-8") as file:
+                for symbol in file.read().split():
+                    self.symbol_ids[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+        self._symbol_file = open(path + ".symbols", "a", encoding="utf-8")
+
+        self.log = EventLog(path)
+        self._snapshot_counts = []
+        self._snapshot_offsets = []
+        self._load_snapshot_index()
+        self._snapshot_file = open(path + ".snapshots", "ab")
+        self.book = self.state_at(float("inf"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.log.close()
+        self._symbol_file.close()
+        self._snapshot_file.close()
+
+    def _symbol_id(self, symbol):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._symbol_file.write(symbol + "\n")
+            self._symbol_file.flush()
+        return symbol_id
+
+    def record(self, symbol, quantity, price, timestamp=None):
+        """Append a buy (quantity > 0) or sell (quantity < 0) and apply it."""
+        symbol = symbol.upper()
+        if quantity < 0 and -quantity > self.book.quantity(symbol):
+            raise ValueError(f"Cannot sell {-quantity} {symbol}: only {self.book.quantity(symbol)} held")
+        self.log.append(time.time() if timestamp is None else timestamp, self._symbol_id(symbol), quantity, price)
+        self.book.apply(symbol, quantity, price)
+        if len(self.log) % self.snapshot_interval == 0:
+            self.write_snapshot()
+
+    def buy(self, symbol, quantity, price, timestamp=None):
+        self.record(symbol, quantity, price, timestamp)
+
+    def sell(self, symbol, quantity, price, timestamp=None):
+        self.record(symbol, -quantity, price, timestamp)
+
+    def _load_snapshot_index(self):
+        """Read the header of every snapshot, skipping over its lots."""
+        if not os.path.exists(self.path + ".snapshots"):
+            return
+        with open(self.path + ".snapshots", "rb") as file:
+            while True:
+                offset = file.tell()
+                header = file.read(SNAPSHOT_HEADER.size)
+                if len(header) < SNAPSHOT_HEADER.size:
+                    break
+                event_count, _, lot_count, _ = SNAPSHOT_HEADER.unpack(header)
+                file.seek(lot_count * LOT.size, os.SEEK_CUR)
+                self._snapshot_counts.append(event_count)
+                self._snapshot_offsets.append(offset)
+
+    def write_snapshot(self):
+        """Write the live LotBook as a snapshot at the current end of the log."""
+        lots = [(self.symbol_ids[symbol], quantity, price)
+                for symbol, symbol_lots in self.book.lots.items() for quantity, price in symbol_lots]
+        self.log.flush()
+        offset = self._snapshot_file.tell()
+        self._snapshot_file.write(SNAPSHOT_HEADER.pack(len(self.log), self.log.last_timestamp,
+                                                       len(lots), self.book.realized_pnl))
+        self._snapshot_file.write(b"".join(LOT.pack(*lot) for lot in lots))
+        self._snapshot_file.flush()
+        self._snapshot_counts.append(len(self.log))
+        self._snapshot_offsets.append(offset)
+
+    def _read_snapshot(self, index):
+        """Load one snapshot as a LotBook."""
+        book = LotBook()
+        with open(self.path + ".snapshots", "rb") as file:
+            file.seek(self._snapshot_offsets[index])
+            _, _, lot_count, book.realized_pnl = SNAPSHOT_HEADER.unpack(file.read(SNAPSHOT_HEADER.size))
+            for symbol_id, quantity, price in LOT.iter_unpack(file.read(lot_count * LOT.size)):
+                book.apply(self.symbols[symbol_id], quantity, price)
+        return book
+
+    def state_at(self, timestamp):
+        """LotBook as it stood after every event at or before timestamp."""
+        end = self.log.count_until(timestamp)
+        index = bisect_right(self._snapshot_counts, end) - 1
+        if index >= 0:
+            book, start = self._read_snapshot(index), self._snapshot_counts[index]
+        else:
+            book, start = LotBook(), 0
+        return book.replay(self.log.events(start, end), self.symbols)
+
+    def to_portfolio(self, portfolio, timestamp=None):
+        """Fill a StockPortfolio (without a ledger) with the holdings at timestamp, or now."""
+        book = self.book if timestamp is None else self.state_at(timestamp)
+        portfolio.add_stocks(book.holdings())
+        return portfolio
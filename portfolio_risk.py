@@ -0,0 +1,178 @@
+import math
+import operator
+import random
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from price_history import TRADING_DAYS_PER_YEAR
+
+RiskReport = namedtuple("RiskReport", "var cvar contributions value confidence horizon_days paths")
+
+def cholesky(matrix):
+    """Lower-triangular L with L * L^T == matrix (a symmetric positive-definite list of rows)."""
+    size = len(matrix)
+    lower = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(i + 1):
+            total = matrix[i][j] - math.fsum(lower[i][k] * lower[j][k] for k in range(j))
+            if i == j:
+                if total <= 0:
+                    raise ValueError("Correlation matrix is not positive definite")
+                lower[i][j] = math.sqrt(total)
+            else:
+                lower[i][j] = total / lower[j][j]
+    return lower
+
+class RiskModel:
+    """Annual drift, volatility and correlation of a set of symbols."""
+    def __init__(self, symbols, volatilities, correlation, drifts=None):
+        self.symbols = list(symbols)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.volatilities = list(volatilities)
+        self.drifts = list(drifts) if drifts is not None else [0.0] * len(self.symbols)
+        self.correlation = [list(row) for row in correlation]
+        self.lower = cholesky(self.correlation)
+
+    @classmethod
+    def constant(cls, symbols, volatility=0.25, correlation=0.3):
+        """Every symbol with the same volatility and pairwise correlation."""
+        symbols = list(symbols)
+        matrix = [[1.0 if i == j else correlation for j in range(len(symbols))] for i in range(len(symbols))]
+        return cls(symbols, [volatility] * len(symbols), matrix)
+
+    @classmethod
+    def from_history(cls, history, symbols, start=None, end=None):
+        """Estimate the model from daily log returns in a PriceHistory."""
+        symbols = list(symbols)
+        returns = []
+        for symbol in symbols:
+            prices = history.column(symbol, start, end)
+            returns.append(list(map(math.log, map(operator.truediv, prices[1:], prices[:-1]))))
+        if len(returns[0]) < 2:
+            raise ValueError("Need at least three prices to estimate a risk model")
+
+        count = len(returns[0])
+        means = [math.fsum(column) / count for column in returns]
+        deviations = [list(map(operator.sub, column, repeat(mean))) for column, mean in zip(returns, means)]
+        covariance = [[math.fsum(map(operator.mul, a, b)) / (count - 1) for b in deviations] for a in deviations]
+        deviation = [math.sqrt(covariance[i][i]) for i in range(len(symbols))]
+        correlation = [[covariance[i][j] / (deviation[i] * deviation[j]) for j in range(len(symbols))]
+                       for i in range(len(symbols))]
+
+        volatilities = [value * math.sqrt(TRADING_DAYS_PER_YEAR) for value in deviation]
+        drifts = [mean * TRADING_DAYS_PER_YEAR + volatility ** 2 / 2 for mean, volatility in zip(means, volatilities)]
+        return cls(symbols, volatilities, correlation, drifts)
+
+def _standard_normals(rng, count):
+    """count standard normal draws, Box-Muller transformed a whole column at a time."""
+    half = (count + 1) // 2
+    uniform = rng.random
+    radius = list(map(math.sqrt, map(operator.mul, repeat(-2.0),
+                                     map(math.log, [1.0 - uniform() for _ in range(half)]))))
+    angle = list(map(operator.mul, repeat(2 * math.pi), [uniform() for _ in range(half)]))
+    normals = list(map(operator.mul, radius, map(math.cos, angle)))
+    normals += map(operator.mul, radius, map(math.sin, angle))
+    return normals[:count]
+
+def _simulate_block(lower, log_drifts, scales, exposures, paths, seed, tail_size):
+    """Simulate one block of paths and keep each portfolio's worst tail_size outcomes.
+
+    Runs in a worker process. Every step works on a whole column of paths
+    with map(), so the per-path cost stays in C. exposures has one list of
+    (symbol index, market value) per portfolio. For each portfolio this
+    returns its tail P&L and the matching P&L of each held symbol, flattened
+    row by row.
+    """
+    rng = random.Random(seed)
+    shocks = [_standard_normals(rng, paths) for _ in lower]
+
+    returns = []  # Simple return of each symbol on each path
+    for i, row in enumerate(lower):
+        # Chain the row's terms lazily so each path flows through them without intermediate lists
+        correlated = map(operator.mul, shocks[0], repeat(row[0]))
+        for j in range(1, i + 1):
+            correlated = map(operator.add, correlated, map(operator.mul, shocks[j], repeat(row[j])))
+        log_growth = map(operator.add, repeat(log_drifts[i]), map(operator.mul, correlated, repeat(scales[i])))
+        growth = map(math.exp, log_growth)
+        returns.append(list(map(operator.sub, growth, repeat(1.0))))
+
+    tails = []
+    for holdings in exposures:
+        symbol_pnl = [list(map(operator.mul, returns[index], repeat(value))) for index, value in holdings]
+        pnl = [0.0] * paths
+        for column in symbol_pnl:
+            pnl = list(map(operator.add, pnl, column))
+
+        worst = sorted(range(paths), key=pnl.__getitem__)[:tail_size]
+        tail = array("d", map(pnl.__getitem__, worst))
+        rows = array("d", [column[path] for path in worst for column in symbol_pnl])
+        tails.append((tail, rows))
+    return tails
+
+def simulate_risk(portfolios, model=None, paths=100000, confidence=0.99, horizon_days=1,
+                  block_size=25000, workers=1, seed=0):
+    """Monte Carlo VaR and CVaR (expected shortfall) for a batch of StockPortfolios.
+
+    Correlated returns over horizon_days are drawn once per block and shared
+    by every portfolio in the batch. Blocks run in a process pool when
+    workers > 1. Block i is always seeded from (seed, i), so results do not
+    depend on the number of workers. Each report's contributions split
+    CVaR across held symbols (they sum to the CVaR). Returns one RiskReport
+    per portfolio.
+    """
+    portfolios = list(portfolios)
+    held = sorted({symbol for portfolio in portfolios for symbol in portfolio.portfolio})
+    if model is None:
+        model = RiskModel.constant(held)
+    missing = [symbol for symbol in held if symbol not in model.symbol_index]
+    if missing:
+        raise ValueError(f"Risk model has no parameters for {', '.join(missing)}")
+
+    # Only simulate the symbols someone holds
+    indexes = [model.symbol_index[symbol] for symbol in held]
+    correlation = [[model.correlation[i][j] for j in indexes] for i in indexes]
+    lower = cholesky(correlation)
+    horizon = horizon_days / TRADING_DAYS_PER_YEAR
+    log_drifts = [(model.drifts[i] - model.volatilities[i] ** 2 / 2) * horizon for i in indexes]
+    scales = [model.volatilities[i] * math.sqrt(horizon) for i in indexes]
+
+    position = {symbol: i for i, symbol in enumerate(held)}
+    exposures = [[(position[symbol], value) for symbol, value in portfolio.market_values.items()]
+                 for portfolio in portfolios]
+
+    tail_size = max(1, math.ceil(paths * (1 - confidence)))
+    blocks = [min(block_size, paths - start) for start in range(0, paths, block_size)]
+    arguments = [(lower, log_drifts, scales, exposures, count, f"{seed}-{i}", min(tail_size, count))
+                 for i, count in enumerate(blocks)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_simulate_block, *zip(*arguments)))
+    else:
+        results = [_simulate_block(*args) for args in arguments]
+
+    reports = []
+    for number, (portfolio, holdings) in enumerate(zip(portfolios, exposures)):
+        width = len(holdings)
+        candidates = []  # (pnl, block, row) for every block's tail
+        for block, tails in enumerate(results):
+            tail, _ = tails[number]
+            candidates.extend(zip(tail, repeat(block), range(len(tail))))
+        candidates.sort()
+        worst = candidates[:tail_size]
+
+        totals = [0.0] * width
+        for _, block, row in worst:
+            rows = results[block][number][1]
+            totals = list(map(operator.add, totals, rows[row * width:(row + 1) * width]))
+
+        contributions = {held[index]: -total / len(worst) for (index, _), total in zip(holdings, totals)}
+        reports.append(RiskReport(var=-worst[-1][0], cvar=-math.fsum(pnl for pnl, _, _ in worst) / len(worst),
+                                  contributions=contributions, value=portfolio.total_value,
+                                  confidence=confidence, horizon_days=horizon_days, paths=paths))
+    return reports
+
+def portfolio_risk(portfolio, **options):
+    """VaR/CVaR report for one StockPortfolio; options as for simulate_risk."""
+    return simulate_risk([portfolio], **options)[0]
@@ -0,0 +1,214 @@
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    PRIMARY KEY (portfolio_id, symbol)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS holdings_by_symbol ON holdings(symbol, portfolio_id);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_portfolio ON transactions(portfolio_id, timestamp);
+CREATE INDEX IF NOT EXISTS transactions_by_symbol ON transactions(symbol);
+CREATE TABLE IF NOT EXISTS prices (
+    symbol TEXT PRIMARY KEY,
+    price REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+class StoredPortfolio:
+    """Handle to one portfolio in a PortfolioStore.
+
+    Creating a handle costs nothing. Holdings are read from the database
+    the first time they are needed and then kept.
+    """
+    __slots__ = ("store", "id", "name", "_holdings")
+
+    def __init__(self, store, portfolio_id, name):
+        self.store = store
+        self.id = portfolio_id
+        self.name = name
+        self._holdings = None
+
+    def __repr__(self):
+        return f"StoredPortfolio({self.name!r})"
+
+    @property
+    def holdings(self):
+        """{symbol: quantity}, loaded on first access."""
+        if self._holdings is None:
+            rows = self.store.connection.execute(
+                "SELECT symbol, quantity FROM holdings WHERE portfolio_id = ?", (self.id,))
+            self._holdings = {symbol: _as_number(quantity) for symbol, quantity in rows}
+        return self._holdings
+
+    def value(self):
+        """Market value at the store's prices, computed in SQL."""
+        (total,) = self.store.connection.execute(
+            "SELECT COALESCE(SUM(h.quantity * p.price), 0.0) FROM holdings h "
+            "JOIN prices p ON p.symbol = h.symbol WHERE h.portfolio_id = ?", (self.id,)).fetchone()
+        return total
+
+    def load_into(self, portfolio):
+        """Add the stored holdings to a StockPortfolio and return it.
+
+        Raises ValueError if a holding cannot be priced, rather than dropping it.
+        """
+        missing = portfolio.add_stocks(self.holdings)
+        if missing:
+            raise ValueError(f"No price for {', '.join(missing)}")
+        return portfolio
+
+def _as_number(quantity):
+    """Return whole-share quantities as ints, as StockPortfolio stores them."""
+    return int(quantity) if quantity == int(quantity) else quantity
+
+class PortfolioStore:
+    """Many named portfolios and their transactions in one SQLite database.
+
+    Holdings are indexed by portfolio and by symbol, so questions like
+    "who holds NVDA" or "top 100 by value" run inside SQLite without
+    loading portfolios into Python. Writes are batched into one transaction
+    per call.
+    """
+    def __init__(self, path="portfolios.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA cache_size = -65536")  # 64 MB, keeps bulk index inserts in memory
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _portfolio_id(self, name, create=False):
+        row = self.connection.execute("SELECT id FROM portfolios WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            raise KeyError(f"No portfolio named {name!r}")
+        return self.connection.execute("INSERT INTO portfolios (name, created) VALUES (?, ?)",
+                                       (name, time.time())).lastrowid
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM portfolios").fetchone()[0]
+
+    def __contains__(self, name):
+        return self.connection.execute("SELECT 1 FROM portfolios WHERE name = ?", (name,)).fetchone() is not None
+
+    def names(self):
+        """Names of every stored portfolio, in creation order."""
+        return [name for (name,) in self.connection.execute("SELECT name FROM portfolios ORDER BY id")]
+
+    def get(self, name):
+        """A lazy StoredPortfolio handle for one portfolio."""
+        return StoredPortfolio(self, self._portfolio_id(name), name)
+
+    def load(self, name, portfolio):
+        """Load one stored portfolio's holdings into a StockPortfolio."""
+        return self.get(name).load_into(portfolio)
+
+    def save(self, name, portfolio):
+        """Store a StockPortfolio (or {symbol: quantity} dict) under a name."""
+        self.save_many([(name, portfolio)])
+
+    def save_many(self, items):
+        """Store many (name, portfolio or holdings dict) pairs in one transaction.
+
+        Each named portfolio's holdings are replaced. Its prices are recorded
+        too when StockPortfolio objects are given. If a name appears more
+        than once, its last portfolio is the one stored.
+        """
+        rows = []
+        prices = {}
+        with self.connection:
+            for name, portfolio in dict(items).items():
+                portfolio_id = self._portfolio_id(name, create=True)
+                self.connection.execute("DELETE FROM holdings WHERE portfolio_id = ?", (portfolio_id,))
+                rows.extend((portfolio_id, symbol, quantity)
+                            for symbol, quantity in getattr(portfolio, "portfolio", portfolio).items())
+                prices.update(getattr(portfolio, "prices", ()))
+
+            self.connection.executemany("INSERT INTO holdings (portfolio_id, symbol, quantity) VALUES (?, ?, ?)",
+                                        rows)
+            self._write_prices(prices)
+
+    def delete(self, name):
+        """Remove a portfolio with its holdings and transactions."""
+        with self.connection:
+            self.connection.execute("DELETE FROM portfolios WHERE id = ?", (self._portfolio_id(name),))
+
+    def record_transactions(self, name, trades):
+        """Apply (symbol, quantity, price) trades to a portfolio in one transaction.
+
+        Negative quantities are sales. Every trade is logged in the
+        transactions table, and holdings are adjusted with an upsert.
+        Positions that reach zero are deleted.
+        """
+        now = time.time()
+        trades = [(symbol.upper(), quantity, price) for symbol, quantity, price in trades]
+        with self.connection:
+            portfolio_id = self._portfolio_id(name, create=True)
+            self.connection.executemany(
+                "INSERT INTO transactions (portfolio_id, symbol, quantity, price, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [(portfolio_id, symbol, quantity, price, now) for symbol, quantity, price in trades])
+            self.connection.executemany(
+                "INSERT INTO holdings (portfolio_id, symbol, quantity) VALUES (?, ?, ?) "
+                "ON CONFLICT (portfolio_id, symbol) DO UPDATE SET quantity = quantity + excluded.quantity",
+                [(portfolio_id, symbol, quantity) for symbol, quantity, _ in trades])
+            self.connection.execute("DELETE FROM holdings WHERE portfolio_id = ? AND quantity <= 0",
+                                    (portfolio_id,))
+
+    def transactions(self, name):
+        """(symbol, quantity, price, timestamp) rows for a portfolio, oldest first."""
+        return self.connection.execute(
+            "SELECT symbol, quantity, price, timestamp FROM transactions "
+            "WHERE portfolio_id = ? ORDER BY timestamp, id", (self._portfolio_id(name),)).fetchall()
+
+    def _write_prices(self, prices):
+        self.connection.executemany(
+            "INSERT INTO prices (symbol, price) VALUES (?, ?) "
+            "ON CONFLICT (symbol) DO UPDATE SET price = excluded.price", prices.items())
+
+    def update_prices(self, prices):
+        """Store {symbol: price} quotes used by value queries."""
+        with self.connection:
+            self._write_prices(prices)
+
+    def portfolios_holding(self, symbol):
+        """Names of portfolios that hold a symbol (uses the symbol index)."""
+        return [name for (name,) in self.connection.execute(
+            "SELECT p.name FROM holdings h JOIN portfolios p ON p.id = h.portfolio_id "
+            "WHERE h.symbol = ? ORDER BY p.id", (symbol.upper(),))]
+
+    def top_by_value(self, limit=100):
+        """(name, value) of the most valuable portfolios at the stored prices."""
+        return self.connection.execute(
+            "SELECT p.name, v.value FROM ("
+            "  SELECT h.portfolio_id, SUM(h.quantity * pr.price) AS value FROM holdings h"
+            "  JOIN prices pr ON pr.symbol = h.symbol GROUP BY h.portfolio_id"
+            "  ORDER BY value DESC LIMIT ?"
+            ") v JOIN portfolios p ON p.id = v.portfolio_id ORDER BY v.value DESC", (limit,)).fetchall()
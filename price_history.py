@@ -0,0 +1,220 @@
+import math
+import mmap
+import operator
+import os
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from itertools import accumulate, repeat
+
+DATES_FILE = "dates.i32"  # int32 date ordinals, ascending
+SYMBOLS_FILE = "symbols.txt"  # one symbol per line, in column order
+COLUMN_SUFFIX = ".f64"  # one float64 price per date; NaN where there is no price
+
+TRADING_DAYS_PER_YEAR = 252
+
+def _as_ordinal(day):
+    return day.toordinal() if isinstance(day, date) else int(day)
+
+def _normalize_symbol(symbol):
+    """Symbols are listed, looked up and named on disk in upper case."""
+    return symbol.upper()
+
+class PriceHistory:
+    """Daily closing prices stored as one memory-mapped column per symbol.
+
+    A directory holds the date index and one raw float64 file per symbol.
+    Columns are mapped when first used, and column() returns memoryview
+    slices of the mapped pages, so range queries copy nothing. Appending a
+    day adds one value to every column file.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, SYMBOLS_FILE), encoding="utf-8") as file:
+            self.symbols = [_normalize_symbol(symbol) for symbol in file.read().split()]
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._maps = {}
+        self._dates = self._map(DATES_FILE, "i")
+
+    def __len__(self):
+        return len(self._dates)
+
+    def __contains__(self, symbol):
+        return _normalize_symbol(symbol) in self.symbol_index
+
+    @classmethod
+    def create(cls, directory, dates, columns):
+        """Write a new store from a list of dates and {symbol: prices} columns."""
+        dates = array("i", map(_as_ordinal, dates))
+        if any(later <= earlier for earlier, later in zip(dates, dates[1:])):
+            raise ValueError("Dates must be strictly increasing")
+        normalized = {_normalize_symbol(symbol): prices for symbol, prices in columns.items()}
+        if len(normalized) != len(columns):
+            raise ValueError("Symbols must be unique regardless of case")
+        columns = normalized
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, DATES_FILE), "wb") as file:
+            dates.tofile(file)
+        for symbol, prices in columns.items():
+            prices = array("d", prices)
+            if len(prices) != len(dates):
+                raise ValueError(f"{symbol} has {len(prices)} prices for {len(dates)} dates")
+            with open(os.path.join(directory, symbol + COLUMN_SUFFIX), "wb") as file:
+                prices.tofile(file)
+        with open(os.path.join(directory, SYMBOLS_FILE), "w", encoding="utf-8") as file:
+            file.write("".join(symbol + "\n" for symbol in columns))
+        return cls(directory)
+
+    def _map(self, name, typecode):
+        """Map one file read-only as a typed memoryview (empty files give an empty array)."""
+        with open(os.path.join(self.directory, name), "rb") as file:
+            if not os.fstat(file.fileno()).st_size:
+                return memoryview(array(typecode))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[name] = mapped
+        return memoryview(mapped).cast(typecode)
+
+    @property
+    def dates(self):
+        """Date ordinals of every row (a zero-copy int32 view)."""
+        return self._dates
+
+    def date(self, index):
+        return date.fromordinal(self._dates[index])
+
+    def rows(self, start=None, end=None):
+        """(first, stop) row numbers for dates between start and end inclusive."""
+        first = 0 if start is None else bisect_left(self._dates, _as_ordinal(start))
+        stop = len(self._dates) if end is None else bisect_right(self._dates, _as_ordinal(end))
+        return first, max(first, stop)
+
+    def column(self, symbol, start=None, end=None):
+        """Prices of one symbol between two dates, as a zero-copy float64 view."""
+        name = _normalize_symbol(symbol) + COLUMN_SUFFIX
+        mapped = self._maps.get(name)
+        view = self._map(name, "d") if mapped is None else memoryview(mapped).cast("d")
+        first, stop = self.rows(start, end)
+        return view[first:stop]
+
+    def latest_prices(self):
+        """{symbol: last price}, usable as a StaticPriceProvider source."""
+        return {symbol: self.column(symbol)[-1] for symbol in self.symbols} if len(self) else {}
+
+    def append(self, day, prices):
+        """Add one day of {symbol: price}; symbols left out get NaN, new symbols are backfilled with NaN."""
+        ordinal = _as_ordinal(day)
+        if len(self._dates) and ordinal <= self._dates[-1]:
+            raise ValueError(f"{date.fromordinal(ordinal)} is not after the last stored date")
+
+        prices = {_normalize_symbol(symbol): price for symbol, price in prices.items()}
+        for symbol in prices:
+            if symbol not in self.symbol_index:
+                with open(os.path.join(self.directory, symbol + COLUMN_SUFFIX), "wb") as file:
+                    array("d", repeat(math.nan, len(self._dates))).tofile(file)
+                with open(os.path.join(self.directory, SYMBOLS_FILE), "a", encoding="utf-8") as file:
+                    file.write(symbol + "\n")
+                self.symbol_index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+
+        for symbol in self.symbols:
+            with open(os.path.join(self.directory, symbol + COLUMN_SUFFIX), "ab") as file:
+                array("d", [prices.get(symbol, math.nan)]).tofile(file)
+        with open(os.path.join(self.directory, DATES_FILE), "ab") as file:
+            array("i", [ordinal]).tofile(file)
+
+        # Existing maps no longer cover the files; map again on next use
+        self._maps = {}
+        self._dates = self._map(DATES_FILE, "i")
+
+def portfolio_values(history, holdings, start=None, end=None):
+    """Daily market value of {symbol: quantity} holdings between two dates.
+
+    Accepts a StockPortfolio too. Each symbol's column is scaled and added
+    with map() over the mapped pages, so the work per day runs in C.
+    """
+    holdings = getattr(holdings, "portfolio", holdings)
+    first, stop = history.rows(start, end)
+    values = [0.0] * (stop - first)
+    for symbol, quantity in holdings.items():
+        if symbol not in history:
+            raise ValueError(f"No price history for {symbol}")
+        column = history.column(symbol, start, end)
+        values = list(map(operator.add, values, map(operator.mul, column, repeat(quantity))))
+    return array("d", values)
+
+def daily_returns(values):
+    """Simple returns between consecutive values.
+
+    Raises ValueError if a value other than the last is zero, as the return
+    after it is undefined.
+    """
+    if 0.0 in values[:-1]:
+        raise ValueError("Cannot compute returns after a day with zero value")
+    return array("d", map(operator.sub, map(operator.truediv, values[1:], values[:-1]), repeat(1.0)))
+
+def drawdowns(values):
+    """Fall from the running peak on each day, as a negative fraction.
+
+    Raises ValueError while the running peak is zero.
+    """
+    peaks = array("d", accumulate(values, max))
+    if 0.0 in peaks:
+        raise ValueError("Cannot compute drawdowns while the peak value is zero")
+    return array("d", map(operator.sub, map(operator.truediv, values, peaks), repeat(1.0)))
+
+def annualized_volatility(returns, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """Standard deviation of returns scaled to a year."""
+    if len(returns) < 2:
+        return 0.0
+    mean = math.fsum(returns) / len(returns)
+    deviations = array("d", map(operator.sub, returns, repeat(mean)))
+    variance = math.fsum(map(operator.mul, deviations, deviations)) / (len(returns) - 1)
+    return math.sqrt(variance * periods_per_year)
+
+def analyze(history, holdings, start=None, end=None):
+    """Summary statistics for holdings (or a StockPortfolio) over a date range."""
+    values = portfolio_values(history, holdings, start, end)
+    if not values:
+        raise ValueError("No prices in the requested date range")
+    if 0.0 in values:
+        raise ValueError("Holdings have no market value on some days in the requested date range")
+    first, stop = history.rows(start, end)
+    returns = daily_returns(values)
+    return {
+        "start": history.date(first),
+        "end": history.date(stop - 1),
+        "start_value": values[0],
+        "end_value": values[-1],
+        "total_return": values[-1] / values[0] - 1,
+        "volatility": annualized_volatility(returns),
+        "max_drawdown": min(drawdowns(values)),
+    }
+
+def business_days(start, count):
+    """The first count weekdays from start onwards."""
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def generate_history(directory, start_prices, days=TRADING_DAYS_PER_YEAR * 10, start=date(2015, 1, 1),
+                     drift=0.07, volatility=0.25, seed=None):
+    """Write a synthetic store of geometric Brownian motion prices.
+
+    start_prices is {symbol: first price}, for example STOCK_PRICES.
+    drift and volatility are annual.
+    """
+    rng = random.Random(seed)
+    step_drift = (drift - volatility ** 2 / 2) / TRADING_DAYS_PER_YEAR
+    step_volatility = volatility / math.sqrt(TRADING_DAYS_PER_YEAR)
+
+    columns = {}
+    for symbol, price in start_prices.items():
+        shocks = (math.exp(step_drift + step_volatility * rng.gauss(0.0, 1.0)) for _ in range(days - 1))
+        columns[symbol] = array("d", accumulate(shocks, operator.mul, initial=price))
+    return PriceHistory.create(directory, business_days(start, days), columns)
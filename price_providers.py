@@ -0,0 +1,224 @@
+import bisect
+import csv
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class PriceProvider:
+    """Source of stock quotes.
+
+    Subclasses implement symbols() and get_quotes(). get_quotes() takes a
+    batch of symbols and returns {symbol: price}, leaving out unknown
+    symbols.
+    """
+    def symbols(self):
+        """Every symbol this provider can quote."""
+        raise NotImplementedError
+
+    def get_quotes(self, symbols):
+        """Quote a batch of symbols as {symbol: price}."""
+        raise NotImplementedError
+
+    def get_quote(self, symbol):
+        """Quote one symbol, or None if it is unknown."""
+        return self.get_quotes([symbol]).get(symbol)
+
+    def has_symbol(self, symbol):
+        """Check whether a symbol can be quoted."""
+        return symbol in self.symbols()
+
+class StaticPriceProvider(PriceProvider):
+    """Quotes read straight from a {symbol: price} dict, such as STOCK_PRICES."""
+    def __init__(self, prices):
+        self.prices = prices
+
+    def symbols(self):
+        return list(self.prices)
+
+    def has_symbol(self, symbol):
+        return symbol in self.prices
+
+    def get_quotes(self, symbols):
+        prices = self.prices
+        return {symbol: prices[symbol] for symbol in symbols if symbol in prices}
+
+class SimulatedPriceProvider(PriceProvider):
+    """Offline provider whose prices follow a seeded random walk.
+
+    Each call to get_quotes moves every requested symbol one step. latency
+    seconds are slept per call to stand in for a network round trip, and
+    fetch_calls counts the calls so caching and coalescing can be checked.
+    """
+    def __init__(self, base_prices, volatility=0.01, latency=0.0, seed=None):
+        self.prices = dict(base_prices)
+        self.volatility = volatility
+        self.latency = latency
+        self.fetch_calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def symbols(self):
+        return list(self.prices)
+
+    def has_symbol(self, symbol):
+        return symbol in self.prices
+
+    def get_quotes(self, symbols):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.fetch_calls += 1
+            quotes = {}
+            for symbol in symbols:
+                if symbol in self.prices:
+                    price = self.prices[symbol] * (1 + self._rng.gauss(0, self.volatility))
+                    self.prices[symbol] = round(max(price, 0.01), 2)
+                    quotes[symbol] = self.prices[symbol]
+            return quotes
+
+class ReplayPriceProvider(PriceProvider):
+    """Offline provider that replays recorded ticks from a CSV file.
+
+    The file has timestamp, symbol and price columns. Quotes are the latest
+    price of each symbol at or before the current replay time, which starts
+    at the first tick and moves with seek() or advance().
+    """
+    def __init__(self, path):
+        self.ticks = {}  # symbol -> ([timestamps], [prices]), both sorted by time
+        rows = []
+        with open(path, newline='') as file:
+            for row in csv.DictReader(file):
+                rows.append((float(row['timestamp']), row['symbol'].upper(), float(row['price'])))
+        rows.sort()
+
+        for timestamp, symbol, price in rows:
+            times, prices = self.ticks.setdefault(symbol, ([], []))
+            times.append(timestamp)
+            prices.append(price)
+
+        self.timestamps = sorted({row[0] for row in rows})
+        self.position = 0
+        self.fetch_calls = 0
+
+    @property
+    def current_time(self):
+        return self.timestamps[self.position] if self.timestamps else 0.0
+
+    def seek(self, timestamp):
+        """Move the replay to the last recorded time at or before timestamp."""
+        self.position = max(0, bisect.bisect_right(self.timestamps, timestamp) - 1)
+
+    def advance(self, steps=1):
+        """Move the replay forward by a number of recorded timestamps."""
+        self.position = min(self.position + steps, len(self.timestamps) - 1)
+
+    def symbols(self):
+        return list(self.ticks)
+
+    def has_symbol(self, symbol):
+        return symbol in self.ticks
+
+    def get_quotes(self, symbols):
+        self.fetch_calls += 1
+        now = self.current_time
+        quotes = {}
+        for symbol in symbols:
+            if symbol in self.ticks:
+                times, prices = self.ticks[symbol]
+                index = bisect.bisect_right(times, now) - 1
+                if index >= 0:
+                    quotes[symbol] = prices[index]
+        return quotes
+
+class CachedPriceProvider(PriceProvider):
+    """Bounded TTL/LRU quote cache in front of another provider.
+
+    Symbols that are missing or expired are fetched upstream in batches of
+    at most batch_size. While a symbol is being fetched, other threads that
+    want it wait for that fetch instead of starting their own. So 1,000
+    concurrent valuations of AAPL cost one upstream request.
+    """
+    def __init__(self, provider, ttl=5.0, maxsize=10000, batch_size=500, clock=time.monotonic):
+        self.provider = provider
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._cache = OrderedDict()  # symbol -> (price, expires at)
+        self._inflight = {}  # symbol -> Future of its price
+        self._lock = threading.Lock()
+
+    def symbols(self):
+        return self.provider.symbols()
+
+    def has_symbol(self, symbol):
+        return self.provider.has_symbol(symbol)
+
+    def invalidate(self, symbols=None):
+        """Drop cached quotes for some symbols, or for all of them."""
+        with self._lock:
+            if symbols is None:
+                self._cache.clear()
+            else:
+                for symbol in symbols:
+                    self._cache.pop(symbol, None)
+
+    def get_quotes(self, symbols):
+        now = self.clock()
+        quotes = {}
+        to_fetch = []
+        waiting = {}
+
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self._cache.get(symbol)
+                if entry is not None and entry[1] > now:
+                    self._cache.move_to_end(symbol)
+                    quotes[symbol] = entry[0]
+                    self.hits += 1
+                elif symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                    self.coalesced += 1
+                else:
+                    self._inflight[symbol] = Future()
+                    to_fetch.append(symbol)
+                    self.misses += 1
+
+        start = 0
+        try:
+            for start in range(0, len(to_fetch), self.batch_size):
+                quotes.update(self._fetch(to_fetch[start:start + self.batch_size]))
+        except BaseException as error:
+            # Fail this batch and every later one, so no waiter is left on a fetch that never runs
+            with self._lock:
+                futures = [self._inflight.pop(symbol) for symbol in to_fetch[start:]]
+            for future in futures:
+                future.set_exception(error)
+            raise
+
+        for symbol, future in waiting.items():
+            price = future.result()
+            if price is not None:
+                quotes[symbol] = price
+        return quotes
+
+    def _fetch(self, batch):
+        """Fetch one batch upstream, then cache it and wake any waiting threads."""
+        fetched = self.provider.get_quotes(batch)
+        expires = self.clock() + self.ttl
+        with self._lock:
+            for symbol, price in fetched.items():
+                self._cache[symbol] = (price, expires)
+                self._cache.move_to_end(symbol)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            futures = [(self._inflight.pop(symbol), fetched.get(symbol)) for symbol in batch]
+
+        for future, price in futures:
+            future.set_result(price)
+        return fetched
@@ -1,65 +1,137 @@
-import random
+import sys
+
+from hangman_words import LETTER_BITS, WordSource
 
 # Small list of 5 predefined words
 words = ["python", "computer", "game", "code", "fun"]
 
-# Select a random word
-word = random.choice(words)
-guessed_letters = []
-incorrect_guesses = 0
-max_incorrect = 6
-
-print("Welcome to Hangman!")
-print("You have 6 incorrect guesses allowed.")
-print("Word to guess: " + "_ " * len(word))
-
-# Main game loop
-while incorrect_guesses < max_incorrect:
-    # Display current progress
-    display = ""
-    for letter in word:
-        if letter in guessed_letters:
-            display += letter + " "
-        else:
-            display += "_ "
-    
-    print(f"\nCurrent word: {display}")
-    print(f"Incorrect guesses: {incorrect_guesses}/{max_incorrect}")
-    
-    if guessed_letters:
-        print(f"Letters guessed: {', '.join(guessed_letters)}")
-    
-    # Check if word is complete
-    word_complete = True
-    for letter in word:
-        if letter not in guessed_letters:
-            word_complete = False
+# Word source used when no dictionary file is given
+DEFAULT_WORDS = WordSource.from_words(words)
+
+# Outcomes of HangmanGame.guess
+HIT = "hit"
+MISS = "miss"
+REPEATED = "repeated"
+
+class HangmanGame:
+    """State of one Hangman game, with no input or output.
+
+    Guessed letters are a bitmask, and each letter of the word maps to the
+    positions it fills, so a guess costs one dict lookup plus the positions
+    it reveals. The revealed word is kept up to date as guesses land, and
+    the count of letters still hidden makes the win check a comparison.
+    """
+    __slots__ = ("word", "max_incorrect", "guessed", "guessed_letters", "incorrect_guesses",
+                 "remaining", "_positions", "_display")
+
+    def __init__(self, word, max_incorrect=6):
+        word = word.lower()
+        if not word or any(letter not in LETTER_BITS for letter in word):
+            raise ValueError(f"Words must be made of the letters a-z: {word!r}")
+        positions = {}
+        for i, letter in enumerate(word):
+            positions.setdefault(letter, []).append(i)
+
+        self.word = word
+        self.max_incorrect = max_incorrect
+        self.guessed = 0  # Bitmask of LETTER_BITS
+        self.guessed_letters = []  # In the order they were guessed
+        self.incorrect_guesses = 0
+        self.remaining = len(positions)  # Distinct letters not yet revealed
+        self._positions = positions
+        self._display = ["_"] * len(word)
+
+    @property
+    def won(self):
+        return not self.remaining
+
+    @property
+    def lost(self):
+        return self.incorrect_guesses >= self.max_incorrect
+
+    @property
+    def over(self):
+        return not self.remaining or self.incorrect_guesses >= self.max_incorrect
+
+    def has_guessed(self, letter):
+        return bool(self.guessed & LETTER_BITS.get(letter, 0))
+
+    def revealed(self, letter):
+        """Positions a guessed letter filled; empty for a miss."""
+        if not self.has_guessed(letter):
+            raise ValueError(f"{letter!r} has not been guessed")
+        return self._positions.get(letter, ())
+
+    def mask(self):
+        """The word with unrevealed letters shown as underscores, e.g. "p _ t h o n"."""
+        return " ".join(self._display)
+
+    def guess(self, letter):
+        """Guess one lowercase letter and return HIT, MISS or REPEATED."""
+        bit = LETTER_BITS.get(letter)
+        if bit is None:
+            raise ValueError(f"Guesses must be a single letter a-z: {letter!r}")
+        if self.over:
+            raise ValueError("The game is already over")
+        if self.guessed & bit:
+            return REPEATED
+
+        self.guessed |= bit
+        self.guessed_letters.append(letter)
+        positions = self._positions.get(letter)
+        if positions is None:
+            self.incorrect_guesses += 1
+            return MISS
+
+        display = self._display
+        for i in positions:
+            display[i] = letter
+        self.remaining -= 1
+        return HIT
+
+def main():
+    """Play one game of Hangman on the terminal.
+
+    An optional dictionary file (one word per line) replaces the built-in
+    words; its index is built next to it on first use.
+    """
+    source = WordSource.from_word_file(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORDS
+    game = HangmanGame(source.choose())
+
+    print("Welcome to Hangman!")
+    print(f"You have {game.max_incorrect} incorrect guesses allowed.")
+    print("Word to guess: " + "_ " * len(game.word))
+
+    # Main game loop
+    while not game.lost:
+        print(f"\nCurrent word: {game.mask()}")
+        print(f"Incorrect guesses: {game.incorrect_guesses}/{game.max_incorrect}")
+
+        if game.guessed_letters:
+            print(f"Letters guessed: {', '.join(game.guessed_letters)}")
+
+        if game.won:
+            print(f"\nCongratulations! You guessed the word: {game.word}")
             break
-    
-    if word_complete:
-        print(f"\nCongratulations! You guessed the word: {word}")
-        break
-    
-    # Get player input
-    guess = input("Enter a letter: ").lower()
-    
-    # Check if letter already guessed
-    if guess in guessed_letters:
-        print("You already guessed that letter!")
-        continue
-    
-    # Add to guessed letters
-    guessed_letters.append(guess)
-    
-    # Check if guess is correct
-    if guess in word:
-        print(f"Good guess! '{guess}' is in the word.")
-    else:
-        incorrect_guesses += 1
-        print(f"Sorry, '{guess}' is not in the word.")
-
-# Check if game ended due to too many incorrect guesses
-if incorrect_guesses >= max_incorrect:
-    print(f"\nGame over! The word was: {word}")
-
-print("Thanks for playing!")
\ No newline at end of file
+
+        guess = input("Enter a letter: ").lower().strip()
+        try:
+            result = game.guess(guess)
+        except ValueError:
+            print("Please enter a single letter.")
+            continue
+
+        if result == REPEATED:
+            print("You already guessed that letter!")
+        elif result == HIT:
+            print(f"Good guess! '{guess}' is in the word.")
+        else:
+            print(f"Sorry, '{guess}' is not in the word.")
+
+    if game.lost:
+        print(f"\nGame over! The word was: {game.word}")
+
+    print("Thanks for playing!")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
-import csv
-from datetime import datetime
+import math
+
+from portfolio_export import export_in_background, export_portfolio
+from portfolio_import import import_holdings
+from portfolio_store import PortfolioStore
+from price_providers import StaticPriceProvider
 
 # Hardcoded stock prices dictionary
 STOCK_PRICES = {
@@ -15,9 +19,18 @@ STOCK_PRICES = {
     "INTC": 45.00
 }
 
+# Default quote source: the static prices above
+DEFAULT_PRICE_PROVIDER = StaticPriceProvider(STOCK_PRICES)
+
 class StockPortfolio:
-    def __init__(self):
+    def __init__(self, price_provider=None, ledger=None):
         self.portfolio = {}
+        self.price_provider = price_provider or DEFAULT_PRICE_PROVIDER
+        self.ledger = ledger  # Optional portfolio_ledger.Ledger recording every trade
+        
+        # Running aggregates, updated on every change so reads are O(1)
+        self.prices = {}          # Price each holding is valued at
+        self.market_values = {}   # Quantity * price per holding
         self.total_value = 0.0
     
     def display_available_stocks(self):
@@ -25,28 +38,136 @@ class StockPortfolio:
         print("\n" + "="*50)
         print("AVAILABLE STOCKS")
         print("="*50)
-        for stock, price in STOCK_PRICES.items():
+        quotes = self.price_provider.get_quotes(self.price_provider.symbols())
+        for stock, price in quotes.items():
             print(f"{stock:<8} ${price:>8.2f}")
         print("="*50)
     
+    def _revalue(self, symbol):
+        """Refresh one holding's market value and adjust the total by the difference."""
+        old_value = self.market_values.get(symbol, 0.0)
+        if symbol in self.portfolio:
+            new_value = self.portfolio[symbol] * self.prices[symbol]
+            self.market_values[symbol] = new_value
+        else:
+            new_value = 0.0
+            self.market_values.pop(symbol, None)
+            self.prices.pop(symbol, None)
+        
+        self.total_value += new_value - old_value
+        if not self.portfolio:
+            self.total_value = 0.0  # Don't let rounding drift outlive the holdings
+    
     def add_stock(self, symbol, quantity):
         """Add a stock to the portfolio."""
+        if not quantity > 0:
+            raise ValueError(f"Quantity to add must be positive, not {quantity}")
         symbol = symbol.upper()
-        if symbol in STOCK_PRICES:
+        if symbol in self.portfolio:
+            price = self.prices[symbol]
+        else:
+            price = self.price_provider.get_quote(symbol)
+            if price is None:
+                return False
+        
+        # Record the trade first, so a ledger error leaves the holdings untouched
+        if self.ledger is not None:
+            self.ledger.buy(symbol, quantity, price)
+        self.portfolio[symbol] = self.portfolio.get(symbol, 0) + quantity
+        self.prices[symbol] = price
+        self._revalue(symbol)
+        return True
+    
+    def add_stocks(self, holdings):
+        """Add many {symbol: quantity} holdings, quoting new symbols in one batch.
+        
+        Returns the symbols that could not be priced. Raises ValueError,
+        before changing anything, if a quantity is not positive.
+        """
+        holdings = {symbol.upper(): quantity for symbol, quantity in holdings.items()}
+        for symbol, quantity in holdings.items():
+            if not quantity > 0:
+                raise ValueError(f"Quantity to add must be positive, not {quantity} for {symbol}")
+        new_symbols = [symbol for symbol in holdings if symbol not in self.portfolio]
+        quotes = self.price_provider.get_quotes(new_symbols) if new_symbols else {}
+        
+        missing = []
+        for symbol, quantity in holdings.items():
             if symbol in self.portfolio:
-                self.portfolio[symbol] += quantity
+                price = self.prices[symbol]
+            elif symbol in quotes:
+                price = quotes[symbol]
             else:
-                self.portfolio[symbol] = quantity
-            return True
-        return False
+                missing.append(symbol)
+                continue
+            if self.ledger is not None:
+                self.ledger.buy(symbol, quantity, price)
+            self.portfolio[symbol] = self.portfolio.get(symbol, 0) + quantity
+            self.prices[symbol] = price
+            self._revalue(symbol)
+        return missing
+    
+    def import_csv(self, filenames, processes=None):
+        """Bulk-load holdings or trades from CSV files; returns an ImportReport."""
+        return import_holdings(self, filenames, processes=processes)
+    
+    def remove_stock(self, symbol, quantity=None):
+        """Remove some (or, without a quantity, all) shares of a stock."""
+        if quantity is not None and not quantity > 0:
+            raise ValueError(f"Quantity to remove must be positive, not {quantity}")
+        symbol = symbol.upper()
+        if symbol not in self.portfolio:
+            return False
+        
+        held = self.portfolio[symbol]
+        if quantity is None or quantity > held:
+            quantity = held
+        if self.ledger is not None:
+            self.ledger.sell(symbol, quantity, self.prices[symbol])
+        
+        if quantity == held:
+            del self.portfolio[symbol]
+        else:
+            self.portfolio[symbol] -= quantity
+        self._revalue(symbol)
+        return True
+    
+    def update_price(self, symbol, price):
+        """Revalue a holding at a new price."""
+        symbol = symbol.upper()
+        if symbol not in self.portfolio:
+            return False
+        
+        self.prices[symbol] = price
+        self._revalue(symbol)
+        return True
+    
+    def refresh_prices(self):
+        """Revalue every holding at the provider's latest quotes in one batched fetch."""
+        quotes = self.price_provider.get_quotes(list(self.portfolio))
+        for symbol, price in quotes.items():
+            self.update_price(symbol, price)
+        return len(quotes)
     
     def calculate_total_value(self):
-        """Calculate the total portfolio value."""
-        self.total_value = 0.0
-        for symbol, quantity in self.portfolio.items():
-            self.total_value += quantity * STOCK_PRICES[symbol]
+        """Return the total portfolio value (kept up to date on every change)."""
+        return self.total_value
+    
+    def recalculate_total_value(self):
+        """Rebuild the running total from scratch, removing any rounding drift."""
+        self.total_value = math.fsum(self.market_values.values())
         return self.total_value
     
+    def get_weight(self, symbol):
+        """Fraction of the portfolio's value held in one stock."""
+        if not self.total_value:
+            return 0.0
+        return self.market_values.get(symbol.upper(), 0.0) / self.total_value
+    
+    def get_weights(self):
+        """Fraction of the portfolio's value held in each stock."""
+        return {symbol: self.get_weight(symbol) for symbol in self.portfolio}
+    
     def display_portfolio(self):
         """Display the current portfolio."""
         if not self.portfolio:
@@ -59,44 +180,19 @@ class StockPortfolio:
         print(f"{'Stock':<8} {'Quantity':<10} {'Price':<10} {'Total Value':<15}")
         print("-"*70)
         
-        total_value = 0.0
         for symbol, quantity in self.portfolio.items():
-            price = STOCK_PRICES[symbol]
-            stock_value = quantity * price
-            total_value += stock_value
+            price = self.prices[symbol]
+            stock_value = self.market_values[symbol]
             print(f"{symbol:<8} {quantity:<10} ${price:<9.2f} ${stock_value:<14.2f}")
         
         print("-"*70)
-        print(f"{'TOTAL PORTFOLIO VALUE:':<43} ${total_value:<14.2f}")
+        print(f"{'TOTAL PORTFOLIO VALUE:':<43} ${self.total_value:<14.2f}")
         print("="*70)
-        
-        self.total_value = total_value
     
     def save_to_txt(self, filename="portfolio.txt"):
         """Save portfolio to a text file."""
         try:
-            with open(filename, 'w') as file:
-                file.write("STOCK PORTFOLIO REPORT\n")
-                file.write("="*50 + "\n")
-                file.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
-                if not self.portfolio:
-                    file.write("Portfolio is empty.\n")
-                    return True
-                
-                file.write(f"{'Stock':<8} {'Quantity':<10} {'Price':<10} {'Total Value':<15}\n")
-                file.write("-"*50 + "\n")
-                
-                total_value = 0.0
-                for symbol, quantity in self.portfolio.items():
-                    price = STOCK_PRICES[symbol]
-                    stock_value = quantity * price
-                    total_value += stock_value
-                    file.write(f"{symbol:<8} {quantity:<10} ${price:<9.2f} ${stock_value:<14.2f}\n")
-                
-                file.write("-"*50 + "\n")
-                file.write(f"TOTAL PORTFOLIO VALUE: ${total_value:.2f}\n")
-            
+            export_portfolio(self, [filename], format="txt")
             print(f"Portfolio saved to {filename}")
             return True
         except Exception as e:
@@ -106,23 +202,22 @@ class StockPortfolio:
     def save_to_csv(self, filename="portfolio.csv"):
         """Save portfolio to a CSV file."""
         try:
-            with open(filename, 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Stock Symbol', 'Quantity', 'Price per Share', 'Total Value'])
-                
-                for symbol, quantity in self.portfolio.items():
-                    price = STOCK_PRICES[symbol]
-                    stock_value = quantity * price
-                    writer.writerow([symbol, quantity, price, stock_value])
-                
-                # Add total row
-                writer.writerow(['TOTAL', '', '', self.total_value])
-            
+            export_portfolio(self, [filename], format="csv")
             print(f"Portfolio saved to {filename}")
             return True
         except Exception as e:
             print(f"Error saving to CSV: {e}")
             return False
+    
+    def save_reports(self, filenames=("portfolio.txt", "portfolio.csv"), background=False, **options):
+        """Export to several files (.txt, .csv, .pcol, optionally .gz) in one pass.
+        
+        Returns {filename: bytes written}, or with background=True a Future
+        for it while the files are written on another thread.
+        """
+        if background:
+            return export_in_background(self, filenames, **options)
+        return export_portfolio(self, filenames, **options)
 
 def main():
     """Main function to run the stock portfolio tracker."""
@@ -140,10 +235,14 @@ def main():
         print("3. View portfolio")
         print("4. Save portfolio to TXT file")
         print("5. Save portfolio to CSV file")
-        print("6. Exit")
+        print("6. Save portfolio to TXT and CSV files")
+        print("7. Import holdings from CSV files")
+        print("8. Save portfolio to database")
+        print("9. Load portfolio from database")
+        print("10. Exit")
         print("="*40)
         
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-10): ").strip()
         
         if choice == '1':
             portfolio.display_available_stocks()
@@ -156,7 +255,7 @@ def main():
                 if symbol.lower() == 'back':
                     break
                 
-                if symbol.upper() not in STOCK_PRICES:
+                if not portfolio.price_provider.has_symbol(symbol.upper()):
                     print(f"Stock '{symbol}' not found. Please choose from available stocks.")
                     continue
                 
@@ -178,25 +277,78 @@ def main():
         
         elif choice == '4':
             if portfolio.portfolio:
-                portfolio.calculate_total_value()
                 portfolio.save_to_txt()
             else:
                 print("Your portfolio is empty. Add some stocks first!")
         
         elif choice == '5':
             if portfolio.portfolio:
-                portfolio.calculate_total_value()
                 portfolio.save_to_csv()
             else:
                 print("Your portfolio is empty. Add some stocks first!")
         
         elif choice == '6':
+            if portfolio.portfolio:
+                try:
+                    for filename in portfolio.save_reports():
+                        print(f"Portfolio saved to {filename}")
+                except Exception as e:
+                    print(f"Error saving portfolio: {e}")
+            else:
+                print("Your portfolio is empty. Add some stocks first!")
+        
+        elif choice == '7':
+            filenames = input("Enter CSV file names (separated by spaces): ").split()
+            if not filenames:
+                continue
+            
+            try:
+                report = portfolio.import_csv(filenames, processes=len(filenames))
+            except (OSError, ValueError) as e:
+                print(f"Error importing: {e}")
+                continue
+            
+            print(f"Imported {report.accepted} rows ({report.rejected} rejected) "
+                  f"in {report.seconds:.2f}s ({report.rows_per_second:,.0f} rows/s)")
+            for filename, line, reason in report.errors:
+                print(f"   {filename}:{line}: {reason}")
+        
+        elif choice == '8':
+            if not portfolio.portfolio:
+                print("Your portfolio is empty. Add some stocks first!")
+                continue
+            
+            name = input("Enter a name for this portfolio: ").strip()
+            if name:
+                with PortfolioStore() as store:
+                    store.save(name, portfolio)
+                print(f"Portfolio saved to database as '{name}'")
+        
+        elif choice == '9':
+            with PortfolioStore() as store:
+                names = store.names()
+                if not names:
+                    print("No portfolios saved yet.")
+                    continue
+                print("Saved portfolios: " + ", ".join(names))
+                name = input("Enter portfolio name to load: ").strip()
+                if name not in store:
+                    print(f"No portfolio named '{name}'.")
+                    continue
+                try:
+                    portfolio = store.load(name, StockPortfolio(portfolio.price_provider))
+                except ValueError as e:
+                    print(f"Error loading: {e}")
+                    continue
+                print(f"Loaded portfolio '{name}'")
+        
+        elif choice == '10':
             print("Thank you for using Stock Portfolio Tracker!")
             print("Happy investing!")
             break
         
         else:
-            print("Invalid choice. Please enter a number between 1-6.")
+            print("Invalid choice. Please enter a number between 1-10.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
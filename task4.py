@@ -1,214 +1,817 @@
+import os
 import random
+import string
+import sys
 import time
+import unicodedata
+import uuid
+from bisect import bisect_left
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
 from datetime import datetime
 
+# Rank used by states that do not end any pattern
+NO_MATCH = float('inf')
+
+# Translation table that deletes ASCII punctuation, built once
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+class UnicodePunctuationTable(dict):
+    """Translation table that deletes any Unicode punctuation.
+    
+    Characters are classified the first time str.translate asks for them and
+    the answer is remembered, so the table only grows with the characters
+    actually seen.
+    """
+    def __init__(self):
+        super().__init__(PUNCTUATION_TABLE)
+    
+    def __missing__(self, codepoint):
+        if unicodedata.category(chr(codepoint)).startswith('P'):
+            self[codepoint] = None
+            return None
+        self[codepoint] = codepoint
+        return codepoint
+
+class TextNormalizer:
+    """Normalizes user input for matching and memoizes recent results.
+    
+    The default mode lowercases, strips whitespace and removes ASCII
+    punctuation. Unicode mode applies NFKC and casefold and removes all
+    Unicode punctuation. ASCII input skips the NFKC step, which never changes it.
+    Results are kept in a bounded LRU cache keyed by the raw input.
+    """
+    def __init__(self, cache_size=4096, unicode=False):
+        self.cache_size = cache_size
+        self.unicode = unicode
+        self._punctuation = UnicodePunctuationTable() if unicode else PUNCTUATION_TABLE
+        normalize = self._normalize_unicode if unicode else self._normalize_ascii
+        self.normalize = lru_cache(maxsize=cache_size)(normalize)
+    
+    def __reduce__(self):
+        return (TextNormalizer, (self.cache_size, self.unicode))
+    
+    def _normalize_ascii(self, text):
+        return text.lower().strip().translate(PUNCTUATION_TABLE)
+    
+    def _normalize_unicode(self, text):
+        if not text.isascii():
+            text = unicodedata.normalize('NFKC', text)
+        return text.casefold().strip().translate(self._punctuation)
+    
+    @property
+    def hits(self):
+        return self.normalize.cache_info().hits
+    
+    @property
+    def misses(self):
+        return self.normalize.cache_info().misses
+    
+    def clear_cache(self):
+        """Empty the cache and reset the hit/miss counters."""
+        self.normalize.cache_clear()
+
+# Normalizer shared by every chatbot that isn't given its own
+DEFAULT_NORMALIZER = TextNormalizer()
+
+class PatternMatcher:
+    """Aho-Corasick automaton over every pattern of an intent catalog.
+
+    The automaton is built once and scans the input in a single pass. When
+    several categories match, the one listed first in the catalog wins, which is
+    the same result as checking every category and pattern in order.
+    """
+    def __init__(self, intents):
+        self.categories = [intent.category for intent in intents]
+        self.goto = [{}]
+        self.fail = [0]
+        self.rank = [NO_MATCH]
+        
+        for rank, intent in enumerate(intents):
+            for pattern in intent.patterns:
+                self._insert(pattern, rank)
+        
+        self._build_failure_links()
+    
+    def _insert(self, pattern, rank):
+        """Add one pattern to the trie, remembering its category rank."""
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.rank.append(NO_MATCH)
+            state = next_state
+        
+        if rank < self.rank[state]:
+            self.rank[state] = rank
+    
+    def _build_failure_links(self):
+        """Link every state to its longest proper suffix in the trie."""
+        goto, fail, rank = self.goto, self.fail, self.rank
+        queue = deque(goto[0].values())
+        
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target
+                
+                # A state also matches everything its suffix state matches
+                if rank[target] < rank[next_state]:
+                    rank[next_state] = rank[target]
+    
+    def find(self, text):
+        """Return the first category with a pattern inside text, or None."""
+        goto, fail, rank = self.goto, self.fail, self.rank
+        state = 0
+        best = rank[0]
+        
+        for char in text:
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+            state = next_state or 0
+            
+            if rank[state] < best:
+                best = rank[state]
+                if best == 0:
+                    break  # Nothing can beat the first category
+        
+        if best == NO_MATCH:
+            return None
+        return self.categories[best]
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    
+    return previous[-1]
+
+def allowed_typos(length):
+    """How many edits a word or phrase of this length may contain and still match."""
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+class FuzzyMatcher:
+    """Typo-tolerant matcher backed by a character trigram inverted index.
+    
+    Patterns are compared against every run of the same number of input words.
+    The index narrows each run down to patterns that share enough trigrams to
+    be within the allowed edit distance, and only those are scored with a
+    bounded edit distance. The best score wins, and ties go to the category
+    listed first in the catalog.
+    """
+    def __init__(self, intents):
+        self.categories = [intent.category for intent in intents]
+        self.patterns = []  # (normalized pattern, category rank)
+        self.index = {}  # (word count, trigram) -> pattern ids
+        self.word_counts = set()
+        
+        for rank, intent in enumerate(intents):
+            for pattern in intent.patterns:
+                normalized = ' '.join(pattern.lower().translate(PUNCTUATION_TABLE).split())
+                if not normalized:
+                    continue
+                pattern_id = len(self.patterns)
+                self.patterns.append((normalized, rank))
+                word_count = normalized.count(' ') + 1
+                self.word_counts.add(word_count)
+                for gram in set(self.trigrams(normalized)):
+                    self.index.setdefault((word_count, gram), []).append(pattern_id)
+    
+    @staticmethod
+    def trigrams(text):
+        """Character trigrams of text, padded so short words still have some."""
+        padded = f" {text} "
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+    
+    def best_match(self, text):
+        """Return (category, score, pattern) for the best match in text, or None."""
+        words = text.split()
+        index = self.index
+        best = None  # (score, -rank, -pattern id)
+        
+        for word_count in self.word_counts:
+            for start in range(len(words) - word_count + 1):
+                phrase = ' '.join(words[start:start + word_count])
+                grams = set(self.trigrams(phrase))
+                
+                # One edit changes at most three trigrams
+                needed = max(1, len(grams) - 3 * allowed_typos(len(phrase)))
+                shared = Counter(chain.from_iterable(index.get((word_count, gram), ()) for gram in grams))
+                
+                for pattern_id, count in shared.items():
+                    if count < needed:
+                        continue
+                    pattern, rank = self.patterns[pattern_id]
+                    limit = allowed_typos(min(len(phrase), len(pattern)))
+                    distance = bounded_edit_distance(phrase, pattern, limit)
+                    if distance > limit:
+                        continue
+                    candidate = (1 - distance / max(len(phrase), len(pattern)), -rank, -pattern_id)
+                    if best is None or candidate > best:
+                        best = candidate
+        
+        if best is None:
+            return None
+        score, rank, pattern_id = best
+        return self.categories[-rank], score, self.patterns[-pattern_id][0]
+    
+    def find(self, text):
+        """Return the best scoring category for text, or None."""
+        match = self.best_match(text)
+        return match[0] if match else None
+
+class Intent:
+    """One category of the intent catalog: its patterns and reply templates."""
+    __slots__ = ('category', 'patterns', 'replies')
+    
+    def __init__(self, category, patterns, replies):
+        self.category = sys.intern(category)
+        self.patterns = tuple(sys.intern(pattern) for pattern in patterns)
+        self.replies = tuple(sys.intern(reply) for reply in replies)
+    
+    def __reduce__(self):
+        return (Intent, (self.category, self.patterns, self.replies))
+
+class IntentCatalog:
+    """Frozen intent table shared by every chatbot built on it.
+    
+    Replies may contain a {name} placeholder, which is filled in with the
+    bot's name when the reply is chosen, so one catalog serves bots with
+    different names. The compiled matcher is built on first use and shared
+    as well.
+    """
+    __slots__ = ('intents', 'by_category', 'default_replies', '_matcher', '_fuzzy_matcher')
+    
+    def __init__(self, intents, default_replies):
+        self.intents = tuple(intents)
+        self.by_category = {intent.category: intent for intent in self.intents}
+        self.default_replies = tuple(sys.intern(reply) for reply in default_replies)
+        self._matcher = None
+        self._fuzzy_matcher = None
+    
+    def __reduce__(self):
+        # Workers rebuild the matcher themselves rather than unpickling it
+        return (IntentCatalog, (self.intents, self.default_replies))
+    
+    @classmethod
+    def from_table(cls, table, default_replies):
+        """Build a catalog from a {category: {'patterns': [...], 'replies': [...]}} dict."""
+        intents = [Intent(category, data['patterns'], data['replies']) for category, data in table.items()]
+        return cls(intents, default_replies)
+    
+    @property
+    def matcher(self):
+        """Compiled matcher for the catalog's patterns."""
+        if self._matcher is None:
+            self._matcher = PatternMatcher(self.intents)
+        return self._matcher
+    
+    @property
+    def fuzzy_matcher(self):
+        """Typo-tolerant matcher for the catalog's patterns."""
+        if self._fuzzy_matcher is None:
+            self._fuzzy_matcher = FuzzyMatcher(self.intents)
+        return self._fuzzy_matcher
+    
+    def with_patterns(self, category, patterns, replies=None):
+        """Return a new catalog with patterns (and replies) added to a category."""
+        intents = list(self.intents)
+        existing = self.by_category.get(category)
+        if existing is None:
+            intents.append(Intent(category, patterns, replies or ()))
+        else:
+            index = intents.index(existing)
+            intents[index] = Intent(category, existing.patterns + tuple(patterns),
+                                    existing.replies + tuple(replies or ()))
+        return IntentCatalog(intents, self.default_replies)
+
+# Response patterns organized by categories
+INTENT_TABLE = {
+    'greetings': {
+        'patterns': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'howdy', 'greetings'],
+        'replies': [
+            "Hello there! How can I help you today?",
+            "Hi! Great to see you!",
+            "Hey! What's on your mind?",
+            "Hello! Hope you're having a wonderful day!",
+            "Hi there! Ready to chat?"
+        ]
+    },
+    'how_are_you': {
+        'patterns': ['how are you', 'how do you feel', 'how are things', 'whats up', "what's up", 'how have you been'],
+        'replies': [
+            "I'm doing great, thanks for asking! How about you?",
+            "I'm fantastic! Ready to help and chat!",
+            "Feeling good today! What about yourself?",
+            "I'm in a great mood! How are you doing?",
+            "Excellent! Thanks for asking. How's your day going?"
+        ]
+    },
+    'name_questions': {
+        'patterns': ['what is your name', 'whats your name', "what's your name", 'who are you', 'your name'],
+        'replies': [
+            "I'm {name}, your friendly chatbot assistant!",
+            "My name is {name}. Nice to meet you!",
+            "I go by {name}. What should I call you?",
+            "You can call me {name}! What's your name?"
+        ]
+    },
+    'age_questions': {
+        'patterns': ['how old are you', 'what is your age', 'whats your age', 'your age'],
+        'replies': [
+            "I'm as old as my code - timeless and always learning!",
+            "Age is just a number for a chatbot like me!",
+            "I was born when my program started, so pretty young!",
+            "I don't age like humans do - I just get smarter!"
+        ]
+    },
+    'compliments': {
+        'patterns': ['you are great', 'you are awesome', 'you are cool', 'you are nice', 'good job', 'well done', 'amazing', 'fantastic'],
+        'replies': [
+            "Aww, thank you so much! You're pretty awesome too!",
+            "That's so kind of you to say! You made my day!",
+            "Thanks! I really appreciate the compliment!",
+            "You're too nice! Thank you!",
+            "That means a lot to me! You're wonderful too!"
+        ]
+    },
+    'help_requests': {
+        'patterns': ['help', 'can you help', 'i need help', 'assist me', 'support'],
+        'replies': [
+            "Of course! I'm here to help. What do you need assistance with?",
+            "I'd be happy to help! What can I do for you?",
+            "Sure thing! How can I assist you today?",
+            "Help is on the way! What's the problem?",
+            "I'm here to help! What's troubling you?"
+        ]
+    },
+    'time_questions': {
+        'patterns': ['what time', 'current time', 'time now', 'what is the time'],
+        'replies': []  # Will be handled specially with actual time
+    },
+    'weather': {
+        'patterns': ['weather', 'how is the weather', 'is it raining', 'sunny', 'cloudy'],
+        'replies': [
+            "I wish I could check the weather for you, but I don't have access to weather data!",
+            "I can't see outside, but I hope it's beautiful weather wherever you are!",
+            "Weather updates aren't my specialty, but I hope you're enjoying nice weather!",
+            "I'd love to tell you about the weather, but that's beyond my capabilities right now!"
+        ]
+    },
+    'jokes': {
+        'patterns': ['tell me a joke', 'joke', 'make me laugh', 'funny', 'humor'],
+        'replies': [
+            "Why don't programmers like nature? It has too many bugs! 😄",
+            "I told my computer a joke about UDP... but I'm not sure it got it! 😂",
+            "Why do Python programmers prefer snakes? Because they don't like Java! 🐍",
+            "How many programmers does it take to change a light bulb? None, that's a hardware problem! 💡",
+            "Why did the chatbot go to therapy? It had too many issues to resolve! 🤖"
+        ]
+    },
+    'goodbye': {
+        'patterns': ['bye', 'goodbye', 'see you later', 'farewell', 'exit', 'quit', 'leave', 'see ya'],
+        'replies': [
+            "Goodbye! It was great chatting with you!",
+            "See you later! Have a wonderful day!",
+            "Farewell! Come back anytime!",
+            "Bye! Thanks for the lovely conversation!",
+            "Take care! Hope to chat again soon!"
+        ]
+    },
+    'thanks': {
+        'patterns': ['thank you', 'thanks', 'appreciate it', 'grateful'],
+        'replies': [
+            "You're very welcome! Happy to help!",
+            "No problem at all! Glad I could assist!",
+            "You're welcome! That's what I'm here for!",
+            "My pleasure! Always happy to help!",
+            "Don't mention it! Anytime!"
+        ]
+    }
+}
+
+# Default responses for unrecognized input
+DEFAULT_REPLIES = [
+    "That's interesting! Can you tell me more?",
+    "I'm not sure I understand. Could you rephrase that?",
+    "Hmm, that's a new one for me! Can you explain?",
+    "I'd love to learn more about what you mean!",
+    "That sounds intriguing! Tell me more!",
+    "I'm still learning. Can you help me understand?",
+    "Interesting perspective! What makes you say that?",
+    "I'm curious to know more about your thoughts on that!"
+]
+
+# Catalog shared by every chatbot that isn't given its own
+DEFAULT_CATALOG = IntentCatalog.from_table(INTENT_TABLE, DEFAULT_REPLIES)
+
+HELP_MESSAGE = """
+🆘 CHATBOT HELP 🆘
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Things you can try:
+• Say hello: "hi", "hello", "hey"
+• Ask how I am: "how are you?"
+• Ask my name: "what's your name?"
+• Request jokes: "tell me a joke"
+• Ask for time: "what time is it?"
+• Say thanks: "thank you"
+• Say goodbye: "bye", "goodbye", "quit"
+
+I understand natural language, so feel free to chat normally!
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+"""
+
+class ChatMetrics:
+    """Per-stage timers, per-intent hit counters and a matching latency histogram.
+    
+    A bot only records metrics when it has a ChatMetrics attached. Without
+    one, each instrumented step costs a single None check.
+    """
+    STAGES = ('normalize', 'match', 'reply', 'time_format')
+    
+    # Upper bounds of the latency histogram buckets, in seconds
+    LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2)
+    
+    def __init__(self):
+        self.stage_ns = dict.fromkeys(self.STAGES, 0)
+        self.stage_calls = dict.fromkeys(self.STAGES, 0)
+        self.category_hits = {}
+        self._bucket_bounds_ns = [bound * 1e9 for bound in self.LATENCY_BUCKETS]
+        self.latency_counts = [0] * (len(self.LATENCY_BUCKETS) + 1)  # Last bucket is +Inf
+    
+    def record_stage(self, stage, elapsed_ns):
+        """Add one timed call of a stage."""
+        self.stage_ns[stage] += elapsed_ns
+        self.stage_calls[stage] += 1
+    
+    def record_match(self, category, elapsed_ns):
+        """Record a pattern match: its timing, latency bucket and resulting category."""
+        self.record_stage('match', elapsed_ns)
+        self.latency_counts[bisect_left(self._bucket_bounds_ns, elapsed_ns)] += 1
+        key = category or 'unmatched'
+        self.category_hits[key] = self.category_hits.get(key, 0) + 1
+    
+    def reset(self):
+        """Clear every counter."""
+        self.__init__()
+    
+    def as_dict(self):
+        """Snapshot of every metric as plain Python data."""
+        stages = {}
+        for stage in self.STAGES:
+            calls = self.stage_calls[stage]
+            seconds = self.stage_ns[stage] / 1e9
+            stages[stage] = {'calls': calls, 'seconds': seconds,
+                             'mean_us': seconds / calls * 1e6 if calls else 0.0}
+        bounds = [str(bound) for bound in self.LATENCY_BUCKETS] + ['+Inf']
+        return {
+            'stages': stages,
+            'category_hits': dict(self.category_hits),
+            'match_latency_histogram': dict(zip(bounds, self.latency_counts)),
+        }
+    
+    def to_prometheus(self, prefix='chatbot'):
+        """Snapshot of every metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each response stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for stage in self.STAGES:
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{stage}"}} {self.stage_ns[stage] / 1e9:.9f}')
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Number of timed calls of each response stage.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        for stage in self.STAGES:
+            lines.append(f'{prefix}_stage_calls_total{{stage="{stage}"}} {self.stage_calls[stage]}')
+        lines += [
+            f"# HELP {prefix}_intent_hits_total Messages matched to each intent category.",
+            f"# TYPE {prefix}_intent_hits_total counter",
+        ]
+        for category, hits in sorted(self.category_hits.items()):
+            lines.append(f'{prefix}_intent_hits_total{{category="{category}"}} {hits}')
+        lines += [
+            f"# HELP {prefix}_match_latency_seconds Pattern matching latency.",
+            f"# TYPE {prefix}_match_latency_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(list(self.LATENCY_BUCKETS) + ['+Inf'], self.latency_counts):
+            cumulative += count
+            lines.append(f'{prefix}_match_latency_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{prefix}_match_latency_seconds_sum {self.stage_ns['match'] / 1e9:.9f}")
+        lines.append(f"{prefix}_match_latency_seconds_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+class ChatSession:
+    """Per-user conversation state, kept separate from the shared response table."""
+    __slots__ = ('session_id', 'user_name', 'conversation_count', 'mood')
+    
+    def __init__(self, session_id=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.user_name = None
+        self.conversation_count = 0
+        self.mood = "happy"  # happy, tired, excited
+
 class SimpleChatbot:
-    def __init__(self, name="ChatBot"):
+    __slots__ = ('name', 'session_id', 'user_name', 'conversation_count', 'mood', 'catalog', 'normalizer',
+                 'fuzzy', 'metrics', 'transcript', 'rng', 'batch_stats')
+    
+    def __init__(self, name="ChatBot", catalog=None, normalizer=None, fuzzy=False, metrics=None,
+                 transcript=None, seed=None, rng=None):
         self.name = name
+        self.session_id = uuid.uuid4().hex
         self.user_name = None
         self.conversation_count = 0
         self.mood = "happy"  # happy, tired, excited
         
-        # Response patterns organized by categories
-        self.responses = {
-            'greetings': {
-                'patterns': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'howdy', 'greetings'],
-                'replies': [
-                    "Hello there! How can I help you today?",
-                    "Hi! Great to see you!",
-                    "Hey! What's on your mind?",
-                    "Hello! Hope you're having a wonderful day!",
-                    "Hi there! Ready to chat?"
-                ]
-            },
-            'how_are_you': {
-                'patterns': ['how are you', 'how do you feel', 'how are things', 'whats up', "what's up", 'how have you been'],
-                'replies': [
-                    "I'm doing great, thanks for asking! How about you?",
-                    "I'm fantastic! Ready to help and chat!",
-                    "Feeling good today! What about yourself?",
-                    "I'm in a great mood! How are you doing?",
-                    "Excellent! Thanks for asking. How's your day going?"
-                ]
-            },
-            'name_questions': {
-                'patterns': ['what is your name', 'whats your name', "what's your name", 'who are you', 'your name'],
-                'replies': [
-                    f"I'm {self.name}, your friendly chatbot assistant!",
-                    f"My name is {self.name}. Nice to meet you!",
-                    f"I go by {self.name}. What should I call you?",
-                    f"You can call me {self.name}! What's your name?"
-                ]
-            },
-            'age_questions': {
-                'patterns': ['how old are you', 'what is your age', 'whats your age', 'your age'],
-                'replies': [
-                    "I'm as old as my code - timeless and always learning!",
-                    "Age is just a number for a chatbot like me!",
-                    "I was born when my program started, so pretty young!",
-                    "I don't age like humans do - I just get smarter!"
-                ]
-            },
-            'compliments': {
-                'patterns': ['you are great', 'you are awesome', 'you are cool', 'you are nice', 'good job', 'well done', 'amazing', 'fantastic'],
-                'replies': [
-                    "Aww, thank you so much! You're pretty awesome too!",
-                    "That's so kind of you to say! You made my day!",
-                    "Thanks! I really appreciate the compliment!",
-                    "You're too nice! Thank you!",
-                    "That means a lot to me! You're wonderful too!"
-                ]
-            },
-            'help_requests': {
-                'patterns': ['help', 'can you help', 'i need help', 'assist me', 'support'],
-                'replies': [
-                    "Of course! I'm here to help. What do you need assistance with?",
-                    "I'd be happy to help! What can I do for you?",
-                    "Sure thing! How can I assist you today?",
-                    "Help is on the way! What's the problem?",
-                    "I'm here to help! What's troubling you?"
-                ]
-            },
-            'time_questions': {
-                'patterns': ['what time', 'current time', 'time now', 'what is the time'],
-                'replies': []  # Will be handled specially with actual time
-            },
-            'weather': {
-                'patterns': ['weather', 'how is the weather', 'is it raining', 'sunny', 'cloudy'],
-                'replies': [
-                    "I wish I could check the weather for you, but I don't have access to weather data!",
-                    "I can't see outside, but I hope it's beautiful weather wherever you are!",
-                    "Weather updates aren't my specialty, but I hope you're enjoying nice weather!",
-                    "I'd love to tell you about the weather, but that's beyond my capabilities right now!"
-                ]
-            },
-            'jokes': {
-                'patterns': ['tell me a joke', 'joke', 'make me laugh', 'funny', 'humor'],
-                'replies': [
-                    "Why don't programmers like nature? It has too many bugs! 😄",
-                    "I told my computer a joke about UDP... but I'm not sure it got it! 😂",
-                    "Why do Python programmers prefer snakes? Because they don't like Java! 🐍",
-                    "How many programmers does it take to change a light bulb? None, that's a hardware problem! 💡",
-                    "Why did the chatbot go to therapy? It had too many issues to resolve! 🤖"
-                ]
-            },
-            'goodbye': {
-                'patterns': ['bye', 'goodbye', 'see you later', 'farewell', 'exit', 'quit', 'leave', 'see ya'],
-                'replies': [
-                    "Goodbye! It was great chatting with you!",
-                    "See you later! Have a wonderful day!",
-                    "Farewell! Come back anytime!",
-                    "Bye! Thanks for the lovely conversation!",
-                    "Take care! Hope to chat again soon!"
-                ]
-            },
-            'thanks': {
-                'patterns': ['thank you', 'thanks', 'appreciate it', 'grateful'],
-                'replies': [
-                    "You're very welcome! Happy to help!",
-                    "No problem at all! Glad I could assist!",
-                    "You're welcome! That's what I'm here for!",
-                    "My pleasure! Always happy to help!",
-                    "Don't mention it! Anytime!"
-                ]
-            }
-        }
+        # Intents are shared with every other bot on the same catalog
+        self.catalog = catalog or DEFAULT_CATALOG
         
-        # Default responses for unrecognized input
-        self.default_responses = [
-            "That's interesting! Can you tell me more?",
-            "I'm not sure I understand. Could you rephrase that?",
-            "Hmm, that's a new one for me! Can you explain?",
-            "I'd love to learn more about what you mean!",
-            "That sounds intriguing! Tell me more!",
-            "I'm still learning. Can you help me understand?",
-            "Interesting perspective! What makes you say that?",
-            "I'm curious to know more about your thoughts on that!"
-        ]
+        # Repeated greetings and quit commands hit the shared cache
+        self.normalizer = normalizer or DEFAULT_NORMALIZER
+        
+        # Fuzzy mode tolerates typos and picks the best scoring pattern
+        self.fuzzy = fuzzy
+        
+        # Optional ChatMetrics; None keeps instrumentation off
+        self.metrics = metrics
+        
+        # Optional transcript.TranscriptLogger that records every chat turn
+        self.transcript = transcript
+        
+        # Bots share the module random source unless asked for their own;
+        # a Random instance costs about 2.5 KB per bot
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
+        
+        # Throughput of the last classify_many/respond_many run
+        self.batch_stats = {'messages': 0, 'seconds': 0.0, 'messages_per_second': 0.0}
+    
+    @property
+    def matcher(self):
+        """Compiled matcher for the bot's catalog, exact or fuzzy."""
+        if self.fuzzy:
+            return self.catalog.fuzzy_matcher
+        return self.catalog.matcher
+    
+    def add_patterns(self, category, patterns, replies=None):
+        """Add patterns (and optionally replies) to a category, creating it if needed.
+        
+        The shared catalog is never modified; this bot switches to its own
+        extended copy, whose matcher is compiled on next use.
+        """
+        self.catalog = self.catalog.with_patterns(category, patterns, replies)
+    
+    def render_reply(self, reply):
+        """Fill in the bot's name in a reply template."""
+        if '{name}' in reply:
+            return reply.replace('{name}', self.name)
+        return reply
     
     def normalize_input(self, user_input):
         """Clean and normalize user input for better pattern matching."""
-        # Convert to lowercase and strip whitespace
-        normalized = user_input.lower().strip()
-        
-        # Remove common punctuation
-        import string
-        normalized = normalized.translate(str.maketrans('', '', string.punctuation))
+        metrics = self.metrics
+        if metrics is None:
+            return self.normalizer.normalize(user_input)
         
+        start = time.perf_counter_ns()
+        normalized = self.normalizer.normalize(user_input)
+        metrics.record_stage('normalize', time.perf_counter_ns() - start)
         return normalized
     
     def get_current_time(self):
         """Get current time formatted nicely."""
+        metrics = self.metrics
+        start = time.perf_counter_ns() if metrics is not None else 0
+        
         now = datetime.now()
-        return now.strftime("It's currently %I:%M %p on %A, %B %d, %Y")
+        formatted = now.strftime("It's currently %I:%M %p on %A, %B %d, %Y")
+        
+        if metrics is not None:
+            metrics.record_stage('time_format', time.perf_counter_ns() - start)
+        return formatted
+    
+    def match_category(self, normalized_input):
+        """Find which category already normalized input matches."""
+        metrics = self.metrics
+        if metrics is None:
+            return self.matcher.find(normalized_input)
+        
+        start = time.perf_counter_ns()
+        category = self.matcher.find(normalized_input)
+        metrics.record_match(category, time.perf_counter_ns() - start)
+        return category
     
     def find_response_category(self, user_input):
         """Find which category the user input matches."""
+        return self.match_category(self.normalize_input(user_input))
+    
+    def get_response(self, user_input):
+        """Generate appropriate response based on user input."""
         normalized_input = self.normalize_input(user_input)
+        return self.respond_to(normalized_input, self.match_category(normalized_input))
+    
+    def respond_to(self, normalized_input, category, session=None):
+        """Generate a response for input that has already been normalized and matched.
         
-        # Check each category for pattern matches
-        for category, data in self.responses.items():
-            for pattern in data['patterns']:
-                if pattern in normalized_input:
-                    return category
+        Conversation state is read from session, or from the bot itself when
+        no session is given.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return self._choose_reply(normalized_input, category, session)
         
-        return None
+        start = time.perf_counter_ns()
+        response = self._choose_reply(normalized_input, category, session)
+        metrics.record_stage('reply', time.perf_counter_ns() - start)
+        return response
     
-    def get_response(self, user_input):
-        """Generate appropriate response based on user input."""
-        self.conversation_count += 1
+    def _choose_reply(self, normalized_input, category, session):
+        """Pick the reply for a matched category and update the conversation count."""
+        session = session or self
+        session.conversation_count += 1
         
         # Handle special cases first
-        if self.normalize_input(user_input) in ['quit', 'exit', 'bye', 'goodbye']:
+        if normalized_input in ['quit', 'exit', 'bye', 'goodbye']:
             return 'goodbye'
         
-        # Find matching category
-        category = self.find_response_category(user_input)
-        
         if category:
             # Handle special categories
             if category == 'time_questions':
                 return self.get_current_time()
             elif category == 'goodbye':
-                return random.choice(self.responses[category]['replies'])
+                return self.render_reply(self.rng.choice(self.catalog.by_category[category].replies))
             else:
                 # Get random response from matched category
-                response = random.choice(self.responses[category]['replies'])
+                response = self.render_reply(self.rng.choice(self.catalog.by_category[category].replies))
                 
                 # Add personality based on conversation count
-                if self.conversation_count > 10:
+                if session.conversation_count > 10:
                     personality_additions = [
                         " We've been chatting for a while now!",
                         " I'm enjoying our conversation!",
                         " You're a great conversationalist!",
                         ""
                     ]
-                    response += random.choice(personality_additions)
+                    response += self.rng.choice(personality_additions)
                 
                 return response
         else:
             # Return default response for unrecognized input
-            return random.choice(self.default_responses)
+            return self.render_reply(self.rng.choice(self.catalog.default_replies))
+    
+    def classify_many(self, messages, chunk_size=1000, processes=None, parallel_threshold=50000):
+        """Yield the matched category (or None) for each message, in order.
+        
+        Messages are read lazily in chunks. Once more than parallel_threshold
+        messages have been seen, the remaining chunks are classified by a
+        process pool. Throughput is kept up to date in self.batch_stats.
+        """
+        for normalized_input, category in self._classify_stream(messages, chunk_size, processes, parallel_threshold):
+            yield category
     
-    def ask_for_name(self):
+    def respond_many(self, messages, chunk_size=1000, processes=None, parallel_threshold=50000):
+        """Yield a response for each message, like calling get_response in a loop."""
+        for normalized_input, category in self._classify_stream(messages, chunk_size, processes, parallel_threshold):
+            yield self.respond_to(normalized_input, category)
+    
+    def _classify_stream(self, messages, chunk_size, processes, parallel_threshold):
+        """Yield (normalized input, category) pairs for a stream of messages."""
+        if processes is None:
+            processes = os.cpu_count() or 1
+        
+        messages = iter(messages)
+        self.batch_stats = {'messages': 0, 'seconds': 0.0, 'messages_per_second': 0.0}
+        start = time.perf_counter()
+        
+        def record(count):
+            self.batch_stats['messages'] += count
+            elapsed = time.perf_counter() - start
+            self.batch_stats['seconds'] = elapsed
+            if elapsed > 0:
+                self.batch_stats['messages_per_second'] = self.batch_stats['messages'] / elapsed
+        
+        # Small streams are cheaper to handle in this process
+        while processes < 2 or self.batch_stats['messages'] < parallel_threshold:
+            chunk = list(islice(messages, chunk_size))
+            if not chunk:
+                return
+            results = _classify_chunk(chunk, self)
+            record(len(chunk))
+            yield from results
+        
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(self.catalog, self.normalizer, self.fuzzy)) as pool:
+            pending = deque()
+            while True:
+                # Keep a couple of chunks per worker in flight without reading the whole stream
+                while len(pending) < processes * 2:
+                    chunk = list(islice(messages, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_classify_chunk, chunk))
+                if not pending:
+                    return
+                results = pending.popleft().result()
+                record(len(results))
+                yield from results
+    
+    def handle_turn(self, user_input, normalized_input, session=None):
+        """Work out the bot's side of one chat turn.
+        
+        Returns (response, name_prompt, done). name_prompt is None unless the
+        bot decides to ask for the user's name, and done is True once the user
+        has said goodbye.
+        """
+        session = session or self
+        start = time.perf_counter()
+        category = self.match_category(normalized_input)
+        
+        # Check if user is providing their name
+        if session.user_name is None and len(user_input.split()) == 1 and user_input.isalpha():
+            session.user_name = user_input.title()
+            response = f"Nice to meet you, {session.user_name}! How can I help you today?"
+        else:
+            # Get bot response
+            response = self.respond_to(normalized_input, category, session)
+        
+        if self.transcript is not None:
+            self.transcript.log(session.session_id, user_input, category, time.perf_counter() - start)
+        
+        # Check if it's time to end conversation
+        if category == 'goodbye':
+            return response, None, True
+        
+        # Occasionally ask for name or add personality
+        name_prompt = None
+        if self.rng.random() < 0.1:  # 10% chance
+            name_prompt = self.ask_for_name(session)
+        
+        return response, name_prompt, False
+    
+    def ask_for_name(self, session=None):
         """Ask for user's name if not already known."""
-        if not self.user_name:
+        session = session or self
+        if not session.user_name:
             name_prompts = [
                 "By the way, what should I call you?",
                 "I'd love to know your name!",
                 "What's your name, if you don't mind me asking?"
             ]
-            return random.choice(name_prompts)
+            return self.rng.choice(name_prompts)
         return None
     
-    def typing_effect(self, text, delay=0.03):
-        """Simulate typing effect for more natural conversation."""
+    def typing_effect(self, text, delay=0.03, write=print):
+        """Simulate typing effect for more natural conversation.
+        
+        write must accept print's end and flush arguments.
+        """
         for char in text:
-            print(char, end='', flush=True)
+            write(char, end='', flush=True)
             time.sleep(delay)
-        print()  # New line after complete text
+        write()  # New line after complete text
+    
+    def say(self, text, write=print, typing_delay=0.03):
+        """Show one line from the bot, with the typing effect when a delay is set.
+        
+        The typing effect streams characters, so it only applies when
+        writing to the terminal; other writers get the whole line.
+        """
+        if typing_delay and write is print:
+            write(f"{self.name}:   ", end="")
+            self.typing_effect(text, typing_delay, write)
+        else:
+            write(f"{self.name}:   {text}")
     
-    def display_welcome(self):
+    def display_welcome(self, write=print):
         """Display welcome message and instructions."""
         welcome_msg = f"""
 {'='*60}
@@ -227,76 +830,95 @@ Type 'help' for assistance or 'quit' to exit.
 Let's start chatting!
 {'='*60}
 """
-        print(welcome_msg)
+        write(welcome_msg)
     
-    def display_help(self):
+    def display_help(self, write=print):
         """Display help information."""
-        help_msg = """
-🆘 CHATBOT HELP 🆘
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Things you can try:
-• Say hello: "hi", "hello", "hey"
-• Ask how I am: "how are you?"
-• Ask my name: "what's your name?"
-• Request jokes: "tell me a joke"
-• Ask for time: "what time is it?"
-• Say thanks: "thank you"
-• Say goodbye: "bye", "goodbye", "quit"
-
-I understand natural language, so feel free to chat normally!
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
-        print(help_msg)
+        write(HELP_MESSAGE)
     
-    def chat(self):
-        """Main chat loop."""
-        self.display_welcome()
+    def chat(self, read_line=input, write=print, typing_delay=0.03):
+        """Main chat loop.
+        
+        Reads from the terminal by default. Pass other read_line/write
+        callables and typing_delay=0 to drive the same loop without a
+        terminal. The conversation ends on goodbye or when read_line raises
+        EOFError.
+        """
+        self.display_welcome(write)
         
         while True:
             try:
                 # Get user input
-                user_input = input(f"\n{'You:':<8} ").strip()
+                user_input = read_line(f"\n{'You:':<8} ").strip()
                 
                 # Check for empty input
                 if not user_input:
-                    print(f"{self.name}:   Please say something! I'm here to chat! 😊")
+                    write(f"{self.name}:   Please say something! I'm here to chat! 😊")
                     continue
                 
+                # Normalize once per message
+                normalized_input = self.normalize_input(user_input)
+                
                 # Check for help command
-                if self.normalize_input(user_input) in ['help', 'assist', 'commands']:
-                    self.display_help()
+                if normalized_input in ['help', 'assist', 'commands']:
+                    self.display_help(write)
                     continue
                 
-                # Check if user is providing their name
-                if self.user_name is None and len(user_input.split()) == 1 and user_input.isalpha():
-                    self.user_name = user_input.title()
-                    response = f"Nice to meet you, {self.user_name}! How can I help you today?"
-                else:
-                    # Get bot response
-                    response = self.get_response(user_input)
+                response, name_prompt, done = self.handle_turn(user_input, normalized_input)
+                
+                # Display bot response with typing effect
+                self.say(response, write, typing_delay)
                 
                 # Check if it's time to end conversation
-                if self.find_response_category(user_input) == 'goodbye':
-                    print(f"{self.name}:   ", end="")
-                    self.typing_effect(response)
+                if done:
                     break
                 
-                # Display bot response with typing effect
-                print(f"{self.name}:   ", end="")
-                self.typing_effect(response)
-                
-                # Occasionally ask for name or add personality
-                if random.random() < 0.1:  # 10% chance
-                    name_prompt = self.ask_for_name()
-                    if name_prompt:
-                        print(f"{self.name}:   ", end="")
-                        self.typing_effect(name_prompt)
+                if name_prompt:
+                    self.say(name_prompt, write, typing_delay)
                 
-            except KeyboardInterrupt:
-                print(f"\n\n{self.name}: Goodbye! Thanks for chatting! 👋")
+            except (KeyboardInterrupt, EOFError):
+                write(f"\n\n{self.name}: Goodbye! Thanks for chatting! 👋")
                 break
             except Exception as e:
-                print(f"{self.name}: Oops! Something went wrong. Let's keep chatting! 😅")
+                write(f"{self.name}: Oops! Something went wrong. Let's keep chatting! 😅")
+    
+    def run_script(self, messages):
+        """Play scripted user messages through chat() headlessly.
+        
+        Returns every line the bot wrote. The script ends the conversation
+        like EOF on the terminal if it runs out before a goodbye.
+        """
+        lines = iter(messages)
+        output = []
+        
+        def read_line(prompt):
+            try:
+                return next(lines)
+            except StopIteration:
+                raise EOFError from None
+        
+        self.chat(read_line, output.append, typing_delay=0)
+        return output
+
+# Chatbot used by process pool workers in classify_many/respond_many
+_worker_bot = None
+
+def _init_worker(catalog, normalizer, fuzzy):
+    """Build the worker's own matcher and normalizer from the parent's settings."""
+    global _worker_bot
+    _worker_bot = SimpleChatbot(catalog=catalog, normalizer=normalizer, fuzzy=fuzzy)
+    _worker_bot.matcher
+
+def _classify_chunk(messages, bot=None):
+    """Normalize and match a chunk of messages."""
+    bot = bot or _worker_bot
+    normalize = bot.normalize_input
+    find = bot.matcher.find if bot.metrics is None else bot.match_category
+    results = []
+    for message in messages:
+        normalized_input = normalize(message)
+        results.append((normalized_input, find(normalized_input)))
+    return results
 
 def main():
     """Main function to run the chatbot."""
@@ -305,13 +927,28 @@ def main():
     if not bot_name:
         bot_name = "ChatBot"
     
-    chatbot = SimpleChatbot(bot_name)
+    # Optional intent catalog file (JSON/YAML source or compiled snapshot)
+    catalog = None
+    if len(sys.argv) > 1:
+        from intent_catalog import load_catalog
+        catalog = load_catalog(sys.argv[1])
+    
+    chatbot = SimpleChatbot(bot_name, catalog=catalog, metrics=ChatMetrics())
     chatbot.chat()
     
     # Display conversation stats
+    stats = chatbot.metrics.as_dict()
     print(f"\n📊 Chat Statistics:")
     print(f"   • Total messages: {chatbot.conversation_count}")
     print(f"   • User name: {chatbot.user_name or 'Not provided'}")
+    
+    top_intents = sorted(stats['category_hits'].items(), key=lambda item: item[1], reverse=True)[:3]
+    if top_intents:
+        print(f"   • Top topics: {', '.join(f'{category} ({hits})' for category, hits in top_intents)}")
+    for stage, data in stats['stages'].items():
+        if data['calls']:
+            print(f"   • {stage.replace('_', ' ').capitalize()}: {data['mean_us']:.1f} µs avg over {data['calls']} calls")
+    
     print(f"   • Thanks for using {chatbot.name}! 🤖")
 
 if __name__ == "__main__":
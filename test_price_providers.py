@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import pytest
+
+from price_providers import CachedPriceProvider, StaticPriceProvider
+
+PRICES = {"AAPL": 180.0, "MSFT": 375.0}
+
+class GatedProvider(StaticPriceProvider):
+    """Counts the symbols fetched and holds every fetch until release is set."""
+    def __init__(self, prices, error=None):
+        super().__init__(prices)
+        self.error = error
+        self.calls = Counter()
+        self.release = threading.Event()
+
+    def get_quotes(self, symbols):
+        self.calls.update(symbols)
+        assert self.release.wait(5), "fetch was never released"
+        if self.error is not None:
+            raise self.error
+        return super().get_quotes(symbols)
+
+def in_thread(function, *args):
+    """Run function on a daemon thread, so a call stuck on a lost fetch fails the test instead of hanging it."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function(*args))
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def test_concurrent_requests_fetch_each_symbol_once():
+    upstream = GatedProvider(PRICES)
+    cached = CachedPriceProvider(upstream, ttl=60)
+    threads = 20
+
+    results = [in_thread(cached.get_quotes, ["AAPL", "MSFT"]) for _ in range(threads)]
+    # Every thread but the fetching one is now waiting on its fetch
+    wait_for(lambda: cached.coalesced == 2 * (threads - 1))
+    upstream.release.set()
+    quotes = [result.result(timeout=5) for result in results]
+
+    assert upstream.calls == {"AAPL": 1, "MSFT": 1}
+    assert all(quote == PRICES for quote in quotes)
+
+def test_failed_fetch_releases_waiters_and_later_batches():
+    upstream = GatedProvider(PRICES, error=ConnectionError("upstream unavailable"))
+    cached = CachedPriceProvider(upstream, ttl=60, batch_size=1)
+
+    fetching = in_thread(cached.get_quotes, ["AAPL", "MSFT"])
+    wait_for(lambda: cached.misses == 2)
+    waiting = in_thread(cached.get_quotes, ["MSFT"])
+    wait_for(lambda: cached.coalesced == 1)
+    upstream.release.set()
+    with pytest.raises(ConnectionError):
+        fetching.result(timeout=5)
+    # MSFT was in a batch that never ran, so its waiter must fail too rather than hang
+    with pytest.raises(ConnectionError):
+        waiting.result(timeout=5)
+
+    upstream.error = None
+    assert in_thread(cached.get_quotes, ["AAPL", "MSFT"]).result(timeout=5) == PRICES
+    assert upstream.calls == {"AAPL": 2, "MSFT": 1}
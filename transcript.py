@@ -0,0 +1,201 @@
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# Every record is a uint32 length prefix followed by this header and then
+# the UTF-8 session id, user input and category (empty when unmatched)
+RECORD_HEADER = struct.Struct("<ddHIH")  # timestamp, latency, string lengths
+LENGTH_PREFIX = struct.Struct("<I")
+MAX_SHORT_FIELD = 0xFFFF  # Longest session id or category, in UTF-8 bytes
+# UTF-8 takes at most 4 bytes per character, so strings up to this many characters always fit
+SAFE_SHORT_CHARS = MAX_SHORT_FIELD // 4
+
+logger = logging.getLogger(__name__)
+
+TranscriptRecord = namedtuple("TranscriptRecord", "timestamp session user_input category latency")
+
+def _check_short_field(name, text):
+    """Raise ValueError if text does not fit a uint16 length."""
+    if len(text) > SAFE_SHORT_CHARS and len(text.encode("utf-8")) > MAX_SHORT_FIELD:
+        raise ValueError(f"{name} is longer than {MAX_SHORT_FIELD} bytes")
+
+def encode_record(timestamp, session, user_input, category, latency):
+    """Pack one turn into its length-prefixed binary form."""
+    _check_short_field("Session id", session)
+    _check_short_field("Category", category or "")
+    session_bytes = session.encode("utf-8")
+    input_bytes = user_input.encode("utf-8")
+    category_bytes = (category or "").encode("utf-8")
+    header = RECORD_HEADER.pack(timestamp, latency, len(session_bytes), len(input_bytes), len(category_bytes))
+    length = len(header) + len(session_bytes) + len(input_bytes) + len(category_bytes)
+    return b"".join((LENGTH_PREFIX.pack(length), header, session_bytes, input_bytes, category_bytes))
+
+class TranscriptLogger:
+    """Append-only binary transcript written by a background thread.
+
+    log() only puts the turn on a queue, so the chat loop never waits on
+    disk. The writer thread packs queued turns into one buffer and writes
+    it once batch_size turns are waiting or flush_interval seconds have
+    passed. When the file would grow past max_bytes it is rotated to
+    path.1, path.2, ... (keeping backup_count old files), like
+    logging.handlers.RotatingFileHandler.
+
+    A turn that cannot be encoded, or a batch that cannot be written, is
+    logged through the logging module and counted in records_dropped; the
+    writer thread carries on with later turns.
+    """
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, backup_count=5, batch_size=1000, flush_interval=0.5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.bytes_written = 0
+        self.records_dropped = 0
+
+        self._queue = queue.SimpleQueue()
+        self._stop = object()
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def log(self, session, user_input, category, latency, timestamp=None):
+        """Queue one chat turn for writing.
+
+        Raises ValueError if the session id or category is too long to store.
+        """
+        if len(session) > SAFE_SHORT_CHARS or category and len(category) > SAFE_SHORT_CHARS:
+            _check_short_field("Session id", session)
+            _check_short_field("Category", category or "")
+        self._queue.put((timestamp or time.time(), session, user_input, category, latency))
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join()
+        self._file.close()
+
+    def _run(self):
+        """Writer thread: batch queued turns into large writes."""
+        buffer = bytearray()
+        pending = 0
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is self._stop:
+                self._write(buffer, pending)
+                return
+
+            if item is not None:
+                try:
+                    buffer += encode_record(*item)
+                    pending += 1
+                except Exception:
+                    self.records_dropped += 1
+                    logger.exception("Dropped a transcript record that could not be encoded")
+
+            if pending >= self.batch_size or time.monotonic() >= deadline:
+                self._write(buffer, pending)
+                buffer = bytearray()
+                pending = 0
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, buffer, count):
+        """Write one batch, rotating first if it would overflow the file."""
+        if not buffer:
+            return
+        try:
+            if self._size and self._size + len(buffer) > self.max_bytes:
+                self._rotate()
+            self._file.write(buffer)
+            self._file.flush()
+        except OSError:
+            self.records_dropped += count
+            logger.exception("Dropped %d transcript records that could not be written to %s", count, self.path)
+            return
+        self._size += len(buffer)
+        self.records_written += count
+        self.bytes_written += len(buffer)
+
+    def _rotate(self):
+        """Shift path -> path.1 -> path.2 ..., dropping the oldest backup."""
+        self._file.close()
+        mode = "ab"  # If a rename fails, keep appending to the current file
+        try:
+            if self.backup_count > 0:
+                for index in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.path}.{index}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            mode = "wb"
+        finally:
+            self._file = open(self.path, mode)
+            self._size = self._file.tell()
+
+def transcript_files(path):
+    """Existing transcript files for a path, oldest first."""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+def read_transcript(path, include_rotated=True, buffer_size=1024 * 1024):
+    """Yield TranscriptRecords one at a time, using constant memory.
+
+    Rotated files are read first, oldest to newest. A record cut short at
+    the end of a file (for example after a crash) is skipped.
+    """
+    paths = transcript_files(path) if include_rotated else [path]
+    for file_path in paths:
+        with open(file_path, "rb", buffering=buffer_size) as file:
+            while True:
+                prefix = file.read(LENGTH_PREFIX.size)
+                if len(prefix) < LENGTH_PREFIX.size:
+                    break
+                (length,) = LENGTH_PREFIX.unpack(prefix)
+                payload = file.read(length)
+                if len(payload) < length:
+                    break
+
+                timestamp, latency, session_length, input_length, category_length = \
+                    RECORD_HEADER.unpack_from(payload)
+                position = RECORD_HEADER.size
+                session = payload[position:position + session_length].decode("utf-8")
+                position += session_length
+                user_input = payload[position:position + input_length].decode("utf-8")
+                position += input_length
+                category = payload[position:position + category_length].decode("utf-8") or None
+                yield TranscriptRecord(timestamp, session, user_input, category, latency)
+
+def replay_transcript(path, bot):
+    """Run every logged input through bot's matcher again.
+
+    Yields (record, category) pairs, where category is what the bot matches
+    now, so catalog changes can be checked against real traffic.
+    """
+    for record in read_transcript(path):
+        yield record, bot.match_category(bot.normalize_input(record.user_input))
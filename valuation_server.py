@@ -0,0 +1,228 @@
+import asyncio
+import json
+import sys
+
+from portfolio_book import PortfolioBook
+from task2 import DEFAULT_PRICE_PROVIDER
+
+class ValuationServer:
+    """JSON-lines portfolio valuation service with micro-batching.
+
+    Each request line is {"id": ..., "holdings": {symbol: quantity}} and is
+    answered with {"id": ..., "value": ...} or {"id": ..., "error": ...}.
+    Requests from all connections wait up to batch_window seconds and are
+    then valued together. Each batch makes one quote fetch and one
+    PortfolioBook revaluation, however many clients contributed. The batch
+    runs in a worker thread, so a slow price provider does not stall the
+    connections. Request lines may be up to max_line bytes long.
+
+    Backpressure: each connection stops reading once max_inflight of its
+    requests are awaiting answers, which slows its sender down through TCP.
+    The shared queue holds at most max_pending requests; when it is full,
+    further requests wait in value() until the batcher takes some, still
+    holding their connection's slots.
+    """
+    def __init__(self, price_provider=None, host="127.0.0.1", port=8766, batch_window=0.002,
+                 max_batch=4096, max_pending=10000, max_inflight=64, max_line=1024 * 1024):
+        self.price_provider = price_provider or DEFAULT_PRICE_PROVIDER
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_inflight = max_inflight
+        self.max_line = max_line
+        self.requests = 0
+        self.batches = 0
+        self.active_connections = 0
+        self.server = None
+        self._queue = None
+        self._batcher = None
+
+    @property
+    def mean_batch_size(self):
+        return self.requests / self.batches if self.batches else 0.0
+
+    async def start(self):
+        """Start listening and batching; return the port actually bound."""
+        self._queue = asyncio.Queue(self.max_pending)
+        self._batcher = asyncio.create_task(self._run_batches())
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=4096,
+                                                 limit=self.max_line)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Run the server until it is cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and stop the batcher."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+
+    async def value(self, holdings):
+        """Queue one {symbol: quantity} valuation and wait for its batch."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((holdings, future))
+        return await future
+
+    async def _run_batches(self):
+        """Collect queued requests for batch_window seconds, then value them together."""
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                results = await loop.run_in_executor(None, self.value_batch, [holdings for holdings, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self.requests += len(batch)
+            self.batches += 1
+
+    def value_batch(self, batch):
+        """Value a list of holdings dicts in one pricing pass.
+
+        Returns a value or a ValueError for each entry.
+        """
+        symbols = sorted({symbol.upper() for holdings in batch for symbol in holdings})
+        quotes = self.price_provider.get_quotes(symbols)
+        book = PortfolioBook(quotes)
+
+        rows = []
+        results = [None] * len(batch)
+        for i, holdings in enumerate(batch):
+            unknown = [symbol for symbol in holdings if symbol.upper() not in quotes]
+            if unknown:
+                results[i] = ValueError(f"Unknown symbols: {', '.join(unknown)}")
+            elif not all(type(quantity) in (int, float) for quantity in holdings.values()):
+                results[i] = ValueError("Quantities must be numbers")
+            else:
+                rows.append(i)
+                book.add_portfolio(holdings)
+
+        for i, value in zip(rows, book.revalue(book.price_vector(quotes))):
+            results[i] = value
+        return results
+
+    async def _answer(self, request_id, holdings, writer, slots):
+        """Value one request and write its response line."""
+        try:
+            response = {"id": request_id, "value": await self.value(holdings)}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+        finally:
+            slots.release()
+        writer.write(json.dumps(response).encode() + b"\n")
+
+    async def handle_client(self, reader, writer):
+        """Read request lines from one connection, answering each as its batch completes."""
+        self.active_connections += 1
+        slots = asyncio.Semaphore(self.max_inflight)
+        tasks = set()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than max_line; readline has already discarded it
+                    writer.write(json.dumps({"error": f"Bad request: longer than {self.max_line} bytes"}).encode()
+                                 + b"\n")
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    holdings = request["holdings"]
+                    if not isinstance(holdings, dict):
+                        raise TypeError("holdings must be an object")
+                except (ValueError, KeyError, TypeError) as e:
+                    writer.write(json.dumps({"error": f"Bad request: {e}"}).encode() + b"\n")
+                    continue
+
+                await slots.acquire()
+                task = asyncio.create_task(self._answer(request.get("id"), holdings, writer, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+
+            if tasks:
+                await asyncio.gather(*tasks)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active_connections -= 1
+            for task in list(tasks):
+                task.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+class ValuationClient:
+    """Minimal client that sends one valuation at a time and waits for the answer."""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8766):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def value(self, holdings):
+        """Return the value of {symbol: quantity} holdings, or raise ValueError."""
+        self._next_id += 1
+        self.writer.write(json.dumps({"id": self._next_id, "holdings": holdings}).encode() + b"\n")
+        response = json.loads(await self.reader.readline())
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["value"]
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+def main():
+    """Run the valuation server on the port given on the command line."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    server = ValuationServer(port=port)
+
+    async def run():
+        await server.start()
+        print(f"Valuation server listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(f"\nValued {server.requests} portfolios in {server.batches} batches. Goodbye!")
+
+if __name__ == "__main__":
+    main()